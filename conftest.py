@@ -2,12 +2,27 @@
 Conftest module for Playwright automation testing configuration.
 
 This module configures pytest fixtures for browser initialization and teardown,
-including window maximization, viewport settings, and logging setup. It serves as
-the central configuration hub for all test sessions.
+including window maximization, viewport settings, the pool of pre-warmed browser
+contexts tests run in, and logging setup. It serves as the central configuration
+hub for all test sessions.
 """
 
+import os
+import queue
 import pytest
 import logging
+import logging.handlers
+from tests.ai_utils import MODEL_WARMUP_ENABLED, start_model_warmup
+from tests.heal_broker_client import BROKER_ADDRESS
+from tests.heal_artifacts import artifacts
+from tests.heal_cache import heal_cache
+from tests.model_router import model_router
+from pages.home_page import HomePage
+from tests.context_pool import ContextPool, capture_storage_state, pool_size_for_worker
+from tests.network_mode import DEFAULT_NETWORK_MODE, NETWORK_MODES, NetworkMode
+from tests.pom_profiler import PROFILING_ENABLED, TABLE_ROWS, profiler, summarize_steps
+from tests.selector_health import selector_health
+from tests.heal_telemetry import telemetry, summarize, write_prometheus, TELEMETRY_DIR
 
 
 @pytest.fixture(scope="session")
@@ -52,31 +67,111 @@ def browser_context_args(browser_context_args):
     }
 
 
+# Log file size at which it is rotated, and rotated files kept (so a run never uses more than ~40 MB)
+LOG_MAX_BYTES = int(os.environ.get("HEAL_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = 3
+
+# Writes log records to the file and console off the test thread (started in pytest_configure)
+_log_listener = None
+
+# Page every pooled context starts on
+START_URL = "https://www.amazon.in/"
+
+# Fixtures that drive the browser; a run collecting none of them never heals
+BROWSER_FIXTURES = {"setup", "context_pool"}
+
+
+def pytest_addoption(parser):
+    """
+    Register the context pool size, network mode and profiling options.
+
+    Args:
+        parser: Pytest argument parser
+    """
+    parser.addoption(
+        "--context-pool-size", type=int, default=None,
+        help="Pre-warmed browser contexts for the whole run, split across xdist workers (default: ini context_pool_size)",
+    )
+    parser.addini("context_pool_size", "Pre-warmed browser contexts for the whole run", default="2")
+    parser.addoption(
+        "--network-mode", choices=NETWORK_MODES, default=DEFAULT_NETWORK_MODE,
+        help="live, block (drop images/fonts/ads/trackers), record (block + record HAR) or replay (offline from HAR)",
+    )
+    parser.addoption(
+        "--profile-pom", action="store_true", default=PROFILING_ENABLED,
+        help="Profile page object steps: per-test Chrome trace timelines and a slowest-steps table",
+    )
+
+
+@pytest.fixture(scope="session")
+def network_mode(pytestconfig):
+    """
+    Network mode applied to every browser context of the run.
+
+    Returns:
+        NetworkMode: Blocking/recording/replay routes for new contexts
+    """
+    return NetworkMode(pytestconfig.getoption("--network-mode"))
+
+
+@pytest.fixture(scope="session")
+def storage_state(browser, browser_context_args, network_mode):
+    """
+    Storage state captured once past the Amazon interstitial, shared by all workers.
+
+    Returns:
+        str: Path of the storage state file
+    """
+    return capture_storage_state(
+        browser, browser_context_args, START_URL,
+        prepare=lambda page: HomePage(page).dismiss_popup_if_present(), network=network_mode,
+    )
+
+
+@pytest.fixture(scope="session")
+def context_pool(browser, browser_context_args, storage_state, network_mode, pytestconfig):
+    """
+    Session-scoped pool of warm browser contexts for this worker.
+
+    Yields:
+        ContextPool: Pool whose contexts start from the captured storage state
+    """
+    total_size = pytestconfig.getoption("--context-pool-size") or int(pytestconfig.getini("context_pool_size"))
+    pool = ContextPool(
+        browser, pool_size_for_worker(total_size), browser_context_args, START_URL, storage_state,
+        network=network_mode,
+    ).start()
+    yield pool
+    pool.close()
+
+
 @pytest.fixture
-def setup(page):
+def setup(context_pool):
     """
     Setup fixture for each test.
     
-    Initializes the browser to the Amazon India homepage and configures default
-    timeouts. This fixture is executed once per test and yields the page object
-    for test use.
+    Takes a warm browser context from the pool, already on the Amazon India
+    homepage with the captured storage state and the heal tracker/resolver
+    installed, and configures default timeouts. This fixture is executed once
+    per test and yields the page object for test use; the context is reset and
+    returned to the pool afterwards.
     
     Args:
-        page: Playwright page object (provided by pytest-playwright)
+        context_pool: Session-scoped pool of pre-warmed browser contexts
         
     Yields:
         page: Configured Playwright page object ready for testing
     """
+    context, page = context_pool.acquire()
+
     # Log the browser type being used for debugging
-    browser_type = page.context.browser.browser_type.name.upper()
+    browser_type = context.browser.browser_type.name.upper()
     print(f'\nBrowser Type: {browser_type}')
     
-    # Navigate to Amazon India homepage
-    page.goto("https://www.amazon.in/")
-    
     # Set default timeout for all locator operations (10 seconds)
     page.set_default_timeout(10000)
     yield page
+    context_pool.release(context, page)
 
 
 def pytest_configure(config):
@@ -84,17 +179,168 @@ def pytest_configure(config):
     Configure logging for the test session.
     
     Sets up logging to both file and console output. All log messages are written
-    to 'automation_flow.log' file and displayed in the console with timestamp,
-    logger name, level, and message.
+    to 'automation_flow.log' file (one per xdist worker, 'automation_flow-gw0.log'
+    etc.) and displayed in the console with timestamp, logger name, level, and
+    message. Records are handed to a queue; a listener thread does the actual
+    writing, and the file is rotated at LOG_MAX_BYTES. Also enables page object
+    profiling with --profile-pom.
     
     Args:
         config: Pytest configuration object
     """
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s | %(name)-25s | %(levelname)-8s | %(message)s',
-        handlers=[
-            logging.FileHandler("automation_flow.log", mode="w"),
-            logging.StreamHandler()
-        ]
+    global _log_listener
+    worker = os.environ.get("PYTEST_XDIST_WORKER")
+    file_handler = logging.handlers.RotatingFileHandler(
+        f"automation_flow-{worker}.log" if worker else "automation_flow.log",
+        maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, delay=True,
+    )
+    # Every run starts a fresh file; the previous run's becomes the first backup
+    if os.path.exists(file_handler.baseFilename) and os.path.getsize(file_handler.baseFilename):
+        file_handler.doRollover()
+    formatter = logging.Formatter('%(asctime)s | %(name)-25s | %(levelname)-8s | %(message)s')
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _log_listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler)
+    _log_listener.start()
+    # The queue handler only merges args into the message; the listener's handlers format it
+    logging.basicConfig(level=logging.INFO, format='%(message)s', handlers=[logging.handlers.QueueHandler(log_queue)])
+
+    if config.getoption("--profile-pom"):
+        profiler.enable()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    """
+    Record the page object steps of each test as its own timeline when profiling is enabled.
+
+    Args:
+        item: Test item being run
+    """
+    if not profiler.enabled:
+        yield
+        return
+    profiler.begin_test()
+    yield
+    path = profiler.end_test(item.nodeid)
+    if path:
+        logging.getLogger(__name__).info(f"Page object profile for {item.nodeid}: {path}")
+
+
+def pytest_unconfigure(config):
+    """
+    Drain the log queue and close the log file.
+
+    Args:
+        config: Pytest configuration object
+    """
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        for handler in _log_listener.handlers:
+            handler.close()
+        _log_listener = None
+
+
+def pytest_sessionstart(session):
+    """
+    Start a fresh heal telemetry file for this session (and worker).
+
+    Args:
+        session: Pytest session object
+    """
+    telemetry.reset()
+    if profiler.enabled:
+        profiler.reset()
+
+
+def pytest_collection_finish(session):
+    """
+    Start warming the first model tier up while the browser launches, if a
+    collected test drives the browser (offline unit test runs never heal).
+
+    Args:
+        session: Pytest session object
+    """
+    # Once per run: xdist workers share one model server and all collect the same tests,
+    # so only the first worker warms up. With a broker the model calls are the broker's
+    worker = getattr(session.config, "workerinput", {}).get("workerid")
+    if not MODEL_WARMUP_ENABLED or BROKER_ADDRESS or worker not in (None, "gw0") or session.config.option.collectonly:
+        return
+    if any(BROWSER_FIXTURES.intersection(item.fixturenames) for item in session.items):
+        # Heals start on the first tier; larger tiers load only when a heal escalates to them
+        start_model_warmup(model_router.tiers[:1])
+
+
+def pytest_sessionfinish(session, exitstatus):
+    """
+    Persist selector health and model routing statistics, finish writing heal artifacts and log healed-selector
+    cache statistics at the end of the session.
+
+    Args:
+        session: Pytest session object
+        exitstatus: Exit status of the test run
+    """
+    selector_health.flush()
+    model_router.flush()
+    pruned = artifacts.prune()
+    if pruned:
+        logging.getLogger(__name__).info(f"Pruned {pruned} old heal artifacts")
+    stats = heal_cache.stats()
+    logging.getLogger(__name__).info(
+        f"Heal cache: {stats['hits']} hits, {stats['misses']} misses, "
+        f"{stats['evictions']} evictions, {stats['size']} entries in memory"
     )
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    """
+    Print heal telemetry aggregated over all workers and export it for Prometheus,
+    and the slowest page object steps when profiling is enabled.
+
+    Runs only in the main process, after every xdist worker has finished writing
+    its JSONL and trace files.
+
+    Args:
+        terminalreporter: Pytest terminal reporter
+        exitstatus: Exit status of the test run
+        config: Pytest configuration object
+    """
+    if hasattr(config, "workerinput"):
+        return
+    steps = summarize_steps(profiler.load_all()) if profiler.enabled else []
+    if steps:
+        terminalreporter.section("page object profile")
+        terminalreporter.write_line(
+            f"{'step':<40}{'count':>7}{'total ms':>11}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}"
+            f"{'calls':>7}{'trips':>7}{'wait ms':>9}{'action ms':>11}"
+        )
+        for row in steps[:TABLE_ROWS]:
+            terminalreporter.write_line(
+                f"{row['step']:<40}{row['count']:>7}{row['total_ms']:>11.0f}{row['p50_ms']:>9.0f}"
+                f"{row['p95_ms']:>9.0f}{row['max_ms']:>9.0f}{row['api_calls']:>7}{row['round_trips']:>7}"
+                f"{row['wait_ms']:>9.0f}{row['action_ms']:>11.0f}"
+            )
+        terminalreporter.write_line(f"(calls, trips, wait and action are per-call means; timelines in {profiler.directory})")
+
+    records = telemetry.load_all()
+    if not records:
+        return
+    write_prometheus(records, os.path.join(TELEMETRY_DIR, "heal_metrics.prom"))
+
+    summary = summarize(records)
+    outcomes = ", ".join(f"{count} {outcome}" for outcome, count in sorted(summary["outcomes"].items()))
+    terminalreporter.section("self-healing telemetry")
+    terminalreporter.write_line(f"{summary['heals']} heals ({outcomes}), {summary['model_calls']} model calls")
+    terminalreporter.write_line(f"{'phase':<20}{'count':>7}{'total ms':>12}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name, stats in {**summary["phases"], "total": summary["total_ms"]}.items():
+        terminalreporter.write_line(
+            f"{name:<20}{stats['count']:>7}{stats['sum']:>12.0f}{stats['p50']:>10.0f}"
+            f"{stats['p95']:>10.0f}{stats['max']:>10.0f}"
+        )
+    if summary["prompt_tokens"]["count"]:
+        tokens = summary["prompt_tokens"]
+        terminalreporter.write_line(f"prompt tokens: p50 {tokens['p50']}, p95 {tokens['p95']}, total {tokens['sum']:.0f}")
@@ -0,0 +1,52 @@
+"""
+Async Base Page Object for Amazon shopping automation.
+
+playwright.async_api counterpart of BasePage, for flows that run many pages or
+browser contexts in one event loop and heal concurrently.
+"""
+
+from playwright.async_api import expect
+from tests.async_ui_element_action_wrapper import smart_click
+from tests.page_readiness import wait_for_quiescence_async
+from tests.pom_profiler import profile_methods
+
+
+class AsyncBasePage:
+    """Base class for async page objects."""
+
+    # Longest wait (ms) for a selector before it is healed (see BasePage.CLICK_TIMEOUT_MS)
+    CLICK_TIMEOUT_MS = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        profile_methods(cls)
+
+    def __init__(self, page):
+        """
+        Args:
+            page: Async Playwright page object this page object operates on.
+        """
+        self.page = page
+
+    async def smart_click(self, selector, desc):
+        """
+        Click an element via the async self-healing wrapper (see async_ui_element_action_wrapper).
+
+        Raises:
+            AssertionError: If neither the selector nor any healed replacement could be clicked
+        """
+        clicked = await smart_click(self.page, selector, desc, max_timeout=self.CLICK_TIMEOUT_MS)
+        assert clicked, f"Could not click {desc} ({selector}), even after self-healing"
+
+    async def wait_until_ready(self, ready=None, url=None, page=None):
+        """Async version of BasePage.wait_until_ready()."""
+        page = page or self.page
+        if url is not None:
+            await page.wait_for_url(url)
+        if ready is not None:
+            await expect(ready).to_be_visible()
+        await wait_for_quiescence_async(page)
+
+    async def expect_primary_nav_visible(self):
+        """Assert the primary navigation bar is visible (used as a post-action stability check)."""
+        await expect(self.page.get_by_role("navigation", name="Primary")).to_be_visible()
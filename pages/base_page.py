@@ -2,27 +2,85 @@
 Base Page Object for Amazon shopping automation.
 
 Provides behavior shared by every page object in the flow: access to the
-underlying Playwright page, the self-healing click wrapper, and the
-"Primary" navigation visibility check that repeats after most actions.
+underlying Playwright page, the self-healing click wrapper, and
+wait_until_ready(), which follows most actions: it waits for the action's own
+condition (a URL or an element) and then for the page to go quiet (see
+page_readiness).
+
+Subclasses declare the selectors they click in SELECTORS. They are
+pre-flighted when the page object is constructed (see selector_preflight), so
+broken ones start healing in the background before the step that uses them.
+
+Public methods of subclasses are profiled steps when page object profiling is
+enabled (see pom_profiler).
 """
 
 from playwright.sync_api import expect
+from tests.page_readiness import wait_for_quiescence
+from tests.pom_profiler import profile_methods
+from tests.selector_preflight import PREFLIGHT_ENABLED, preflight
 from tests.ui_element_action_wrapper import smart_click
 
 
 class BasePage:
     """Base class that all page objects inherit from."""
 
-    def __init__(self, page):
+    # Selectors this page object clicks, as {name: (selector, description)}
+    SELECTORS = {}
+
+    # Names in SELECTORS that only appear after an action on the page (not pre-flighted)
+    DEFERRED_SELECTORS = frozenset()
+
+    # Longest wait (ms) for a selector before it is healed; the adaptive timeout stays below it
+    # (None for selector_health.DEFAULT_TIMEOUT_MS)
+    CLICK_TIMEOUT_MS = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        profile_methods(cls)
+
+    def __init__(self, page, preflight_selectors=PREFLIGHT_ENABLED):
         """
         Args:
             page: Playwright page object this page object operates on.
+            preflight_selectors (bool): Validate SELECTORS now and heal missing ones in the background.
         """
         self.page = page
+        self._preheals = {}
+        if preflight_selectors:
+            selectors = [value for name, value in self.SELECTORS.items() if name not in self.DEFERRED_SELECTORS]
+            self._preheals = preflight(page, selectors, type(self).__name__)
 
     def smart_click(self, selector, desc):
-        """Click an element via the self-healing wrapper (see ui_element_action_wrapper)."""
-        return smart_click(self.page, selector, desc)
+        """
+        Click an element via the self-healing wrapper (see ui_element_action_wrapper).
+
+        Raises:
+            AssertionError: If neither the selector nor any healed replacement could be clicked
+        """
+        clicked = smart_click(self.page, selector, desc, preheal=self._preheals.pop((selector, desc), None),
+                              max_timeout=self.CLICK_TIMEOUT_MS)
+        assert clicked, f"Could not click {desc} ({selector}), even after self-healing"
+
+    def click(self, name):
+        """Click a selector declared in SELECTORS via the self-healing wrapper (see smart_click())."""
+        self.smart_click(*self.SELECTORS[name])
+
+    def wait_until_ready(self, ready=None, url=None, page=None):
+        """
+        Wait for the page to settle after an action.
+
+        Args:
+            ready (Locator): Element the action makes appear (asserted visible), if any
+            url (str | Pattern): URL the action navigates to (glob or regex), if any
+            page: Page to wait on, when the action opened another one (defaults to this page object's)
+        """
+        page = page or self.page
+        if url is not None:
+            page.wait_for_url(url)
+        if ready is not None:
+            expect(ready).to_be_visible()
+        wait_for_quiescence(page)
 
     def expect_primary_nav_visible(self):
         """Assert the primary navigation bar is visible (used as a post-action stability check)."""
@@ -6,7 +6,6 @@ an item and returning to the homepage.
 """
 
 import logging
-from playwright.sync_api import expect
 from pages.base_page import BasePage
 from pages.home_page import HomePage
 
@@ -16,16 +15,25 @@ logger = logging.getLogger(__name__)
 class CartPage(BasePage):
     """Represents the Amazon.in shopping cart page."""
 
+    SELECTORS = {
+        "decrease_quantity": ('role=button[name="Decrease quantity by one"]', "Decrease quantity by one"),
+        "delete": ("text=Delete", "Delete"),
+        "home_logo": ('role=link[name="Amazon.in"]', "Amazon.in"),
+    }
+
+    # The cart re-renders slowly after each change; keep the suite's 10 s action timeout (see conftest)
+    CLICK_TIMEOUT_MS = 10000
+
     def decrease_quantity(self):
         """Click the "Decrease quantity by one" stepper button."""
-        self.page.get_by_role("button", name="Decrease quantity by one").click()
-        expect(self.page.get_by_role("group", name="Quantity is")).to_be_visible()
+        self.click("decrease_quantity")
+        self.wait_until_ready(self.page.get_by_role("group", name="Quantity is"))
         logger.info("Quantity decreased by 1")
 
     def delete_item(self):
         """Delete the item from the cart."""
-        self.page.get_by_text("Delete").click()
-        expect(self.page.get_by_role("link", name="items in cart")).to_be_visible()
+        self.click("delete")
+        self.wait_until_ready(self.page.get_by_role("link", name="items in cart"))
         logger.info("Delete button clicked")
 
     def go_home(self):
@@ -35,6 +43,7 @@ class CartPage(BasePage):
         Returns:
             HomePage: Page object for the homepage.
         """
-        self.page.get_by_role("link", name="Amazon.in").click()
+        self.click("home_logo")
+        self.wait_until_ready(self.page.get_by_role("searchbox", name="Search Amazon.in"))
         logger.info("Back to home page")
         return HomePage(self.page)
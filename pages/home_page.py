@@ -5,9 +5,12 @@ Encapsulates the landing page behavior: dismissing the initial interstitial
 (if present) and performing a search.
 """
 
+import re
 from playwright.sync_api import expect
 from pages.base_page import BasePage
 
+SEARCH_RESULTS_URL = re.compile(r"/s\?k=")
+
 
 class HomePage(BasePage):
     """Represents the Amazon.in homepage / landing state."""
@@ -28,7 +31,7 @@ class HomePage(BasePage):
         if continue_btn.is_visible():
             expect(self.page.get_by_role("heading", name="Click the button below to")).to_be_visible()
             continue_btn.click()
-            self.expect_primary_nav_visible()
+            self.wait_until_ready(search_btn)
 
     def search(self, query):
         """
@@ -41,4 +44,4 @@ class HomePage(BasePage):
         search_btn.click()
         search_btn.fill(query)
         self.page.get_by_role("button", name="Go", exact=True).click()
-        self.expect_primary_nav_visible()
+        self.wait_until_ready(url=SEARCH_RESULTS_URL)
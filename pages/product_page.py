@@ -6,16 +6,32 @@ changing quantity, adding to cart and navigating to the cart.
 """
 
 import logging
+import re
 from playwright.sync_api import expect
 from pages.base_page import BasePage
 from pages.cart_page import CartPage
 
 logger = logging.getLogger(__name__)
 
+# The cart view itself, not the add-to-cart confirmation (/cart/smart-wagon) that precedes it
+CART_URL = re.compile(r"/gp/cart/view|/cart/?(\?|$)")
+
 
 class ProductPage(BasePage):
     """Represents an Amazon.in product detail page."""
 
+    SELECTORS = {
+        # Public role engine form of get_by_role("button", name="Add to cart", exact=True)
+        "add_to_cart": ('role=button[name="Add to cart" s]', "Add to cart"),
+        "go_to_cart": ('#sw-gtc >> role=link[name="Go to Cart"]', "Go to Cart"),
+    }
+
+    # Product pages and the cart side sheet load slowly; keep the suite's 10 s action timeout (see conftest)
+    CLICK_TIMEOUT_MS = 10000
+
+    # The "Go to Cart" side sheet only opens after adding to cart
+    DEFERRED_SELECTORS = frozenset({"go_to_cart"})
+
     def set_quantity(self, current_quantity, new_quantity):
         """
         Change the product quantity via the quantity dropdown.
@@ -28,13 +44,14 @@ class ProductPage(BasePage):
         self.page.get_by_text(f"Quantity:{current_quantity}").click()
         expect(self.page.get_by_role("option", name=str(current_quantity), exact=True)).to_be_visible()
         self.page.get_by_role("option", name=str(new_quantity), exact=True).click()
-        self.expect_primary_nav_visible()
+        self.wait_until_ready(self.page.get_by_text(f"Quantity:{new_quantity}"))
         logger.info(f"Quantity {new_quantity} chosen")
 
     def add_to_cart(self):
         """Click the "Add to cart" button."""
-        self.page.get_by_role("button", name="Add to cart", exact=True).click()
-        self.expect_primary_nav_visible()
+        self.click("add_to_cart")
+        # Either the side sheet opens or a confirmation page loads; just let it settle
+        self.wait_until_ready()
         logger.info("Add to cart button clicked")
 
     def go_to_cart(self):
@@ -44,7 +61,7 @@ class ProductPage(BasePage):
         Returns:
             CartPage: Page object for the shopping cart.
         """
-        self.page.locator("#sw-gtc").get_by_role("link", name="Go to Cart").click()
-        self.expect_primary_nav_visible()
+        self.click("go_to_cart")
+        self.wait_until_ready(url=CART_URL)
         logger.info("View cart button successfully clicked")
         return CartPage(self.page)
@@ -6,7 +6,6 @@ product from the results grid, which opens the product in a new tab.
 """
 
 import logging
-from playwright.sync_api import expect
 from pages.base_page import BasePage
 from pages.product_page import ProductPage
 
@@ -16,12 +15,14 @@ logger = logging.getLogger(__name__)
 class SearchResultsPage(BasePage):
     """Represents the Amazon.in search results listing page."""
 
+    SELECTORS = {
+        "get_it_today": ('role=link[name="Apply the filter Get It Today to narrow results"]', "Get It Today"),
+    }
+
     def apply_get_it_today_filter(self):
         """Apply the "Get It Today" delivery filter using the self-healing click wrapper."""
-        self.smart_click(
-            'role=link[name="Apply the filter Get It Today to narrow results"]',
-            "Get It Today",
-        )
+        self.click("get_it_today")
+        self.wait_until_ready()
         logger.info("Get It Today button successfully clicked")
 
     def apply_price_filter(self):
@@ -30,6 +31,7 @@ class SearchResultsPage(BasePage):
         full_link_name = price_link.inner_text()
         logger.info(f"Interacting with price filter: '{full_link_name}'")
         price_link.click()
+        self.wait_until_ready()
         logger.info("Up to lowest price button successfully clicked")
 
     def open_first_product(self):
@@ -42,5 +44,5 @@ class SearchResultsPage(BasePage):
         with self.page.expect_popup() as popup_info:
             self.page.locator(".a-link-normal.s-no-outline").first.click()
         product_page = popup_info.value
-        expect(product_page.get_by_role("navigation", name="Primary")).to_be_visible()
+        self.wait_until_ready(product_page.get_by_role("navigation", name="Primary"), page=product_page)
         return ProductPage(product_page)
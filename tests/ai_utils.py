@@ -5,14 +5,312 @@ This module leverages the Ollama AI model (specifically qwen2.5-coder) to genera
 CSS selectors when the original selectors fail. It provides intelligent fallback
 selectors based on HTML context and element descriptions, enabling automated
 testing to adapt to UI changes dynamically.
+
+The system prompt is the same for every request, so Ollama can reuse its
+evaluated prefix from one heal to the next; warm_up_model() loads the model and
+evaluates that prefix before the first heal needs it.
+
+Responses are streamed and the request is stopped as soon as the selectors
+asked for are complete (selectors_complete()), with a hard cap on generated
+tokens, so a heal never waits for an explanation the model adds anyway.
 """
 
-import ollama
 import logging
+import os
+import re
+import time
+from concurrent.futures import Future
+from threading import Thread
+from tests.heal_artifacts import artifacts
+from tests.heal_telemetry import record_prompt, record_model_response
+from tests.html_compactor import estimate_tokens
+from tests.heal_broker_client import BROKER_ADDRESS, DEFAULT_TIMEOUT as BROKER_TIMEOUT, request_heal
+from tests.model_backends import get_model_backend
 
 logger = logging.getLogger(__name__)
 
 
+# Model used for selector healing
+HEAL_MODEL = 'qwen2.5-coder:7b'
+
+# Number of ranked candidates requested per heal by get_healed_selectors()
+DEFAULT_CANDIDATE_COUNT = int(os.environ.get("HEAL_CANDIDATE_COUNT", "5"))
+
+# Identical for every request: everything that varies goes in the prompt, so the
+# model's evaluated system prefix is cached across heals
+HEAL_SYSTEM_PROMPT = """You are a CSS and Playwright selector expert
+                   Return ONLY the selector string(s) the task asks for, one per line.
+                   Never return the broken selector named in the task.
+                   No markdown. No explanations. No backticks."""
+
+# Generated-token cap per requested selector (selectors rarely need more than ~30)
+MAX_TOKENS_PER_SELECTOR = int(os.environ.get("HEAL_MAX_TOKENS_PER_SELECTOR", "48"))
+
+# Set HEAL_MODEL_WARMUP=0 to skip the session-start warm-up
+MODEL_WARMUP_ENABLED = os.environ.get("HEAL_MODEL_WARMUP", "1") != "0"
+
+
+def build_heal_prompt(broken_selector, html_snippet, desc, count=1, context_kind="html"):
+    """
+    Build the prompt and system instructions for a selector-healing request.
+
+    Shared by the sync (get_healed_selector) and async (async_ai_utils) clients
+    and the healing broker so all of them ask the model exactly the same question.
+
+    Args:
+        broken_selector (str): The original CSS selector that failed to find the element
+        html_snippet (str): HTML context containing the target element
+        desc (str): Human-readable description of the element to locate
+        count (int): Number of ranked candidate selectors to ask for
+        context_kind (str): "html" for compacted markup, "aria" for an accessibility-tree
+            snapshot (see aria_context), which asks for role/name selectors instead of CSS
+
+    Returns:
+        tuple[str, str]: (prompt, system) strings for the model request
+    """
+    if context_kind == "aria":
+        kind, source, header = ('Playwright role selector (role=<role>[name="<accessible name>"])',
+                                "accessibility tree", "ACCESSIBILITY TREE")
+    else:
+        kind, source, header = "CSS selector", "HTML", "HTML CONTEXT"
+    if count == 1:
+        task = f"Identify the NEW {kind} for the target element in the {source} above."
+    else:
+        task = (f"List up to {count} different NEW {kind}s for the target element "
+                f"in the {source} above, most reliable first.")
+
+    # Construct the AI prompt with context about the element to find
+    ai_prompt = f"""
+    TARGET ELEMENT: {desc}
+    {header}:
+    {html_snippet}
+
+    TASK:
+    {task}
+    DO NOT return the broken selector '{broken_selector}'
+    """
+    return ai_prompt, HEAL_SYSTEM_PROMPT
+
+
+def generation_options(count=1):
+    """
+    Model options for a heal request: deterministic output with a hard length cap.
+
+    Args:
+        count (int): Number of selectors requested
+
+    Returns:
+        dict: Ollama generate options
+    """
+    options = {'temperature': 0, 'num_predict': MAX_TOKENS_PER_SELECTOR * count}
+    if count == 1:
+        # A single selector is one line; a blank line only ever precedes an explanation
+        options['stop'] = ["\n\n"]
+    return options
+
+
+def leading_selector(text):
+    """
+    Split the first selector token off a (possibly partial) response.
+
+    Whitespace ends the token only outside quotes and brackets, so attribute
+    selectors such as a[aria-label="Go to Cart"] stay whole.
+
+    Args:
+        text (str): Response text so far
+
+    Returns:
+        tuple[str, bool]: The token, and whether it is complete (followed by whitespace)
+    """
+    text = text.lstrip()
+    depth, quote = 0, None
+    for i, ch in enumerate(text):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch in "[(":
+            depth += 1
+        elif ch in "])":
+            depth = max(0, depth - 1)
+        elif ch.isspace() and depth == 0:
+            return text[:i], True
+    return text, False
+
+
+def _is_balanced(selector):
+    """Whether quotes and brackets in a candidate selector are closed (combinators may contain spaces)."""
+    depth, quote = 0, None
+    for ch in selector:
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch in "[(":
+            depth += 1
+        elif ch in "])":
+            depth -= 1
+            if depth < 0:
+                return False
+    return quote is None and depth == 0
+
+
+def parse_selector(response_text):
+    """
+    Extract the suggested selector from a raw model response.
+
+    Args:
+        response_text (str): The model's 'response' field
+
+    Returns:
+        str: The first selector token of the response (see leading_selector())
+
+    Raises:
+        IndexError: If the response is empty
+    """
+    selector, _ = leading_selector(response_text)
+    if not selector:
+        raise IndexError("empty model response")
+    return selector
+
+
+def parse_selectors(response_text, broken_selector, count):
+    """
+    Extract a ranked list of candidate selectors from a multi-candidate response.
+
+    Tolerates the list decorations models add despite instructions (numbering,
+    bullets, backticks) and drops duplicates, the broken selector itself, lead-in
+    and closing sentences ("Here are the selectors:", "... the link.") and lines
+    with unclosed quotes or brackets. A line is one selector, combinators included.
+
+    Args:
+        response_text (str): The model's 'response' field
+        broken_selector (str): Selector that failed; never returned as a candidate
+        count (int): Maximum number of candidates to return
+
+    Returns:
+        list[str]: Candidate selectors, best first
+    """
+    candidates = []
+    for line in response_text.splitlines():
+        candidate = re.sub(r"^\s*(?:\d+[.)]|[-*•])\s*", "", line).strip().strip("`").strip()
+        if not candidate or candidate.endswith((":", ".")) or not _is_balanced(candidate):
+            continue
+        if candidate != broken_selector and candidate not in candidates:
+            candidates.append(candidate)
+    return candidates[:count]
+
+
+def selectors_complete(text, broken_selector, count):
+    """
+    Whether a partial response already holds every selector parse_response() will use.
+
+    Used as the streaming stop condition: one complete leading selector when a
+    single one was asked for, otherwise `count` complete, valid lines.
+
+    Args:
+        text (str): Response text streamed so far
+        broken_selector (str): Selector that failed
+        count (int): Number of selectors requested
+
+    Returns:
+        bool: True once the rest of the response can be dropped
+    """
+    if count == 1:
+        return leading_selector(text)[1]
+    complete_lines = text[:text.rfind("\n") + 1]
+    return len(parse_selectors(complete_lines, broken_selector, count)) >= count
+
+
+def parse_response(response_text, broken_selector, count):
+    """
+    Parse a model response into a list of selectors for the requested candidate count.
+
+    Args:
+        response_text (str): The model's 'response' field
+        broken_selector (str): Selector that failed
+        count (int): Number of candidates that were requested
+
+    Returns:
+        list[str]: One selector when count == 1, otherwise up to count candidates
+    """
+    if count == 1:
+        return [parse_selector(response_text)]
+    return parse_selectors(response_text, broken_selector, count)
+
+
+def log_model_exchange(prompt, response_text):
+    """Log references to a heal prompt and the raw model response (stored as artifacts, not inline)."""
+    logger.info(f"Model exchange: prompt {artifacts.put(prompt, 'prompt')}, "
+                f"response {artifacts.put(response_text, 'response')}")
+
+
+def prepare_model_request(broken_selector, html_snippet, desc, count, model=HEAL_MODEL, context_kind="html"):
+    """
+    Build the backend generate() arguments for a heal and record the prompt size.
+
+    Shared by the sync and async clients, which only differ in how they send it.
+
+    Args:
+        broken_selector (str): The original selector that failed to find the element
+        html_snippet (str): HTML (or accessibility-tree) context containing the target element
+        desc (str): Human-readable description of the element to locate
+        count (int): Number of selectors to ask for
+        model (str): Model to ask
+        context_kind (str): "html" or "aria" (see build_heal_prompt())
+
+    Returns:
+        dict: Keyword arguments for the model backend's generate()/generate_async()
+    """
+    ai_prompt, system_prompt = build_heal_prompt(broken_selector, html_snippet, desc, count, context_kind)
+    record_prompt(ai_prompt, system_prompt, estimate_tokens(ai_prompt + system_prompt))
+    return dict(
+        model=model,
+        prompt=ai_prompt,
+        options=generation_options(count),  # Temperature 0 for deterministic results, capped output
+        system=system_prompt,
+        stop_when=lambda text: selectors_complete(text, broken_selector, count),
+    )
+
+
+def handle_model_response(request, ai_response, broken_selector, count):
+    """
+    Record and log a model response and parse the selectors out of it.
+
+    Args:
+        request (dict): prepare_model_request() result the response answers
+        ai_response: Backend generate response
+        broken_selector (str): Selector that failed
+        count (int): Number of selectors that were requested
+
+    Returns:
+        list[str]: See parse_response()
+    """
+    record_model_response(ai_response)
+    log_model_exchange(request["prompt"], ai_response['response'])
+    return parse_response(ai_response['response'], broken_selector, count)
+
+
+def _request_selectors(broken_selector, html_snippet, desc, count, model=HEAL_MODEL, context_kind="html",
+                       timeout=None):
+    """Ask the broker (if configured) or Ollama for `count` selectors from `model`, within timeout seconds."""
+    if BROKER_ADDRESS:
+        try:
+            return request_heal(broken_selector, html_snippet, desc, count=count, model=model,
+                                context_kind=context_kind, timeout=BROKER_TIMEOUT if timeout is None else timeout)
+        except OSError as e:
+            # Only when the broker never got the request; BrokerError (including its
+            # deadline passing while the broker's model call runs) is raised as is
+            logger.warning(f"Healing broker at {BROKER_ADDRESS} unreachable ({e}); calling Ollama directly")
+
+    # Query the AI model (Ollama unless another backend is configured) with specific instructions
+    request = prepare_model_request(broken_selector, html_snippet, desc, count, model, context_kind)
+    ai_response = get_model_backend().generate(**request, timeout=timeout)
+    return handle_model_response(request, ai_response, broken_selector, count)
+
+
 def get_healed_selector(broken_selector, html_snippet, desc):
     """
     Use AI model to generate a corrected CSS selector for a broken selector.
@@ -32,50 +330,123 @@ def get_healed_selector(broken_selector, html_snippet, desc):
     Notes:
         - Uses the Ollama 'qwen2.5-coder:7b' model with temperature=0 for consistency
         - The AI is instructed to return only the selector string without explanations
-        - Only the first word of the AI response is extracted and returned
+        - Only the first selector token of the AI response is extracted and returned;
+          the response is streamed and cut off as soon as that token is complete
+        - When HEAL_BROKER_ADDRESS is set the request goes through the shared
+          healing broker (see heal_broker); Ollama is called directly only if
+          the broker cannot be reached. A broker that does not answer in time
+          raises BrokerTimeout (a BrokerError) instead, since its own model call is still running
     """
-    # Construct the AI prompt with context about the element to find
-    ai_prompt = f"""
-    TARGET ELEMENT: {desc}
-    HTML CONTEXT:
-    {html_snippet}
+    corrected_id = _request_selectors(broken_selector, html_snippet, desc, 1)[0]
+    logger.info(f"AI suggested selector: {corrected_id}")
+    return corrected_id
 
-    TASK:
-    Identify the NEW CSS selector for the target element in the HTML above.
+
+def get_healed_selectors(broken_selector, html_snippet, desc, count=DEFAULT_CANDIDATE_COUNT, model=HEAL_MODEL,
+                         context_kind="html", timeout=None):
     """
-    
-    # Query the Ollama AI model with specific instructions
-    ai_response = ollama.generate(
-        model='qwen2.5-coder:7b',
-        prompt=ai_prompt,
-        options={'temperature': 0},  # Temperature 0 for deterministic results
-        system=f"""You are a CSS Selector expert
-                   Return ONLY the new selector string.
-                   DO NOT return the broken selector '{broken_selector}'
-                   No markdown. No explanations. No backticks."""
+    Ask the AI model for a ranked list of candidate selectors instead of just one.
+
+    Validating several candidates in one in-page call is far cheaper than
+    re-asking the model when its single answer turns out to be wrong.
+
+    Args:
+        broken_selector (str): The original CSS selector that failed to find the element
+        html_snippet (str): HTML context containing the target element
+        desc (str): Human-readable description of the element to locate
+        count (int): Maximum number of candidates to ask for
+        model (str): Model to ask (see model_router for choosing one per heal)
+        context_kind (str): "html", or "aria" when html_snippet is an accessibility-tree snapshot
+        timeout (float): Seconds the model call may take (None: no limit; the broker's default deadline)
+
+    Returns:
+        list[str]: Candidate selectors, most reliable first (may be empty)
+
+    Raises:
+        TimeoutError: If the model did not answer within timeout (BrokerTimeout through the broker)
+    """
+    candidates = _request_selectors(broken_selector, html_snippet, desc, count, model, context_kind, timeout)
+    logger.info(f"AI ({model}) suggested {len(candidates)} candidate selectors: {candidates}")
+    return candidates
+
+
+def check_model_health(model=HEAL_MODEL):
+    """
+    Readiness check for the configured model backend.
+
+    Returns:
+        dict: {"ready", "reachable", "model_available", "models", "error"}; ready
+        means the server answered and has the healing model
+    """
+    health = get_model_backend().health(model)
+    health["ready"] = health["reachable"] and health["model_available"]
+    if not health["reachable"]:
+        logger.warning(f"Model server unreachable: {health['error']}")
+    elif not health["model_available"]:
+        logger.warning(f"Model {model} not found on the server (available: {health['models']}); "
+                       f"run `ollama pull {model}`")
+    return health
+
+
+def warm_up_model(model=HEAL_MODEL):
+    """
+    Load the model and evaluate the fixed system prompt before the first heal.
+
+    Sends one minimal request through the backend (which sets keep_alive), so the
+    first real heal finds the model resident and the system prefix cached.
+
+    Returns:
+        float | None: Warm-up time in seconds, or None if the model is not ready
+    """
+    if not check_model_health(model)["ready"]:
+        return None
+    started = time.perf_counter()
+    get_model_backend().generate(
+        model=model,
+        prompt="TARGET ELEMENT: warm-up\nTASK: reply with OK",
+        system=HEAL_SYSTEM_PROMPT,
+        options={'temperature': 0, 'num_predict': 1},
     )
-    
-    # Extract the suggested selector (first word of the response)
-    corrected_id = ai_response['response'].strip().split()[0]
-    logger.info(f"AI suggested selector: {corrected_id}")
-    return corrected_id
+    elapsed = time.perf_counter() - started
+    logger.info(f"Model {model} warmed up in {elapsed:.1f}s")
+    return elapsed
+
+
+def start_model_warmup(models=(HEAL_MODEL,)):
+    """
+    Run warm_up_model() for each model, one after the other, on a background thread.
+
+    Args:
+        models (Iterable[str]): Models to warm up (e.g. every model_router tier)
+
+    Returns:
+        Future: Resolves to {model: warm_up_model() result} (never raises; failures are logged)
+    """
+    future = Future()
+
+    def _run():
+        results = {}
+        for model in models:
+            try:
+                results[model] = warm_up_model(model)
+            except Exception as e:
+                logger.warning(f"Model warm-up failed for {model}: {e}")
+                results[model] = None
+        future.set_result(results)
+
+    Thread(target=_run, name="heal-model-warmup", daemon=True).start()
+    return future
 
 
 if __name__ == "__main__":
-    # Test block: Verify Ollama server connection and test the healing functionality
-    try:
-        # Attempt to connect to Ollama server and list available models
-        response = ollama.list()
-        
-        # Check if any models are available
-        if not response.models:
-            print("Connection okay, but no models found.")
-        else:
-            # Display all available models
-            for m in response.models:
-                print(f'Connection Successful. Found model: {m.model}')
-    except Exception as e:
-        print(f"Could not connect to server {e}")
+    # Test block: Verify the model server is ready and test the healing functionality
+    health = check_model_health()
+    if not health["reachable"]:
+        print(f"Could not connect to server {health['error']}")
+    else:
+        for model in health["models"]:
+            print(f'Connection Successful. Found model: {model}')
+        print(f"{HEAL_MODEL} ready: {health['ready']}")
     
     # Example: Test the get_healed_selector function with sample HTML and selector
     test_html = """
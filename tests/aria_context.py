@@ -0,0 +1,231 @@
+"""
+Accessibility-tree heal context for role-based selectors.
+
+Most selectors in the page objects are role-based (role=link[name="..."],
+get_by_role), yet heals sent the model compacted HTML and asked for CSS back.
+For those selectors the ARIA snapshot of the same region (role, accessible
+name and state per line, as produced by Playwright's aria_snapshot()) is an
+order of magnitude smaller than its markup, so the prompt evaluates faster,
+and the model answers with a role/name locator, which survives markup changes
+that break CSS selectors.
+
+With HEAL_CONTEXT_MODE=auto (default), role selectors heal from the
+accessibility tree and everything else from HTML; "aria" and "html" force one
+mode. The context is built from the regions the heal resolver ranked (see
+heal_resolver): each region is widened by ARIA_ANCESTOR_LEVELS, snapshotted, and
+the result is pruned to ARIA_TOKEN_BUDGET around the line that best matches
+the element description, keeping that line's ancestors so the tree stays
+readable. aria_candidates() derives role/name candidates from the snapshot,
+the accessibility-tree counterpart of selector_candidates.
+"""
+
+import logging
+import os
+import re
+from playwright.sync_api import Error as PlaywrightError
+from tests.html_compactor import estimate_tokens
+from tests.model_router import selector_kind
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_MODES = ("auto", "aria", "html")
+
+CONTEXT_MODE = os.environ.get("HEAL_CONTEXT_MODE", "auto")
+
+# Token budget of the accessibility-tree context (the HTML budget is HEAL_CONTEXT_TOKEN_BUDGET)
+ARIA_TOKEN_BUDGET = int(os.environ.get("HEAL_ARIA_TOKEN_BUDGET", "600"))
+
+# Levels above each ranked region that are snapshotted, for surrounding context
+ARIA_ANCESTOR_LEVELS = 2
+
+# Milliseconds allowed for each region's snapshot
+SNAPSHOT_TIMEOUT_MS = 2000
+
+# Share of the description's words a name must contain when it lacks the whole phrase
+MIN_WORD_OVERLAP = 0.8
+
+# `- role "name" [state]: text` lines of an ARIA snapshot
+_NODE_LINE = re.compile(r'^(\s*)-\s+([a-z]+)(?:\s+"((?:[^"\\]|\\.)*)")?')
+
+
+def context_kind_for(selector, mode=CONTEXT_MODE):
+    """
+    Context a heal of this selector sends to the model.
+
+    Args:
+        selector (str): Broken selector
+        mode (str): One of CONTEXT_MODES
+
+    Returns:
+        str: "aria" or "html"
+    """
+    if mode == "auto":
+        return "aria" if selector_kind(selector) == "role" else "html"
+    return mode
+
+
+def _words(text):
+    return set(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def _anchor_line(lines, desc):
+    """Index of the snapshot line sharing the most words with the description."""
+    wanted = _words(desc)
+    best, best_score = 0, 0
+    for index, line in enumerate(lines):
+        score = len(wanted & _words(line))
+        if score > best_score:
+            best, best_score = index, score
+    return best
+
+
+def _indent(line):
+    return len(line) - len(line.lstrip())
+
+
+def prune_snapshot(snapshot, desc, budget=ARIA_TOKEN_BUDGET):
+    """
+    Fit an ARIA snapshot into a token budget, centred on the description's best match.
+
+    Lines are added alternately below and above the anchor line until the budget
+    is reached; the anchor's ancestor lines are always kept.
+
+    Args:
+        snapshot (str): ARIA snapshot (YAML-like, one node per line)
+        desc (str): Human-readable description of the target element
+        budget (int): Maximum estimated tokens
+
+    Returns:
+        str: The pruned snapshot, lines in their original order
+    """
+    if estimate_tokens(snapshot) <= budget:
+        return snapshot
+    lines = snapshot.splitlines()
+    anchor = _anchor_line(lines, desc)
+    keep = {anchor}
+    # Ancestors: the nearest preceding line at each smaller indentation
+    level = _indent(lines[anchor])
+    for index in range(anchor - 1, -1, -1):
+        if _indent(lines[index]) < level:
+            keep.add(index)
+            level = _indent(lines[index])
+    used = sum(estimate_tokens(lines[i]) for i in keep)
+    below, above = anchor + 1, anchor - 1
+    while below < len(lines) or above >= 0:
+        for index in (below, above):
+            if 0 <= index < len(lines) and index not in keep:
+                cost = estimate_tokens(lines[index])
+                if used + cost > budget:
+                    return "\n".join(lines[i] for i in sorted(keep))
+                keep.add(index)
+                used += cost
+        below, above = below + 1, above - 1
+    return "\n".join(lines[i] for i in sorted(keep))
+
+
+def _region_selectors(resolved):
+    # Each ranked region widened to an ancestor; the whole body when nothing was anchored
+    selectors = resolved.get("regionSelectors") or []
+    widen = "/".join([".."] * ARIA_ANCESTOR_LEVELS)
+    return [f"{selector} >> xpath={widen}" for selector in selectors] or ["body"]
+
+
+def _merge(snapshots, desc, budget):
+    unique = []
+    for snapshot in snapshots:
+        # Widened regions can coincide; a snapshot inside another adds nothing
+        if snapshot and not any(snapshot in other for other in unique):
+            unique = [other for other in unique if other not in snapshot] + [snapshot]
+    return prune_snapshot("\n".join(unique), desc, budget) if unique else None
+
+
+def aria_context(page, resolved, desc, budget=ARIA_TOKEN_BUDGET):
+    """
+    Accessibility-tree context for a heal, from the regions the resolver ranked.
+
+    Args:
+        page (Page): Playwright page being healed
+        resolved (dict): resolve() result for the heal (uses "regionSelectors")
+        desc (str): Human-readable description of the target element
+        budget (int): Token budget of the context
+
+    Returns:
+        str | None: Pruned ARIA snapshot, or None if none could be taken (callers fall back to HTML)
+    """
+    snapshots = []
+    for selector in _region_selectors(resolved):
+        try:
+            snapshots.append(page.locator(selector).first.aria_snapshot(timeout=SNAPSHOT_TIMEOUT_MS))
+        except PlaywrightError as e:
+            logger.warning(f"ARIA snapshot of {selector} failed: {e}")
+    return _merge(snapshots, desc, budget)
+
+
+async def aria_context_async(page, resolved, desc, budget=ARIA_TOKEN_BUDGET):
+    """Async version of aria_context() for playwright.async_api pages."""
+    snapshots = []
+    for selector in _region_selectors(resolved):
+        try:
+            snapshots.append(await page.locator(selector).first.aria_snapshot(timeout=SNAPSHOT_TIMEOUT_MS))
+        except PlaywrightError as e:
+            logger.warning(f"ARIA snapshot of {selector} failed: {e}")
+    return _merge(snapshots, desc, budget)
+
+
+def _normalize(text):
+    return " ".join(text.lower().split())
+
+
+def _word_sequence(text):
+    # Padded so a phrase only matches whole words ("brand 1" is not in "brand 100")
+    return f" {' '.join(re.findall(r'[a-z0-9]+', text.lower()))} "
+
+
+def _named_nodes(snapshot):
+    nodes = []
+    for line in snapshot.splitlines():
+        match = _NODE_LINE.match(line)
+        if match and match.group(3):
+            nodes.append((match.group(2), match.group(3)))
+    return nodes
+
+
+def aria_candidates(snapshot, desc, broken_selector=None, limit=3):
+    """
+    Role/name selectors for snapshot nodes whose accessible name matches the description.
+
+    A name matches if it contains the whole description or at least
+    MIN_WORD_OVERLAP of its words; a sibling sharing a word or two ("Get It by
+    Tomorrow" for "Get It Today") does not. A name that would also match another
+    node of the same role (role=...[name=...] matches case-insensitive substrings)
+    is skipped, since the locator could not tell them apart.
+
+    Args:
+        snapshot (str): ARIA snapshot context
+        desc (str): Human-readable description of the element to locate
+        broken_selector (str): Selector that failed; never returned as a candidate
+        limit (int): Maximum number of candidates to return
+
+    Returns:
+        list[str]: Candidates like role=link[name="Go to Cart"], names containing the
+        whole description first, then those sharing the most words with it
+    """
+    phrase = _word_sequence(desc)
+    wanted = _words(desc)
+    if not wanted:
+        return []
+    nodes = _named_nodes(snapshot)
+    scored = []
+    for role, name in nodes:
+        shared = len(wanted & _words(name))
+        whole = phrase in _word_sequence(name)
+        if not whole and shared < MIN_WORD_OVERLAP * len(wanted):
+            continue
+        if sum(1 for other_role, other in nodes if other_role == role and _normalize(name) in _normalize(other)) > 1:
+            continue
+        score = shared + (len(wanted) if whole else 0)
+        candidate = f'role={role}[name="{name}"]'
+        if candidate != broken_selector and all(candidate != c for _, c in scored):
+            scored.append((score, candidate))
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return [candidate for _, candidate in scored[:limit]]
@@ -0,0 +1,96 @@
+"""
+Async AI utilities for self-healing selectors.
+
+Async counterpart of ai_utils, backed by ollama.AsyncClient (through the
+configured model backend, see model_backends), so that many pages or browser
+contexts running in one event loop can heal at the same time instead of
+blocking the worker on each multi-second model call. A semaphore caps the
+number of concurrent model requests so a burst of heals does not overwhelm the
+Ollama server.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from tests.ai_utils import HEAL_MODEL, DEFAULT_CANDIDATE_COUNT, handle_model_response, prepare_model_request
+from tests.heal_broker_client import BROKER_ADDRESS, DEFAULT_TIMEOUT as BROKER_TIMEOUT, request_heal_async
+from tests.model_backends import get_model_backend
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of model requests in flight per event loop
+MAX_CONCURRENT_MODEL_REQUESTS = int(os.environ.get("HEAL_MAX_CONCURRENT_MODEL_REQUESTS", "4"))
+
+# Semaphores are bound to the event loop that created them
+_loop_semaphores = {}
+
+
+def _model_semaphore():
+    """Return the model-request semaphore for the running event loop."""
+    loop = asyncio.get_running_loop()
+    semaphore = _loop_semaphores.get(loop)
+    if semaphore is None:
+        # Forget semaphores of loops that have since been closed (e.g. per-test loops)
+        for stale_loop in [l for l in _loop_semaphores if l.is_closed()]:
+            del _loop_semaphores[stale_loop]
+        semaphore = _loop_semaphores[loop] = asyncio.Semaphore(MAX_CONCURRENT_MODEL_REQUESTS)
+    return semaphore
+
+
+async def _request_selectors(broken_selector, html_snippet, desc, count, model=HEAL_MODEL, context_kind="html",
+                             timeout=None):
+    """Ask the broker (if configured) or Ollama for `count` selectors without blocking the loop."""
+    if BROKER_ADDRESS:
+        try:
+            return await request_heal_async(broken_selector, html_snippet, desc, count=count, model=model,
+                                            context_kind=context_kind,
+                                            timeout=BROKER_TIMEOUT if timeout is None else timeout)
+        except OSError as e:
+            # Only when the broker never got the request; BrokerError (including its
+            # deadline passing while the broker's model call runs) is raised as is
+            logger.warning(f"Healing broker at {BROKER_ADDRESS} unreachable ({e}); calling Ollama directly")
+
+    request = prepare_model_request(broken_selector, html_snippet, desc, count, model, context_kind)
+    # Wait for a free model slot, within the same timeout; other pages keep running meanwhile
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        await asyncio.wait_for(_model_semaphore().acquire(), timeout)
+    except asyncio.TimeoutError as e:
+        raise TimeoutError(f"No model slot free within {timeout:.1f} s") from e
+    try:
+        remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+        ai_response = await get_model_backend().generate_async(**request, timeout=remaining)
+    finally:
+        _model_semaphore().release()
+    return handle_model_response(request, ai_response, broken_selector, count)
+
+
+async def get_healed_selector(broken_selector, html_snippet, desc):
+    """
+    Async version of ai_utils.get_healed_selector().
+
+    Args:
+        broken_selector (str): The original CSS selector that failed to find the element
+        html_snippet (str): HTML context containing the target element
+        desc (str): Human-readable description of the element to locate (e.g., "Get It Today")
+
+    Returns:
+        str: A new CSS selector for the target element suggested by the AI model
+    """
+    corrected_id = (await _request_selectors(broken_selector, html_snippet, desc, 1))[0]
+    logger.info(f"AI suggested selector: {corrected_id}")
+    return corrected_id
+
+
+async def get_healed_selectors(broken_selector, html_snippet, desc, count=DEFAULT_CANDIDATE_COUNT,
+                               model=HEAL_MODEL, context_kind="html", timeout=None):
+    """
+    Async version of ai_utils.get_healed_selectors().
+
+    Returns:
+        list[str]: Candidate selectors, most reliable first (may be empty)
+    """
+    candidates = await _request_selectors(broken_selector, html_snippet, desc, count, model, context_kind, timeout)
+    logger.info(f"AI ({model}) suggested {len(candidates)} candidate selectors: {candidates}")
+    return candidates
@@ -0,0 +1,172 @@
+"""
+Async UI element action wrapper with self-healing capabilities.
+
+playwright.async_api counterpart of ui_element_action_wrapper. The healing flow
+is the same (circuit breaker and adaptive timeout, fingerprint match, in-page
+resolver, compacted context, heal cache, AI model), but every browser and model call is awaited, so many pages or
+contexts in one event loop can heal concurrently. Model requests go through
+async_ai_utils, which caps how many are in flight at once. Everything between
+those calls is shared with the sync wrapper (see heal_flow).
+"""
+
+from tests import heal_flow
+from tests.aria_context import aria_context_async, context_kind_for
+from tests.model_router import model_router
+from tests.element_fingerprint import find_similar_element_async, FINGERPRINT_JS
+from tests.heal_flow import HEALED_CLICK_TIMEOUT_MS, CLICKABLE_TAGS, CLICKABLE_ANCESTOR_XPATH, MATCH_INFO_JS
+from tests.heal_resolver import resolve_async
+from tests.heal_telemetry import heal_trace, phase, record_outcome
+from playwright.async_api import TimeoutError
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+async def smart_click(page, selector, desc, max_timeout=None):
+    """
+    Async version of ui_element_action_wrapper.smart_click().
+
+    Args:
+        page (Page): Async Playwright page object to perform clicks on
+        selector (str): CSS/Playwright selector for the element to click
+        desc (str): Human-readable description of the element (used for AI context)
+        max_timeout (int): Ceiling (ms) for the adaptive timeout on the original selector
+            (None for selector_health.DEFAULT_TIMEOUT_MS)
+
+    Returns:
+        bool: True if click succeeded (either original or healed selector),
+              False if both initial attempt and healing retry failed
+    """
+    # Known-broken selector: go straight to the last selector that healed it
+    bypass = heal_flow.circuit_bypass(selector, desc)
+    if bypass is not None and await _click_bypass(page, selector, desc, bypass, max_timeout):
+        return True
+
+    timeout, started, record_fingerprint = heal_flow.begin_attempt(selector, desc, max_timeout)
+    try:
+        # Attempt initial click with original selector
+        locator = page.locator(selector)
+        element_fingerprint = None
+        if record_fingerprint:
+            # Capture the fingerprint before clicking - the click may navigate away
+            element_fingerprint = await locator.evaluate(FINGERPRINT_JS, timeout=timeout)
+        await locator.click(timeout=timeout)
+        heal_flow.attempt_succeeded(selector, desc, started, element_fingerprint)
+        return True
+
+    except TimeoutError as e:
+        # Original selector failed - heal it and remember what worked
+        heal_flow.attempt_failed(selector, desc)
+        # A failed probe of a known-broken selector: its healed selector still gets the click
+        bypass = heal_flow.probe_fallback(selector, desc)
+        if bypass is not None and await _click_bypass(page, selector, desc, bypass, max_timeout):
+            return True
+        with heal_trace(selector, desc, original_wait_ms=heal_flow.elapsed_ms(started)):
+            healed_selector = await _heal(page, selector, desc)
+        heal_flow.heal_finished(selector, desc, healed_selector)
+        return healed_selector is not None
+
+
+async def _heal(page, selector, desc):
+    """Async version of ui_element_action_wrapper._heal()."""
+    # First try matching the element's recorded fingerprint (no model call)
+    stored_fingerprint = heal_flow.stored_fingerprint(selector, desc)
+    if stored_fingerprint is not None:
+        try:
+            with phase("fingerprint_match"):
+                match_score, match_selector = await find_similar_element_async(page, stored_fingerprint)
+            if heal_flow.fingerprint_match_accepted(desc, match_score, match_selector):
+                with phase("click"):
+                    await page.locator(match_selector).click(timeout=HEALED_CLICK_TIMEOUT_MS)
+                record_outcome("fingerprint")
+                return match_selector
+        except Exception as ex:
+            logger.warning(f"Fingerprint heal failed for {desc}: {ex}")
+
+    # Ranked retrieval and context serialization in one round trip, then compaction or, for
+    # role selectors, an accessibility-tree snapshot of the ranked regions
+    with phase("context_extraction"):
+        anchor_result = await resolve_async(page, desc=desc, selector=selector, include_changes=True)
+        snapshot = (await aria_context_async(page, anchor_result, desc)
+                    if context_kind_for(selector) == "aria" else None)
+        context = heal_flow.build_context(anchor_result, desc, snapshot)
+    heal_flow.log_context(anchor_result, context, desc)
+
+    # Reuse a previous heal of the same selector against the same DOM, if it still matches
+    new_selector = heal_flow.cached_heal(selector, desc, context)
+    if new_selector is not None:
+        if await _click_healed(page, [new_selector], desc) is not None:
+            record_outcome("cache")
+            return new_selector
+        heal_flow.discard_cached_heal(selector, desc, context, new_selector)
+
+    # Ask the model tiers (smallest first) for ranked candidates, with rule-based selectors as
+    # fallbacks; each tier's candidates are validated together in one in-page call
+    async def validate(candidates):
+        heal_flow.log_retry(desc, candidates)
+        return await _click_healed(page, candidates, desc)
+
+    healed_selector, candidates = await model_router.heal_async(
+        selector, context.model_html, desc, validate,
+        extra_candidates=heal_flow.fallback_candidates(selector, desc, context), context_kind=context.kind)
+    if healed_selector is not None:
+        # Only selectors proven against the live page are cached
+        heal_flow.heal_succeeded(selector, desc, context.fingerprint, healed_selector, "model")
+        return healed_selector
+
+    heal_flow.heal_failed(desc, candidates)
+    return None
+
+
+async def _click_bypass(page, selector, desc, bypass, max_timeout=None):
+    """Async version of ui_element_action_wrapper._click_bypass()."""
+    with heal_trace(selector, desc):
+        try:
+            timeout = heal_flow.bypass_timeout(selector, desc, max_timeout)
+            await page.locator(bypass).first.wait_for(state="visible", timeout=timeout)
+            clicked = await _click_healed(page, [bypass], desc) is not None
+        except TimeoutError:
+            clicked = False
+        if clicked:
+            record_outcome("circuit")
+            return True
+    heal_flow.bypass_failed(selector, desc, bypass)
+    return False
+
+
+async def _click_healed(page, candidates, desc):
+    """Async version of ui_element_action_wrapper._click_healed()."""
+    try:
+        with phase("validation"):
+            result = await resolve_async(page, candidates=candidates, target=desc)
+        heal_flow.log_validation(result)
+
+        resolved = result["resolved"]
+        if resolved is not None:
+            logger.info(f"Clicking {desc} via {resolved['clickableSelector']} (tag {resolved['tag']})")
+            with phase("click"):
+                await page.locator(resolved["clickableSelector"]).click(timeout=HEALED_CLICK_TIMEOUT_MS)
+            return resolved["selector"]
+    except Exception as ex:
+        logger.warning(f"Healed click on {desc} failed: {ex}")
+        return None
+
+    # Not CSS - let Playwright resolve it and find the clickable parent
+    for candidate in heal_flow.playwright_only_candidates(result):
+        try:
+            count = await page.locator(candidate).count()
+            if count == 0:
+                continue
+            healed_locator = page.locator(candidate).first
+            info = await healed_locator.evaluate(MATCH_INFO_JS, timeout=HEALED_CLICK_TIMEOUT_MS)
+            if not heal_flow.playwright_match_accepted(candidate, desc, count, info):
+                continue
+            if info["tag"] not in CLICKABLE_TAGS:
+                healed_locator = healed_locator.locator(CLICKABLE_ANCESTOR_XPATH)
+            with phase("click"):
+                await healed_locator.click(timeout=HEALED_CLICK_TIMEOUT_MS)
+            return candidate
+        except Exception as ex:
+            logger.warning(f"Healed click on {desc} with {candidate} failed: {ex}")
+    return None
@@ -0,0 +1,193 @@
+"""
+Pool of pre-warmed browser contexts shared by the tests of one worker.
+
+Every test used to get a brand-new context, cold-load amazon.in and often click
+through the bot-check interstitial before doing anything useful. Instead, each
+worker now keeps a small session-scoped pool of contexts that:
+
+- start from a storage state (cookies and localStorage) captured once, after the
+  interstitial has been passed, and reused across workers and runs until it
+  goes stale
+- have the heal tracker, resolver and readiness init scripts and the run's network mode
+  (see network_mode) installed once, and a page already loaded on the start URL
+- are reset between tests: extra pages closed, cookies and storage put back to
+  the captured state, the page sent back to the start URL
+
+With pytest-xdist the configured pool size is the total across all workers, so
+each worker gets its share (see pool_size_for_worker).
+"""
+
+import json
+import logging
+import math
+import os
+import queue
+import time
+from tests.dom_tracker import install_tracker
+from tests.heal_resolver import install_resolver
+from tests.page_readiness import install_readiness
+from tests.shared_files import file_lock
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORAGE_STATE_PATH = os.environ.get(
+    "HEAL_STORAGE_STATE_PATH", os.path.join(".heal_cache", "storage_state.json")
+)
+
+# Captured storage state is reused for this many hours before being captured again
+STORAGE_STATE_MAX_AGE_HOURS = float(os.environ.get("HEAL_STORAGE_STATE_MAX_AGE_HOURS", "12"))
+
+# Seconds a worker waits for another worker to finish capturing the storage state
+LOCK_TIMEOUT = 120
+
+RESTORE_STORAGE_JS = """items => {
+    localStorage.clear();
+    sessionStorage.clear();
+    for (const {name, value} of items) localStorage.setItem(name, value);
+}"""
+
+
+def pool_size_for_worker(total_size, worker_count=None):
+    """
+    Share of the total pool size for one pytest-xdist worker.
+
+    Args:
+        total_size (int): Pool size configured for the whole run
+        worker_count (int): Number of workers (defaults to PYTEST_XDIST_WORKER_COUNT, 1 without xdist)
+
+    Returns:
+        int: Contexts to create in this worker (at least 1)
+    """
+    if worker_count is None:
+        worker_count = int(os.environ.get("PYTEST_XDIST_WORKER_COUNT", "1"))
+    return max(1, math.ceil(total_size / max(1, worker_count)))
+
+
+def _is_fresh(path):
+    return os.path.exists(path) and time.time() - os.path.getmtime(path) < STORAGE_STATE_MAX_AGE_HOURS * 3600
+
+
+def capture_storage_state(browser, context_args, start_url, prepare, path=DEFAULT_STORAGE_STATE_PATH, network=None):
+    """
+    Return a fresh storage state file, capturing it if needed (once across all workers).
+
+    Args:
+        browser (Browser): Browser to open the capture context in
+        context_args (dict): Arguments for browser.new_context()
+        start_url (str): Page to load before capturing
+        prepare (Callable[[Page], None]): Gets the page into the state to capture
+            (e.g. past the interstitial)
+        path (str): Storage state file
+        network (NetworkMode): Network mode for the capture context (None for live)
+
+    Returns:
+        str: Path of the storage state file
+    """
+    if _is_fresh(path):
+        return path
+    with file_lock(f"{path}.lock", timeout=LOCK_TIMEOUT):
+        # Another worker may have captured it while we waited for the lock
+        if _is_fresh(path):
+            return path
+        logger.info(f"Capturing browser storage state from {start_url}")
+        context = browser.new_context(**context_args)
+        if network is not None:
+            network.apply(context)
+        try:
+            page = context.new_page()
+            page.goto(start_url)
+            prepare(page)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            context.storage_state(path=tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            context.close()
+    return path
+
+
+class ContextPool:
+    """Fixed-size pool of warm browser contexts, each with one page on the start URL."""
+
+    def __init__(self, browser, size, context_args, start_url, storage_state_path=None, network=None):
+        """
+        Args:
+            browser (Browser): Browser the contexts belong to
+            size (int): Number of contexts
+            context_args (dict): Arguments for browser.new_context()
+            start_url (str): URL every page is (re)loaded at before a test gets it
+            storage_state_path (str): Storage state the contexts start from and are reset to
+            network (NetworkMode): Network mode applied to every context (None for live)
+        """
+        self.browser = browser
+        self.size = size
+        self.context_args = context_args
+        self.start_url = start_url
+        self.storage_state_path = storage_state_path
+        self.network = network
+        self._state = {"cookies": [], "origins": []}
+        if storage_state_path:
+            with open(storage_state_path, encoding="utf-8") as f:
+                self._state = json.load(f)
+        self._idle = queue.Queue()
+        self._contexts = []
+
+    def start(self):
+        """Create and warm up all contexts."""
+        started = time.perf_counter()
+        for _ in range(self.size):
+            self._idle.put(self._new_context())
+        logger.info(f"Context pool warmed {self.size} contexts in {time.perf_counter() - started:.1f}s")
+        return self
+
+    def acquire(self, timeout=None):
+        """
+        Take an idle context (blocks until one is free).
+
+        Returns:
+            tuple[BrowserContext, Page]: The context and its page, loaded on the start URL
+        """
+        return self._idle.get(timeout=timeout)
+
+    def release(self, context, page):
+        """Reset a context to the captured state and return it to the pool."""
+        try:
+            self._reset(context, page)
+        except Exception as e:
+            # A context broken by the test is replaced rather than handed out again
+            logger.warning(f"Could not reset pooled context ({e}); replacing it")
+            self._contexts.remove(context)
+            context.close()
+            context, page = self._new_context()
+        self._idle.put((context, page))
+
+    def _new_context(self):
+        context = self.browser.new_context(**self.context_args, storage_state=self.storage_state_path)
+        install_tracker(context)
+        install_resolver(context)
+        install_readiness(context)
+        if self.network is not None:
+            self.network.apply(context)
+        page = context.new_page()
+        page.goto(self.start_url)
+        self._contexts.append(context)
+        return context, page
+
+    def _reset(self, context, page):
+        for other in context.pages:
+            if other is not page:
+                other.close()
+        # localStorage can only be written from a page on its origin: restore the current one before leaving
+        origin = page.evaluate("() => location.origin")
+        items = next((o["localStorage"] for o in self._state["origins"] if o["origin"] == origin), [])
+        if origin != "null":
+            page.evaluate(RESTORE_STORAGE_JS, items)
+        context.clear_cookies()
+        if self._state["cookies"]:
+            context.add_cookies(self._state["cookies"])
+        page.goto(self.start_url)
+
+    def close(self):
+        """Close every context in the pool (this is when recorded HAR archives are written)."""
+        for context in self._contexts:
+            context.close()
+        self._contexts = []
@@ -0,0 +1,226 @@
+"""
+Programmatic DOM mutations for the offline healing benchmark.
+
+Takes a fixture page and applies the kinds of changes that break selectors in
+real front-end releases, so every heal path can be measured against a known
+answer:
+
+- rename_ids: ids get a build suffix (references in for/aria-*/href="#" follow)
+- shuffle_classes: class names are re-hashed, as a CSS-modules rebuild would,
+  and reordered
+- wrap_elements: clickable elements are wrapped in an extra <span>
+- move_subtree: the container around each target moves to another part of the page
+
+Fixtures mark the elements a benchmark clicks with data-bench-target="<key>".
+The marker is stripped from the mutated HTML (so neither the model nor the
+rule-based candidates can see it), and each target is reported as its
+document-order index under <body>, which the browser can look up with
+document.body.getElementsByTagName('*')[index].
+"""
+
+import random
+from html import escape
+from html.parser import HTMLParser
+from tests.html_compactor import VOID_TAGS
+
+TARGET_ATTRIBUTE = "data-bench-target"
+
+# Tags whose text content must be written back unescaped
+RAW_TEXT_TAGS = {"script", "style"}
+
+# Elements that get wrapped by wrap_elements()
+WRAPPED_TAGS = {"a", "button", "input", "select"}
+
+# Elements a moved subtree may be re-inserted into without the browser re-parenting it
+CONTAINER_TAGS = {"div", "section", "main", "nav", "aside", "header", "footer", "ul"}
+
+# Attributes holding space-separated id references
+ID_REFERENCE_ATTRIBUTES = ("for", "aria-labelledby", "aria-describedby", "aria-controls", "aria-owns")
+
+
+class _Node:
+    __slots__ = ("tag", "attrs", "children", "parent")
+
+    def __init__(self, tag, attrs=None, parent=None):
+        self.tag = tag
+        self.attrs = attrs if attrs is not None else {}
+        self.children = []
+        self.parent = parent
+
+    def elements(self):
+        """This node's descendant elements in document order."""
+        for child in self.children:
+            if isinstance(child, _Node):
+                yield child
+                yield from child.elements()
+
+
+class _Markup(str):
+    """Doctype, comment or raw text that is serialized verbatim."""
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = _Node("#document")
+        self._current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        node = _Node(tag, {name: value or "" for name, value in attrs}, self._current)
+        self._current.children.append(node)
+        if tag not in VOID_TAGS:
+            self._current = node
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self._current = self._current.parent
+
+    def handle_endtag(self, tag):
+        node = self._current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self._current = node.parent
+
+    def handle_data(self, data):
+        self._current.children.append(_Markup(data) if self._current.tag in RAW_TEXT_TAGS else data)
+
+    def handle_comment(self, data):
+        self._current.children.append(_Markup(f"<!--{data}-->"))
+
+    def handle_decl(self, decl):
+        self._current.children.append(_Markup(f"<!{decl}>"))
+
+
+def _serialize(node, out):
+    for child in node.children:
+        if isinstance(child, _Markup):
+            out.append(child)
+        elif isinstance(child, str):
+            out.append(escape(child, quote=False))
+        else:
+            attrs = "".join(f' {name}="{escape(value)}"' for name, value in child.attrs.items())
+            out.append(f"<{child.tag}{attrs}>")
+            if child.tag not in VOID_TAGS:
+                _serialize(child, out)
+                out.append(f"</{child.tag}>")
+
+
+def _body(root):
+    return next((node for node in root.elements() if node.tag == "body"), root)
+
+
+def _suffix(rng):
+    return f"{rng.getrandbits(16):04x}"
+
+
+def rename_ids(root, rng):
+    """Give every id a build suffix and update the attributes that reference it."""
+    renamed = {}
+    for node in root.elements():
+        if node.attrs.get("id"):
+            renamed[node.attrs["id"]] = node.attrs["id"] = f"{node.attrs['id']}-{_suffix(rng)}"
+    for node in root.elements():
+        for name in ID_REFERENCE_ATTRIBUTES:
+            if name in node.attrs:
+                node.attrs[name] = " ".join(renamed.get(ref, ref) for ref in node.attrs[name].split())
+        href = node.attrs.get("href", "")
+        if href.startswith("#") and href[1:] in renamed:
+            node.attrs["href"] = "#" + renamed[href[1:]]
+
+
+def shuffle_classes(root, rng):
+    """Re-hash every class name consistently across the page and shuffle class order."""
+    hashed = {}
+    for node in root.elements():
+        classes = node.attrs.get("class", "").split()
+        if not classes:
+            continue
+        classes = [hashed.setdefault(c, f"{c}_{_suffix(rng)}") for c in classes]
+        rng.shuffle(classes)
+        node.attrs["class"] = " ".join(classes)
+
+
+def wrap_elements(root, rng):
+    """Wrap every clickable element under <body> in an extra <span>."""
+    for node in list(_body(root).elements()):
+        if node.tag not in WRAPPED_TAGS:
+            continue
+        parent = node.parent
+        wrapper = _Node("span", {"class": f"wrap-{_suffix(rng)}"}, parent)
+        parent.children[parent.children.index(node)] = wrapper
+        wrapper.children.append(node)
+        node.parent = wrapper
+
+
+def move_subtree(root, rng, targets=()):
+    """
+    Move the container around each target to another container elsewhere on the page.
+
+    Args:
+        root (_Node): Parsed document
+        rng (random.Random): Seeded random source
+        targets (Iterable[_Node]): Elements whose surrounding container should move
+    """
+    body = _body(root)
+    for target in targets:
+        subtree = target.parent
+        if subtree is None or subtree is body or subtree.parent is None:
+            continue
+        inside = set(map(id, subtree.elements())) | {id(subtree)}
+        destinations = [
+            node for node in body.elements()
+            if node.tag in CONTAINER_TAGS and id(node) not in inside and node is not subtree.parent
+        ]
+        if not destinations:
+            continue
+        destination = rng.choice(destinations)
+        subtree.parent.children.remove(subtree)
+        destination.children.insert(rng.randint(0, len(destination.children)), subtree)
+        subtree.parent = destination
+
+
+# Mutations in the order "all" applies them
+MUTATIONS = {
+    "rename_ids": rename_ids,
+    "shuffle_classes": shuffle_classes,
+    "wrap_elements": wrap_elements,
+    "move_subtree": move_subtree,
+}
+
+
+def mutate(html, mutations=(), seed=0):
+    """
+    Apply mutations to a fixture page and locate its marked targets.
+
+    Args:
+        html (str): Fixture HTML with data-bench-target markers
+        mutations (Iterable[str]): Names from MUTATIONS, applied in the given order
+        seed (int): Seed for the random choices, so variants are reproducible
+
+    Returns:
+        tuple[str, dict[str, int]]: Mutated HTML without the markers, and each target's
+        document-order index under <body>
+    """
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    root = builder.root
+
+    targets = {}
+    for node in root.elements():
+        if TARGET_ATTRIBUTE in node.attrs:
+            targets[node.attrs.pop(TARGET_ATTRIBUTE)] = node
+
+    rng = random.Random(seed)
+    for name in mutations:
+        if name == "move_subtree":
+            move_subtree(root, rng, targets.values())
+        else:
+            MUTATIONS[name](root, rng)
+
+    indices = {id(node): index for index, node in enumerate(_body(root).elements())}
+    out = []
+    _serialize(root, out)
+    return "".join(out), {key: indices[id(node)] for key, node in targets.items()}
@@ -0,0 +1,191 @@
+"""
+Incremental DOM change tracking for the heal path.
+
+Every heal used to serialize its HTML context from scratch with outerHTML, and
+when no text anchor was found that meant the whole <body> - on pages like
+Amazon search results a large part of the heal cost, even though little of the
+page had changed since the previous heal.
+
+This module injects a tracker (window.__domTracker) into every page of a
+browser context. A MutationObserver keeps a per-element cache of compacted
+serializations (the same tags and attributes html_compactor keeps) and only
+invalidates the subtrees that actually changed, so serializing a region that
+has not changed since the last heal is a cache lookup. The heal resolver uses
+it for its context automatically when it is installed.
+
+The tracker also records what changed since the last click (added, removed and
+re-attributed elements). A selector that broke right after a click usually
+points at an element that was just moved or re-rendered, so resolve(...,
+include_changes=True) returns those regions as an extra hint for the model.
+"""
+
+import json
+import os
+from tests.html_compactor import DROPPED_TAGS, KEPT_ATTRIBUTES, VOID_TAGS, compact_html
+
+# Approximate prompt budget for the changed-regions hint, in model tokens
+CHANGES_TOKEN_BUDGET = int(os.environ.get("HEAL_CHANGES_TOKEN_BUDGET", "400"))
+
+# Changed regions and removed-element summaries returned per heal
+MAX_CHANGED_REGIONS = 8
+MAX_REMOVED_SUMMARIES = 20
+
+# Elements remembered as changed before the tracker gives up and reports an overflow
+MAX_TRACKED_CHANGES = 500
+
+# Installed once per page (idempotent, so re-injecting is harmless)
+TRACKER_JS = f"""(() => {{
+    if (window.__domTracker) return;
+    const DROPPED = new Set({json.dumps(sorted(t.upper() for t in DROPPED_TAGS))});
+    const VOID = new Set({json.dumps(sorted(t.upper() for t in VOID_TAGS))});
+    const KEPT = new Set({json.dumps(sorted(KEPT_ATTRIBUTES))});
+    const keep = name => KEPT.has(name) || name.startsWith('aria-');
+    const escapeText = text => text.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+    const escapeAttr = value => escapeText(value).replace(/"/g, '&quot;');
+
+    // Compacted serialization of each clean element, dropped when its subtree changes
+    const cache = new WeakMap();
+    let changed = new Set();
+    let removed = [];
+    let overflow = false;
+    let tracking = false;
+
+    const serialize = el => {{
+        let html = cache.get(el);
+        if (html !== undefined) return html;
+        const tag = el.tagName;
+        if (DROPPED.has(tag)) return '';
+        const name = tag.toLowerCase();
+        let attrs = '';
+        for (const attr of el.attributes) {{
+            if (keep(attr.name)) attrs += ` ${{attr.name}}="${{escapeAttr(attr.value)}}"`;
+        }}
+        html = `<${{name}}${{attrs}}>`;
+        if (!VOID.has(tag)) {{
+            for (const child of el.childNodes) {{
+                if (child.nodeType === Node.ELEMENT_NODE) html += serialize(child);
+                else if (child.nodeType === Node.TEXT_NODE) html += escapeText(child.data.replace(/\\s+/g, ' '));
+            }}
+            html += `</${{name}}>`;
+        }}
+        cache.set(el, html);
+        return html;
+    }};
+
+    // Drop cached serializations from an element up to the root; ancestors of an
+    // uncached element are never cached, so the walk can stop there
+    const invalidate = el => {{
+        while (el && cache.delete(el)) el = el.parentElement;
+    }};
+
+    const summary = el => {{
+        const id = el.id ? `#${{el.id}}` : '';
+        const cls = typeof el.className === 'string' && el.className.trim()
+            ? '.' + el.className.trim().split(/\\s+/).slice(0, 3).join('.') : '';
+        const text = (el.textContent || '').replace(/\\s+/g, ' ').trim().slice(0, 60);
+        return `${{el.tagName.toLowerCase()}}${{id}}${{cls}}${{text ? ` "${{text}}"` : ''}}`;
+    }};
+
+    const markChanged = el => {{
+        if (!tracking || !el || overflow) return;
+        changed.add(el);
+        if (changed.size > {MAX_TRACKED_CHANGES}) {{
+            overflow = true;
+            changed = new Set();
+        }}
+    }};
+
+    const handle = records => {{
+        for (const record of records) {{
+            if (record.type === 'attributes') {{
+                if (!keep(record.attributeName)) continue;
+                invalidate(record.target);
+                markChanged(record.target);
+            }} else if (record.type === 'characterData') {{
+                invalidate(record.target.parentElement);
+                markChanged(record.target.parentElement);
+            }} else {{
+                invalidate(record.target);
+                for (const node of record.addedNodes) {{
+                    if (node.nodeType === Node.ELEMENT_NODE) markChanged(node);
+                }}
+                if (tracking) {{
+                    for (const node of record.removedNodes) {{
+                        if (node.nodeType === Node.ELEMENT_NODE && removed.length < {MAX_REMOVED_SUMMARIES}) {{
+                            removed.push(summary(node));
+                        }}
+                    }}
+                }}
+            }}
+        }}
+    }};
+
+    const observer = new MutationObserver(handle);
+    observer.observe(document, {{childList: true, subtree: true, attributes: true, characterData: true}});
+
+    // Every click starts a new change window (nothing is tracked before the first one)
+    document.addEventListener('click', () => {{
+        handle(observer.takeRecords());
+        tracking = true;
+        changed = new Set();
+        removed = [];
+        overflow = false;
+    }}, true);
+
+    window.__domTracker = {{
+        serialize(el) {{
+            handle(observer.takeRecords());
+            return serialize(el);
+        }},
+        // Outermost changed elements still in the document, serialized, plus removed-element summaries
+        changes() {{
+            handle(observer.takeRecords());
+            const connected = Array.from(changed).filter(el => el.isConnected && !DROPPED.has(el.tagName));
+            const regions = connected.filter(el => !connected.some(other => other !== el && other.contains(el)));
+            return {{
+                overflow,
+                regions: regions.slice(0, {MAX_CHANGED_REGIONS}).map(serialize),
+                removed: removed.slice(),
+            }};
+        }},
+    }};
+}})()"""
+
+
+def install_tracker(context):
+    """
+    Register the tracker as an init script so every page in the context has it from the start.
+
+    Args:
+        context (BrowserContext): Playwright browser context (pages opened later,
+            including popups, inherit the script)
+    """
+    context.add_init_script(script=TRACKER_JS)
+
+
+async def install_tracker_async(context):
+    """Async version of install_tracker() for playwright.async_api contexts."""
+    await context.add_init_script(script=TRACKER_JS)
+
+
+def changes_hint(changes, desc, token_budget=CHANGES_TOKEN_BUDGET):
+    """
+    Turn a resolver "changes" result into a compact hint to append to the heal context.
+
+    Args:
+        changes (dict | None): {"overflow", "regions", "removed"} from resolve(..., include_changes=True)
+        desc (str): Element description, used to centre the compaction
+        token_budget (int): Approximate token budget for the hint
+
+    Returns:
+        str: Compacted changed regions plus a comment listing removed elements ("" if nothing useful)
+    """
+    if not changes or changes["overflow"] or not (changes["regions"] or changes["removed"]):
+        return ""
+    parts = ["<!-- changed since the last click -->"]
+    if changes["regions"]:
+        parts.append(compact_html("\n".join(changes["regions"]), desc, token_budget=token_budget))
+    if changes["removed"]:
+        removed = "; ".join(s.replace("--", "- -") for s in changes["removed"])
+        parts.append(f"<!-- removed since the last click: {removed} -->")
+    return "\n".join(parts)
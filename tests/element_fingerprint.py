@@ -0,0 +1,349 @@
+"""
+Element fingerprinting and similarity-based selector healing.
+
+Every successful smart_click() records a compact fingerprint of the element it
+clicked: tag, id, classes, role, accessible name, text, attribute set and DOM
+path. When the selector later breaks, the live DOM's candidate elements are
+scored against the stored fingerprint with a weighted attribute-similarity
+match. Renamed ids and reshuffled classes still leave most of the fingerprint
+intact, so the best candidate can be picked in milliseconds without asking the
+AI model. A feature both sides lack (no id, no role) says nothing either way
+and is left out of the score rather than counted as a match.
+
+Siblings such as the "Get It Today" and "Get It by Tomorrow" filter links share
+everything but their label, so a candidate is only accepted when its
+accessible name and text still match the recorded ones (MIN_LABEL_SIMILARITY),
+its score reaches CONFIDENCE_THRESHOLD and it beats the runner-up by
+MIN_MARGIN. Otherwise the AI model is consulted.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from difflib import SequenceMatcher
+from tests.shared_files import file_lock, write_atomic
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.environ.get(
+    "HEAL_FINGERPRINT_PATH", os.path.join(".heal_cache", "fingerprints.json")
+)
+
+# Minimum similarity score for a candidate to be used without consulting the AI model
+CONFIDENCE_THRESHOLD = 0.75
+
+# Minimum word-level similarity of the accessible name and of the text to the recorded ones
+MIN_LABEL_SIMILARITY = 0.9
+
+# Lead the best candidate needs over the runner-up
+MIN_MARGIN = 0.05
+
+# Upper bound on the number of candidates collected from the page per heal
+MAX_CANDIDATES = 1500
+
+# Relative importance of each fingerprint feature (sums to 1.0)
+WEIGHTS = {
+    "tag": 0.10,
+    "id": 0.15,
+    "classes": 0.10,
+    "role": 0.10,
+    "name": 0.20,
+    "text": 0.15,
+    "attrs": 0.10,
+    "path": 0.10,
+}
+
+# Shared JS: fingerprint of one element plus a selector that uniquely locates it
+FINGERPRINT_FUNCTIONS_JS = """
+    const accessibleName = el => {
+        const labelledBy = el.getAttribute('aria-labelledby');
+        if (labelledBy) {
+            const label = labelledBy.split(/\\s+/)
+                .map(id => document.getElementById(id))
+                .filter(Boolean)
+                .map(node => node.textContent.trim())
+                .join(' ');
+            if (label) return label;
+        }
+        return (el.getAttribute('aria-label') || el.getAttribute('alt') || el.getAttribute('title')
+                || (el.innerText || '').trim() || el.value || '').slice(0, 120);
+    };
+    const domPath = el => {
+        const parts = [];
+        for (let node = el.parentElement; node && node !== document.body && parts.length < 6; node = node.parentElement) {
+            parts.unshift(node.tagName.toLowerCase());
+        }
+        return parts.join('>');
+    };
+    const uniqueSelector = el => {
+        if (el.id && document.querySelectorAll('#' + CSS.escape(el.id)).length === 1) {
+            return '#' + CSS.escape(el.id);
+        }
+        const parts = [];
+        for (let node = el; node && node !== document.body; node = node.parentElement) {
+            if (node !== el && node.id && document.querySelectorAll('#' + CSS.escape(node.id)).length === 1) {
+                parts.unshift('#' + CSS.escape(node.id));
+                break;
+            }
+            let index = 1;
+            for (let sib = node.previousElementSibling; sib; sib = sib.previousElementSibling) {
+                if (sib.tagName === node.tagName) index++;
+            }
+            parts.unshift(`${node.tagName.toLowerCase()}:nth-of-type(${index})`);
+        }
+        return parts.join(' > ');
+    };
+    const fingerprint = el => {
+        const attrs = {};
+        for (const attr of el.attributes) {
+            if (attr.name !== 'style') attrs[attr.name] = attr.value.slice(0, 80);
+        }
+        return {
+            tag: el.tagName.toLowerCase(),
+            id: el.id || '',
+            classes: Array.from(el.classList),
+            role: el.getAttribute('role') || '',
+            name: accessibleName(el),
+            text: (el.textContent || '').trim().replace(/\\s+/g, ' ').slice(0, 120),
+            attrs: attrs,
+            path: domPath(el),
+            selector: uniqueSelector(el),
+        };
+    };
+"""
+
+# Evaluated on a located element: returns its fingerprint
+FINGERPRINT_JS = f"""el => {{
+    {FINGERPRINT_FUNCTIONS_JS}
+    return fingerprint(el);
+}}"""
+
+# Evaluated on the page: returns fingerprints of all plausible click targets
+CANDIDATES_JS = f"""([tag, limit]) => {{
+    {FINGERPRINT_FUNCTIONS_JS}
+    const query = 'a, button, input, label, select, summary, [role], [onclick], [tabindex], ' + tag;
+    const seen = new Set();
+    const result = [];
+    for (const el of document.querySelectorAll(query)) {{
+        if (result.length >= limit) break;
+        if (seen.has(el) || !(el.offsetWidth || el.offsetHeight || el.getClientRects().length)) continue;
+        seen.add(el);
+        result.push(fingerprint(el));
+    }}
+    return result;
+}}"""
+
+
+def _text_similarity(a, b):
+    """Ratio in [0, 1] of how similar two strings are (None when both are empty)."""
+    if not a and not b:
+        return None
+    if not a or not b:
+        return 0.0
+    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+
+
+def _set_similarity(a, b):
+    """Jaccard similarity of two collections (None when both are empty)."""
+    a, b = set(a), set(b)
+    if not a and not b:
+        return None
+    return len(a & b) / len(a | b)
+
+
+def _words(text):
+    return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+
+def label_similarity(stored, candidate):
+    """
+    How well a candidate's accessible name and text match the recorded ones.
+
+    Compared word by word, so a different word ("Today" vs "by Tomorrow") costs
+    far more than a change in case, spacing or punctuation.
+
+    Args:
+        stored (dict): Fingerprint recorded on a successful click
+        candidate (dict): Fingerprint of an element on the current page
+
+    Returns:
+        float | None: The lower of the name and text similarities (None if the
+        recorded element had neither)
+    """
+    similarities = []
+    for feature in ("name", "text"):
+        recorded = _words(stored[feature])
+        if recorded:
+            similarities.append(SequenceMatcher(None, recorded, _words(candidate[feature])).ratio())
+    return min(similarities) if similarities else None
+
+
+def score(stored, candidate):
+    """
+    Score how likely a candidate element is the element a fingerprint was recorded from.
+
+    Features neither element has (e.g. no id on both) are left out, and the
+    remaining weights are renormalized.
+
+    Args:
+        stored (dict): Fingerprint recorded on a successful click
+        candidate (dict): Fingerprint of an element on the current page
+
+    Returns:
+        float: Weighted similarity in [0, 1]
+    """
+    attr_items = lambda fp: {f"{k}={v}" for k, v in fp["attrs"].items() if k not in ("id", "class")}
+    features = {
+        "tag": float(stored["tag"] == candidate["tag"]),
+        "id": _text_similarity(stored["id"], candidate["id"]),
+        "classes": _set_similarity(stored["classes"], candidate["classes"]),
+        "role": None if not stored["role"] and not candidate["role"] else float(stored["role"] == candidate["role"]),
+        "name": _text_similarity(stored["name"], candidate["name"]),
+        "text": _text_similarity(stored["text"], candidate["text"]),
+        "attrs": _set_similarity(attr_items(stored), attr_items(candidate)),
+        "path": _text_similarity(stored["path"], candidate["path"]),
+    }
+    present = {name: value for name, value in features.items() if value is not None}
+    return sum(WEIGHTS[name] * value for name, value in present.items()) / sum(WEIGHTS[name] for name in present)
+
+
+def rank_candidates(stored, candidates):
+    """
+    Rank candidate elements against a stored fingerprint.
+
+    Args:
+        stored (dict): Fingerprint recorded on a successful click
+        candidates (list[dict]): Fingerprints collected from the current page
+
+    Returns:
+        list[tuple[float, dict]]: (score, candidate) pairs, best first
+    """
+    return sorted(((score(stored, c), c) for c in candidates), key=lambda pair: pair[0], reverse=True)
+
+
+def best_match(stored, candidates):
+    """
+    Pick the candidate that best matches a stored fingerprint, if it is unambiguous.
+
+    Args:
+        stored (dict): Fingerprint recorded on a successful click
+        candidates (list[dict]): Fingerprints collected from the current page
+
+    Returns:
+        tuple[float, str | None]: Best score and the unique selector of the best
+        candidate; the selector is None if there are no candidates, the best one's
+        label does not match (MIN_LABEL_SIMILARITY) or it does not lead the
+        runner-up by MIN_MARGIN
+    """
+    ranked = rank_candidates(stored, candidates)
+    if not ranked:
+        return 0.0, None
+    best_score, best = ranked[0]
+    runner_up = ranked[1][0] if len(ranked) > 1 else 0.0
+    label = label_similarity(stored, best)
+    logger.info(f"Best fingerprint match {best['selector']} (score {best_score:.2f}, runner-up {runner_up:.2f}, "
+                f"label {'n/a' if label is None else f'{label:.2f}'}, {len(ranked)} candidates)")
+    if label is not None and label < MIN_LABEL_SIMILARITY:
+        return best_score, None
+    if best_score - runner_up < MIN_MARGIN:
+        return best_score, None
+    return best_score, best["selector"]
+
+
+def find_similar_element(page, stored):
+    """
+    Find the element on the page that best matches a stored fingerprint.
+
+    Args:
+        page (Page): Playwright page object to search
+        stored (dict): Fingerprint recorded on a successful click
+
+    Returns:
+        tuple[float, str | None]: See best_match()
+    """
+    return best_match(stored, page.evaluate(CANDIDATES_JS, [stored["tag"], MAX_CANDIDATES]))
+
+
+async def find_similar_element_async(page, stored):
+    """
+    Async version of find_similar_element() for playwright.async_api pages.
+
+    Args:
+        page (Page): Async Playwright page object to search
+        stored (dict): Fingerprint recorded on a successful click
+
+    Returns:
+        tuple[float, str | None]: See best_match()
+    """
+    return best_match(stored, await page.evaluate(CANDIDATES_JS, [stored["tag"], MAX_CANDIDATES]))
+
+
+class FingerprintStore:
+    """Fingerprints of successfully clicked elements, persisted as JSON."""
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        """
+        Args:
+            path (str): Location of the JSON store, or None for memory only
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._fingerprints = {}
+        # Keys refreshed during this session; re-recording them would only add round trips
+        self._recorded = set()
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._fingerprints = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read fingerprint store {path}: {e}")
+
+    @staticmethod
+    def _key(selector, desc):
+        return f"{selector}\x1f{desc}"
+
+    def needs_recording(self, selector, desc):
+        """Return True if no fingerprint has been recorded for this element during this session."""
+        return self._key(selector, desc) not in self._recorded
+
+    def get(self, selector, desc):
+        """Return the stored fingerprint for a selector/description, or None."""
+        return self._fingerprints.get(self._key(selector, desc))
+
+    def put(self, selector, desc, fingerprint):
+        """
+        Record the fingerprint of an element that was clicked successfully.
+
+        Args:
+            selector (str): Selector that was clicked
+            desc (str): Human-readable description of the element
+            fingerprint (dict): Result of evaluating FINGERPRINT_JS on the element
+        """
+        key = self._key(selector, desc)
+        with self._lock:
+            self._recorded.add(key)
+            self._fingerprints[key] = {**fingerprint, "recorded_at": time.time()}
+            if not self.path:
+                return
+            try:
+                # Re-read under the lock so fingerprints other workers recorded meanwhile are kept
+                with file_lock(f"{self.path}.lock"):
+                    stored = {}
+                    if os.path.exists(self.path):
+                        try:
+                            with open(self.path, encoding="utf-8") as f:
+                                stored = json.load(f)
+                        except (OSError, ValueError):
+                            stored = {}
+                    stored[key] = self._fingerprints[key]
+                    write_atomic(self.path, json.dumps(stored))
+                    self._fingerprints.update(stored)
+            except OSError as e:
+                logger.warning(f"Could not write fingerprint store {self.path}: {e}")
+
+
+# Shared store used by smart_click()
+fingerprint_store = FingerprintStore()
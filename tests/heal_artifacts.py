@@ -0,0 +1,147 @@
+"""
+Content-addressed store for large heal payloads.
+
+Heals used to log the full HTML context sent to the model at INFO, so every
+heal wrote tens of kilobytes to automation_flow.log on the test thread, and the
+same context healed five times was written five times. Large payloads (HTML
+contexts, prompts, raw model responses) now go here instead:
+
+- each payload is stored once, gzip-compressed, under the SHA-256 of its content
+  (.heal_telemetry/artifacts/<ab>/<sha>.<kind>.gz); storing it again is a no-op
+- the hash is computed on the calling thread, but compression and the write
+  happen on a background thread, so the caller only pays for hashing
+- log lines carry a short reference (artifact:<kind>:<hash prefix>), which
+  artifact_path() or `ls .heal_telemetry/artifacts/*/<prefix>*` resolves
+- prune() keeps the store under a size cap (oldest files removed first)
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_DIR = os.environ.get("HEAL_ARTIFACT_DIR", os.path.join(".heal_telemetry", "artifacts"))
+
+# Total size the store is pruned to at the end of a session
+ARTIFACT_MAX_BYTES = int(os.environ.get("HEAL_ARTIFACT_MAX_BYTES", str(200 * 1024 * 1024)))
+
+# Hex digits of the hash shown in log references
+REFERENCE_LENGTH = 16
+
+
+class ArtifactStore:
+    """Write-once, gzip-compressed files named by the SHA-256 of their content."""
+
+    def __init__(self, directory=ARTIFACT_DIR):
+        """
+        Args:
+            directory (str): Root directory of the store
+        """
+        self.directory = directory
+        self._known = set()
+        self._lock = threading.Lock()
+        # One writer thread: writes stay ordered and flush() can wait for all of them
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="heal-artifacts")
+
+    def path_for(self, digest, kind):
+        """File a payload with the given hash and kind is stored in."""
+        return os.path.join(self.directory, digest[:2], f"{digest}.{kind}.gz")
+
+    def put(self, content, kind="html"):
+        """
+        Store a payload (once) and return its log reference.
+
+        Args:
+            content (str): Payload to store
+            kind (str): Payload type, used as the file extension ("html", "prompt", "response")
+
+        Returns:
+            str: Reference of the form artifact:<kind>:<hash prefix>
+        """
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            new = (digest, kind) not in self._known
+            self._known.add((digest, kind))
+        if new:
+            self._writer.submit(self._write, self.path_for(digest, kind), data)
+        return f"artifact:{kind}:{digest[:REFERENCE_LENGTH]}"
+
+    @staticmethod
+    def _write(path, data):
+        # Another worker (or an earlier run) may have stored it already
+        if os.path.exists(path):
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with gzip.open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not store heal artifact {path}: {e}")
+
+    def flush(self):
+        """Block until every queued write has finished."""
+        self._writer.submit(lambda: None).result()
+
+    def prune(self, max_bytes=ARTIFACT_MAX_BYTES):
+        """
+        Delete the oldest artifacts until the store fits in max_bytes.
+
+        Returns:
+            int: Number of files deleted
+        """
+        self.flush()
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        deleted = 0
+        for _, size, path in sorted(files):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            deleted += 1
+        with self._lock:
+            self._known.clear()
+        return deleted
+
+
+def artifact_path(reference, directory=ARTIFACT_DIR):
+    """
+    Resolve a log reference to the file it points at.
+
+    Args:
+        reference (str): artifact:<kind>:<hash prefix> from a log line
+        directory (str): Root directory of the store
+
+    Returns:
+        str | None: Path of the stored artifact, or None if it is not (or no longer) stored
+    """
+    _, kind, prefix = reference.split(":", 2)
+    bucket = os.path.join(directory, prefix[:2])
+    if not os.path.isdir(bucket):
+        return None
+    for name in os.listdir(bucket):
+        if name.startswith(prefix) and name.endswith(f".{kind}.gz"):
+            return os.path.join(bucket, name)
+    return None
+
+
+# Shared store used by the heal path
+artifacts = ArtifactStore()
@@ -0,0 +1,233 @@
+"""
+Local healing broker shared by parallel test workers.
+
+When the suite is sharded with pytest-xdist every worker used to call Ollama on
+its own, so the same broken selector healed by 16 workers meant 16 identical
+multi-second model calls queued on one server. The broker sits between the
+workers and Ollama:
+
+- identical in-flight heal requests are merged into a single model call
+  (single-flight) and the result is fanned out to every waiter
+- model calls share one pooled HTTP connection (ollama.AsyncClient)
+- a semaphore limits concurrent model calls, and once the number of distinct
+  queued requests reaches max_queue_depth new ones are told to back off
+- every request carries the client's remaining timeout; a model call is
+  abandoned at the deadline of the request that started it, so a hung Ollama
+  request does not hold its single-flight slot for every later waiter
+
+Run it before the workers and point them at it:
+
+    python -m tests.heal_broker --address 127.0.0.1:8765
+    HEAL_BROKER_ADDRESS=127.0.0.1:8765 pytest -n 16
+
+Requests and responses are newline-delimited JSON (see heal_broker_client).
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import socket
+import ollama
+from tests.ai_utils import HEAL_MODEL, build_heal_prompt, generation_options, parse_response, selectors_complete
+from tests.model_backends import MODEL_KEEP_ALIVE, stream_generate_async
+from tests.heal_broker_client import DEFAULT_TIMEOUT, parse_address
+
+logger = logging.getLogger(__name__)
+
+# Longest request line accepted (heal contexts are whole HTML regions; asyncio's default limit is 64 KiB)
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+
+
+class BrokerBusy(Exception):
+    """Raised when the queue of distinct pending heals is full."""
+
+
+class HealBroker:
+    """Deduplicating, back-pressured proxy in front of the Ollama server."""
+
+    def __init__(self, ollama_host=None, model=HEAL_MODEL, max_concurrent=2, max_queue_depth=32):
+        """
+        Args:
+            ollama_host (str): Ollama server URL (None uses the client's default / OLLAMA_HOST)
+            model (str): Model used for healing
+            max_concurrent (int): Maximum number of model calls running at once
+            max_queue_depth (int): Maximum number of distinct heals queued or running
+        """
+        self.ollama_host = ollama_host
+        self.model = model
+        self.max_concurrent = max_concurrent
+        self.max_queue_depth = max_queue_depth
+        self.requests = 0
+        self.model_calls = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self._inflight = {}
+        self._client = None
+        self._semaphore = None
+        self._server = None
+
+    def stats(self):
+        """
+        Returns:
+            dict: Request, model-call, dedup and rejection counters plus current queue depth
+        """
+        return {
+            "requests": self.requests,
+            "model_calls": self.model_calls,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+            "queue_depth": len(self._inflight),
+        }
+
+    async def heal(self, broken_selector, html_snippet, desc, count=1, model=None, context_kind="html",
+                   timeout=DEFAULT_TIMEOUT):
+        """
+        Heal a selector, sharing the model call with identical in-flight requests.
+
+        Args:
+            broken_selector (str): The original selector that failed to find the element
+            html_snippet (str): HTML context containing the target element
+            desc (str): Human-readable description of the element to locate
+            count (int): Number of ranked candidate selectors to ask for
+            model (str): Model to heal with (None for the broker's model)
+            context_kind (str): "html", or "aria" for an accessibility-tree snapshot context
+            timeout (float): Seconds this request may wait; a model call it starts is also
+                abandoned after this long, whoever else is waiting for it
+
+        Returns:
+            list[str]: Healed selector(s), best first
+
+        Raises:
+            BrokerBusy: If max_queue_depth distinct heals are already pending
+            TimeoutError: If no answer was ready within timeout
+        """
+        self.requests += 1
+        model = model or self.model
+        prompt, system = build_heal_prompt(broken_selector, html_snippet, desc, count, context_kind)
+        key = hashlib.sha256(f"{model}\0{system}\0{prompt}".encode("utf-8")).hexdigest()
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.deduplicated += 1
+        else:
+            if len(self._inflight) >= self.max_queue_depth:
+                self.rejected += 1
+                raise BrokerBusy()
+            # The model call runs as its own task so a disconnecting waiter cannot cancel it for the others
+            task = asyncio.ensure_future(
+                asyncio.wait_for(self._generate(model, prompt, system, broken_selector, count), timeout))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError as e:
+            raise TimeoutError(f"No answer for {desc} within {timeout:.1f} s") from e
+
+    async def _generate(self, model, prompt, system, broken_selector, count):
+        """Run one model call, bounded by the concurrency semaphore."""
+        async with self._semaphore:
+            self.model_calls += 1
+            response = await stream_generate_async(
+                self._client,
+                lambda text: selectors_complete(text, broken_selector, count),
+                model=model,
+                prompt=prompt,
+                options=generation_options(count),
+                system=system,
+                keep_alive=MODEL_KEEP_ALIVE,
+            )
+        selectors = parse_response(response['response'], broken_selector, count)
+        logger.info(f"Broker healed selector(s): {selectors}")
+        return selectors
+
+    async def _handle_connection(self, reader, writer):
+        """Serve newline-delimited JSON requests on one client connection."""
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError as e:
+                    # Over MAX_REQUEST_BYTES; the stream cannot be resynchronised, so answer and hang up
+                    logger.error(f"Broker request too large: {e}")
+                    error = {"error": f"request larger than {MAX_REQUEST_BYTES} bytes"}
+                    writer.write(json.dumps(error).encode("utf-8") + b"\n")
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                request = json.loads(line)
+                if request.get("op") == "stats":
+                    response = self.stats()
+                else:
+                    try:
+                        response = {"selectors": await self.heal(
+                            request["broken_selector"], request["html_snippet"], request["desc"],
+                            request.get("count", 1), request.get("model"), request.get("context_kind", "html"),
+                            request.get("timeout", DEFAULT_TIMEOUT))}
+                    except BrokerBusy:
+                        response = {"error": "busy"}
+                    except TimeoutError as e:
+                        logger.warning(f"Broker heal timed out: {e}")
+                        response = {"error": str(e), "timeout": True}
+                    except Exception as e:
+                        logger.error(f"Broker heal failed: {e}")
+                        response = {"error": str(e)}
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError) as e:
+            logger.warning(f"Dropping broker connection: {e}")
+        finally:
+            writer.close()
+
+    async def start(self, address):
+        """
+        Start listening (must be called from the event loop that will serve requests).
+
+        Args:
+            address (str): "host:port" or "unix:/path/to/socket"
+        """
+        # One pooled HTTP client for every model call made through this broker
+        self._client = ollama.AsyncClient(host=self.ollama_host)
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        family, sock_address = parse_address(address)
+        if family == socket.AF_UNIX:
+            if os.path.exists(sock_address):
+                os.unlink(sock_address)
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=sock_address,
+                                                           limit=MAX_REQUEST_BYTES)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, *sock_address, limit=MAX_REQUEST_BYTES)
+        logger.info(f"Healing broker listening on {address}")
+        return self._server
+
+    async def close(self):
+        """Stop accepting connections and wait for the server to close."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+
+async def _serve(args):
+    broker = HealBroker(
+        ollama_host=args.ollama_host,
+        model=args.model,
+        max_concurrent=args.max_concurrent,
+        max_queue_depth=args.max_queue_depth,
+    )
+    server = await broker.start(args.address)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local healing broker for parallel test workers")
+    parser.add_argument("--address", default="127.0.0.1:8765", help='"host:port" or "unix:/path/to/socket"')
+    parser.add_argument("--ollama-host", default=None, help="Ollama server URL")
+    parser.add_argument("--model", default=HEAL_MODEL)
+    parser.add_argument("--max-concurrent", type=int, default=2)
+    parser.add_argument("--max-queue-depth", type=int, default=32)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(name)-25s | %(levelname)-8s | %(message)s')
+    asyncio.run(_serve(parser.parse_args()))
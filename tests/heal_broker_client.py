@@ -0,0 +1,150 @@
+"""
+Client side of the local healing broker (see heal_broker).
+
+When HEAL_BROKER_ADDRESS is set, get_healed_selector() sends heal requests to
+the broker instead of calling Ollama directly, so identical heals from many
+pytest-xdist workers collapse into one model call. The address is either
+"host:port" or "unix:/path/to/socket".
+"""
+
+import asyncio
+import json
+import os
+import socket
+import time
+
+# Broker address shared by all workers; empty means "call Ollama directly"
+BROKER_ADDRESS = os.environ.get("HEAL_BROKER_ADDRESS", "")
+
+# Seconds to wait for a heal before giving up (model calls can take a while)
+DEFAULT_TIMEOUT = 180.0
+
+# Back-off while the broker reports its queue is full
+BUSY_RETRY_DELAY = 0.25
+
+
+class BrokerError(RuntimeError):
+    """The broker answered, but could not heal the selector."""
+
+
+class BrokerTimeout(BrokerError):
+    """
+    The deadline passed before the broker answered.
+
+    Not a TimeoutError: that is an OSError, which callers take to mean the
+    broker is unreachable and call the model directly.
+    """
+
+
+def parse_address(address):
+    """
+    Split a broker address into a socket family and address.
+
+    Args:
+        address (str): "host:port" or "unix:/path/to/socket"
+
+    Returns:
+        tuple: (socket family, address usable with that family)
+    """
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def _encode_request(broken_selector, html_snippet, desc, count, model, context_kind, timeout):
+    # The broker abandons the model call at the same deadline
+    payload = {"op": "heal", "broken_selector": broken_selector, "html_snippet": html_snippet,
+               "desc": desc, "count": count, "model": model, "context_kind": context_kind, "timeout": timeout}
+    return json.dumps(payload).encode("utf-8") + b"\n"
+
+
+def _decode_response(line):
+    """Return the healed selectors, None if the broker is busy, or raise BrokerError (BrokerTimeout)."""
+    if not line:
+        raise ConnectionError("Healing broker closed the connection")
+    response = json.loads(line)
+    if response.get("error") == "busy":
+        return None
+    if response.get("timeout"):
+        raise BrokerTimeout(response["error"])
+    if "error" in response:
+        raise BrokerError(response["error"])
+    return response["selectors"]
+
+
+def request_heal(broken_selector, html_snippet, desc, count=1, address=BROKER_ADDRESS, timeout=DEFAULT_TIMEOUT,
+                 model=None, context_kind="html"):
+    """
+    Ask the broker for healed selectors, retrying while it applies back-pressure.
+
+    Args:
+        broken_selector (str): The original selector that failed to find the element
+        html_snippet (str): HTML context containing the target element
+        desc (str): Human-readable description of the element to locate
+        count (int): Number of ranked candidate selectors to ask for
+        address (str): Broker address ("host:port" or "unix:/path")
+        timeout (float): Overall deadline in seconds
+        model (str): Model to heal with (None for the broker's default)
+        context_kind (str): "html", or "aria" for an accessibility-tree snapshot context
+
+    Returns:
+        list[str]: Healed selector(s), best first
+
+    Raises:
+        OSError: If the broker cannot be reached (callers fall back to Ollama)
+        BrokerError: If the broker's model call failed
+        BrokerTimeout: If the broker accepted the request but did not answer before the deadline
+            (or gave up on its model call at that deadline)
+    """
+    family, sock_address = parse_address(address)
+    deadline = time.monotonic() + timeout
+    while True:
+        request = _encode_request(broken_selector, html_snippet, desc, count, model, context_kind,
+                                  max(deadline - time.monotonic(), 0.1))
+        with socket.socket(family, socket.SOCK_STREAM) as sock:
+            sock.settimeout(max(deadline - time.monotonic(), 0.1))
+            sock.connect(sock_address)
+            try:
+                sock.sendall(request)
+                with sock.makefile("rb") as stream:
+                    selectors = _decode_response(stream.readline())
+            except socket.timeout:
+                # The broker has the request and its model call is still running; calling
+                # the model directly now would duplicate the work single-flight saves
+                raise BrokerTimeout("Healing broker did not answer before the deadline")
+        if selectors is not None:
+            return selectors
+        if time.monotonic() + BUSY_RETRY_DELAY > deadline:
+            raise BrokerTimeout("Healing broker stayed busy until the deadline")
+        time.sleep(BUSY_RETRY_DELAY)
+
+
+async def request_heal_async(broken_selector, html_snippet, desc, count=1, address=BROKER_ADDRESS,
+                             timeout=DEFAULT_TIMEOUT, model=None, context_kind="html"):
+    """Async version of request_heal() (same arguments, result and errors)."""
+    family, sock_address = parse_address(address)
+    deadline = time.monotonic() + timeout
+
+    async def _exchange():
+        while True:
+            request = _encode_request(broken_selector, html_snippet, desc, count, model, context_kind,
+                                      max(deadline - time.monotonic(), 0.1))
+            if family == socket.AF_UNIX:
+                reader, writer = await asyncio.open_unix_connection(sock_address)
+            else:
+                reader, writer = await asyncio.open_connection(*sock_address)
+            try:
+                writer.write(request)
+                await writer.drain()
+                selectors = _decode_response(await reader.readline())
+            finally:
+                writer.close()
+            if selectors is not None:
+                return selectors
+            await asyncio.sleep(BUSY_RETRY_DELAY)
+
+    try:
+        return await asyncio.wait_for(_exchange(), timeout)
+    except asyncio.TimeoutError:
+        raise BrokerTimeout("Healing broker did not answer before the deadline")
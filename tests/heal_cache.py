@@ -0,0 +1,221 @@
+"""
+Two-level cache for AI-healed selectors.
+
+Healing a selector means a full Ollama round trip, which costs seconds. The same
+broken selector is usually healed against the same markup many times a day, so
+this module remembers validated heals:
+
+- Level 1: an in-process LRU (OrderedDict) for repeat heals within a session
+- Level 2: a JSON file on disk shared between sessions and pytest workers
+  (updated under a cross-process lock, re-read before every change, so
+  workers healing at the same time keep each other's entries)
+
+Entries are keyed by (broken selector, description, DOM fingerprint), the
+fingerprint being a hash of the normalized HTML context the selector was healed
+against. Variants of the same page (logged in or not, A/B layouts) therefore
+each keep their own entry instead of evicting each other, and a lookup against
+markup no heal has seen yet is a plain miss. Callers are expected to validate a
+cached selector against the live page and call invalidate() when it no longer
+matches.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from tests.shared_files import file_lock, write_atomic
+
+logger = logging.getLogger(__name__)
+
+# Default location of the on-disk store (overridable for CI / per-worker runs)
+DEFAULT_CACHE_PATH = os.environ.get("HEAL_CACHE_PATH", os.path.join(".heal_cache", "healed_selectors.json"))
+
+# Maximum number of entries kept in memory and on disk respectively
+DEFAULT_MEMORY_SIZE = 256
+DEFAULT_DISK_SIZE = 2048
+
+
+def dom_fingerprint(html_snippet):
+    """
+    Compute a stable fingerprint of an HTML context.
+
+    The markup is normalized before hashing so that whitespace changes and
+    volatile numeric tokens (timestamps, session ids, ad slot counters) do not
+    invalidate an otherwise identical context.
+
+    Args:
+        html_snippet (str): HTML context the selector was healed against
+
+    Returns:
+        str: Hex digest identifying the normalized context
+    """
+    normalized = re.sub(r">\s+<", "><", html_snippet or "")
+    normalized = re.sub(r"\s+", " ", normalized)
+    normalized = re.sub(r"\d{4,}", "#", normalized)
+    return hashlib.sha256(normalized.strip().lower().encode("utf-8")).hexdigest()[:32]
+
+
+class HealCache:
+    """In-process LRU backed by a JSON file on disk."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, memory_size=DEFAULT_MEMORY_SIZE, disk_size=DEFAULT_DISK_SIZE):
+        """
+        Args:
+            path (str): Location of the on-disk store, or None for memory only
+            memory_size (int): Maximum number of entries in the in-process LRU
+            disk_size (int): Maximum number of entries persisted to disk
+        """
+        self.path = path
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self._memory = OrderedDict()
+        self._disk = {}
+        self._disk_mtime = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(broken_selector, desc, fingerprint):
+        return f"{broken_selector}\x1f{desc}\x1f{fingerprint}"
+
+    def get(self, broken_selector, desc, fingerprint):
+        """
+        Look up a previously healed selector.
+
+        Args:
+            broken_selector (str): Selector that failed to match
+            desc (str): Human-readable description of the element
+            fingerprint (str): dom_fingerprint() of the current HTML context
+
+        Returns:
+            str | None: Cached healed selector, or None on a miss
+        """
+        key = self._key(broken_selector, desc, fingerprint)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                # Not in memory - fall back to the shared on-disk store
+                self._reload_disk()
+                entry = self._disk.get(key)
+                if entry is not None:
+                    self._remember(key, entry)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return entry["healed_selector"]
+
+    def put(self, broken_selector, desc, fingerprint, healed_selector):
+        """
+        Store a healed selector that has been validated against the live page.
+
+        Args:
+            broken_selector (str): Selector that failed to match
+            desc (str): Human-readable description of the element
+            fingerprint (str): dom_fingerprint() of the HTML context it was healed against
+            healed_selector (str): Selector that successfully located the element
+        """
+        key = self._key(broken_selector, desc, fingerprint)
+        entry = {"fingerprint": fingerprint, "healed_selector": healed_selector, "stored_at": time.time()}
+        with self._lock:
+            self._remember(key, entry)
+            self._update_disk(lambda disk: self._store(disk, key, entry))
+
+    def invalidate(self, broken_selector, desc, fingerprint):
+        """
+        Evict an entry whose cached selector failed validation on the live page.
+
+        Args:
+            broken_selector (str): Selector that failed to match
+            desc (str): Human-readable description of the element
+            fingerprint (str): dom_fingerprint() of the HTML context the entry was looked up with
+        """
+        key = self._key(broken_selector, desc, fingerprint)
+        with self._lock:
+            in_memory = self._memory.pop(key, None) is not None
+            on_disk = self._update_disk(lambda disk: disk.pop(key, None) is not None)
+            if in_memory or on_disk:
+                self.evictions += 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: Hit/miss/eviction counters and current in-memory size
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._memory),
+            }
+
+    def _remember(self, key, entry):
+        """Insert into the in-memory LRU, evicting the least recently used entry if full."""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _store(self, disk, key, entry):
+        """Add an entry to the on-disk store, dropping the oldest so it stays bounded; returns True."""
+        disk[key] = entry
+        if len(disk) > self.disk_size:
+            oldest = sorted(disk, key=lambda k: disk[k]["stored_at"])
+            for stale_key in oldest[: len(disk) - self.disk_size]:
+                del disk[stale_key]
+                self.evictions += 1
+        return True
+
+    def _reload_disk(self, force=False):
+        """Re-read the on-disk store if another process has written it since our last read."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        mtime = os.path.getmtime(self.path)
+        if mtime == self._disk_mtime and not force:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._disk = json.load(f)
+            self._disk_mtime = mtime
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read heal cache {self.path}: {e}")
+
+    def _update_disk(self, update):
+        """
+        Apply update(disk) to the latest on-disk store and write it back if it returns True.
+
+        Holds the store's cross-process lock from the re-read to the write, so an
+        entry another worker stored meanwhile is kept rather than overwritten.
+
+        Returns:
+            bool: What update returned (False if the lock could not be taken)
+        """
+        if not self.path:
+            return update(self._disk)
+        changed = False
+        try:
+            with file_lock(f"{self.path}.lock"):
+                # mtime has a coarse resolution; under the lock the file is re-read regardless
+                self._reload_disk(force=True)
+                changed = update(self._disk)
+                if changed:
+                    write_atomic(self.path, json.dumps(self._disk))
+                    self._disk_mtime = os.path.getmtime(self.path)
+        except OSError as e:
+            logger.warning(f"Could not write heal cache {self.path}: {e}")
+        return changed
+
+
+# Shared cache used by smart_click()
+heal_cache = HealCache()
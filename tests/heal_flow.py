@@ -0,0 +1,275 @@
+"""
+Shared, I/O-free steps of the smart_click() heal flow.
+
+ui_element_action_wrapper (sync Playwright) and async_ui_element_action_wrapper
+(playwright.async_api) run the same heal flow and differ only in whether their
+browser and model calls are awaited. Everything in between lives here, so both
+wrappers stay a thin sequence of I/O calls around these helpers:
+
+- circuit-breaker and adaptive-timeout bookkeeping around the original selector
+  (including the bypass to its healed selector and the fallback after a failed probe)
+- the fingerprint-match decision
+- heal context assembly (compaction, change hint, cache fingerprint) and logging
+- heal cache lookups and stores, and the rule-based/ARIA fallback candidates
+- reading the in-page resolver's validation result
+"""
+
+import json
+import logging
+import time
+from tests.aria_context import aria_candidates
+from tests.dom_tracker import changes_hint
+from tests.element_fingerprint import CONFIDENCE_THRESHOLD, fingerprint_store
+from tests.heal_artifacts import artifacts
+from tests.heal_cache import heal_cache, dom_fingerprint
+from tests.heal_telemetry import record_outcome
+from tests.html_compactor import compact_html, estimate_tokens
+from tests.selector_candidates import CLICKABLE_CSS, CLICKABLE_ROLES, CLICKABLE_TAGS, rule_based_candidates
+from tests.selector_health import selector_health
+
+logger = logging.getLogger(__name__)
+
+# Playwright locator for the nearest clickable ancestor of a non-clickable match (a match without
+# one is not clicked); tags in CLICKABLE_TAGS are clicked as they are
+CLICKABLE_ANCESTOR_XPATH = "xpath=ancestor::*[{}][1]".format(" or ".join(
+    [f"self::{tag}" for tag in sorted(CLICKABLE_TAGS)] + [f"@role='{role}'" for role in sorted(CLICKABLE_ROLES)]))
+
+# Tag, text (content and aria-label) and whether a Playwright match is or sits in a clickable element
+MATCH_INFO_JS = """el => ({
+    tag: el.tagName.toLowerCase(),
+    text: `${el.textContent} ${el.getAttribute('aria-label') || ''}`,
+    clickable: !!el.closest(__CLICKABLE__),
+})""".replace("__CLICKABLE__", json.dumps(CLICKABLE_CSS))
+
+# Timeout for clicks on validated (healed) selectors
+HEALED_CLICK_TIMEOUT_MS = 3000
+
+
+class HealContext:
+    """Context a heal sends to the model, and the fingerprint its cache entry is keyed by."""
+
+    __slots__ = ("kind", "focused_html", "model_html", "fingerprint")
+
+    def __init__(self, kind, focused_html, model_html):
+        self.kind = kind
+        self.focused_html = focused_html
+        self.model_html = model_html
+        self.fingerprint = dom_fingerprint(focused_html)
+
+
+def circuit_bypass(selector, desc):
+    """
+    Healed selector to click instead of a known-broken one.
+
+    Returns:
+        str | None: The last good healed selector while the circuit is open, else None
+    """
+    bypass = selector_health.bypass_selector(selector, desc)
+    if bypass is not None:
+        logger.info(f"CIRCUIT OPEN: Skipping {selector} for {desc}; using healed selector {bypass}")
+    return bypass
+
+
+def probe_fallback(selector, desc):
+    """
+    Healed selector to click after a failed probe of a known-broken selector.
+
+    Returns:
+        str | None: The last good healed selector while the circuit is open, else None (heal as usual)
+    """
+    healed = selector_health.healed_selector(selector, desc)
+    if healed is not None:
+        logger.info(f"Probe of {selector} for {desc} failed; using healed selector {healed}")
+    return healed
+
+
+def bypass_timeout(selector, desc, max_timeout=None):
+    """Adaptive timeout (ms, at most max_timeout) to wait for a bypass selector to become visible."""
+    return selector_health.timeout_for(selector, desc, max_timeout)
+
+
+def bypass_failed(selector, desc, bypass):
+    """Forget a healed selector that no longer works while the circuit is open."""
+    logger.warning(f"Healed selector {bypass} for {desc} stopped working; healing again")
+    selector_health.forget_heal(selector, desc)
+
+
+def begin_attempt(selector, desc, max_timeout=None):
+    """
+    Start an attempt on the original selector.
+
+    Args:
+        selector (str): Original selector
+        desc (str): Human-readable description of the element
+        max_timeout (int): Ceiling for the adaptive timeout (ms; None for selector_health's default)
+
+    Returns:
+        tuple[int, float, bool]: Timeout in ms, start time (perf_counter) and whether the
+        element's fingerprint should be recorded with this click
+    """
+    timeout = selector_health.timeout_for(selector, desc, max_timeout)
+    logger.info(f"Attempting click on: {desc} (Selector: {selector}, timeout {timeout} ms)")
+    return timeout, time.perf_counter(), fingerprint_store.needs_recording(selector, desc)
+
+
+def elapsed_ms(started):
+    """Milliseconds since a perf_counter() start time."""
+    return (time.perf_counter() - started) * 1000
+
+
+def attempt_succeeded(selector, desc, started, element_fingerprint=None):
+    """Record a successful click on the original selector (and the element's fingerprint, if taken)."""
+    if element_fingerprint is not None:
+        fingerprint_store.put(selector, desc, element_fingerprint)
+    selector_health.record_success(selector, desc, elapsed_ms(started))
+
+
+def attempt_failed(selector, desc):
+    """Record a timeout on the original selector (counts towards opening its circuit)."""
+    selector_health.record_failure(selector, desc)
+
+
+def heal_finished(selector, desc, healed_selector):
+    """Remember the selector a heal clicked, so an open circuit can go straight to it."""
+    if healed_selector is not None:
+        selector_health.record_heal(selector, desc, healed_selector)
+
+
+def stored_fingerprint(selector, desc):
+    """Fingerprint recorded the last time the original selector was clicked, or None."""
+    return fingerprint_store.get(selector, desc)
+
+
+def fingerprint_match_accepted(desc, match_score, match_selector):
+    """
+    Whether the best fingerprint match is confident enough to click without the model.
+
+    Args:
+        desc (str): Human-readable description of the element
+        match_score (float): Score of the best match (see element_fingerprint.best_match())
+        match_selector (str | None): Its unique selector (None if no candidate was unambiguous)
+
+    Returns:
+        bool: True if match_selector should be clicked
+    """
+    if match_selector and match_score >= CONFIDENCE_THRESHOLD:
+        logger.info(f"FINGERPRINT HEAL: Clicking {desc} with {match_selector} (score {match_score:.2f})")
+        return True
+    logger.info(f"Fingerprint match for {desc} not confident enough ({match_score:.2f}); asking AI model")
+    return False
+
+
+def build_context(anchor_result, desc, aria_snapshot=None, include_changes=True):
+    """
+    Assemble the model context from a resolver result.
+
+    Role selectors heal from the accessibility-tree snapshot when one could be taken;
+    otherwise the resolver's HTML is compacted to the prompt's token budget and, with
+    include_changes, followed by a hint of what changed since the last click (a moved
+    element often shows up there).
+
+    Args:
+        anchor_result (dict): resolve(..., desc=..., selector=...) result
+        desc (str): Human-readable description of the element
+        aria_snapshot (str | None): aria_context() snapshot, for role selectors
+        include_changes (bool): Append the DOM tracker's change hint to HTML contexts
+
+    Returns:
+        HealContext: The context to send
+    """
+    if aria_snapshot is not None:
+        return HealContext("aria", aria_snapshot, aria_snapshot)
+    focused_html = compact_html(anchor_result["context"], desc)
+    change_hint = changes_hint(anchor_result.get("changes"), desc) if include_changes else None
+    return HealContext("html", focused_html, f"{focused_html}\n{change_hint}" if change_hint else focused_html)
+
+
+def log_context(anchor_result, context, desc):
+    """Log a reference to the context sent to the model (stored once, off the test thread)."""
+    if not anchor_result["anchorFound"]:
+        logger.warning(f"No element on the page matched: {desc}. Falling back to page content.")
+    logger.info(
+        f"{'Accessibility tree' if context.kind == 'aria' else 'HTML'} sent to the model "
+        f"({len(anchor_result['context'] or '')} chars of HTML reduced to "
+        f"~{estimate_tokens(context.model_html)} tokens): {artifacts.put(context.model_html, context.kind)}"
+    )
+    logger.warning(f"TIMEOUT: {desc} failed. Starting self-healing...")
+
+
+def cached_heal(selector, desc, context):
+    """
+    Previous heal of the same selector against the same DOM, if any.
+
+    Returns:
+        str | None: Cached healed selector (still to be validated against the live page)
+    """
+    cached = heal_cache.get(selector, desc, context.fingerprint)
+    if cached is not None:
+        logger.info(f"CACHE HIT: Reusing healed selector for {desc}: {cached}")
+    return cached
+
+
+def discard_cached_heal(selector, desc, context, cached):
+    """Evict a cached heal that no longer matches the live page."""
+    logger.info(f"Cached selector {cached} no longer matches; discarding it")
+    heal_cache.invalidate(selector, desc, context.fingerprint)
+
+
+def fallback_candidates(selector, desc, context):
+    """Non-model candidates for a heal: role/name selectors for ARIA contexts, rule-based CSS for HTML."""
+    if context.kind == "aria":
+        return aria_candidates(context.model_html, desc, selector)
+    return rule_based_candidates(context.model_html, desc, selector)
+
+
+def log_retry(desc, candidates):
+    """Log a batch of candidates about to be validated and clicked."""
+    logger.info(f"RETRYING: Clicking {desc} with {len(candidates)} candidate selectors: {candidates}")
+
+
+def heal_succeeded(selector, desc, fingerprint, healed_selector, outcome):
+    """Cache a heal proven against the live page and record how it was found."""
+    heal_cache.put(selector, desc, fingerprint, healed_selector)
+    record_outcome(outcome)
+
+
+def heal_failed(desc, candidates):
+    """Log a heal where none of the candidates led to a successful click."""
+    logger.error(f"RETRY FAILED: {desc} with healed selectors: {candidates}")
+
+
+def log_validation(result):
+    """Log the resolver's verdict on each candidate selector."""
+    for check in result["candidates"]:
+        logger.info(
+            f"Candidate {check['selector']}: {check['count']} matches, {check['visible']} visible, "
+            f"unique={check['unique']}, clickable={check['clickable']}"
+        )
+
+
+def playwright_only_candidates(result):
+    """Candidates the browser could not evaluate as CSS (role=/text= engines), in priority order."""
+    return [check["selector"] for check in result["candidates"] if "error" in check]
+
+
+def playwright_match_accepted(candidate, desc, count, info):
+    """
+    Whether a Playwright-only candidate may be clicked (the resolver's rule for CSS candidates).
+
+    Args:
+        candidate (str): Candidate selector
+        desc (str): Human-readable description of the element
+        count (int): Elements the candidate matches
+        info (dict): MATCH_INFO_JS result for its first match
+
+    Returns:
+        bool: True if the first match is clickable (or inside a clickable element) and the
+        candidate is unique or its first match holds the description
+    """
+    if not info["clickable"]:
+        logger.info(f"Candidate {candidate} matches nothing clickable; skipping it")
+        return False
+    if count == 1 or " ".join(desc.split()).lower() in " ".join(info["text"].split()).lower():
+        return True
+    logger.info(f"Candidate {candidate} matches {count} elements and the first is not {desc}; skipping it")
+    return False
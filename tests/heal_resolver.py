@@ -0,0 +1,308 @@
+"""
+In-page healing resolver.
+
+The heal path used to make a separate Playwright-to-browser round trip for every
+step: locating the text anchor, reading its parent's HTML, building the healed
+locator, reading its tag name, looking up a clickable ancestor and finally
+clicking. On remote or slow browsers each of those costs tens of milliseconds.
+
+This module injects a small resolver (window.__healResolver) into every page
+of a browser context via an init script. A single evaluate() call then:
+
+- ranks the page's interactive elements against the element description and
+  the broken selector's tokens (BM25 over text, accessible names, ids and
+  classes) and serializes the regions around the top-k (or, with top_k=0, the
+  parent of the first element whose text contains the description); the page
+  body is used when nothing matches. Serialization goes through the
+  incremental DOM tracker when it is installed (see dom_tracker)
+- optionally returns what changed since the last click
+- validates any number of candidate selectors (existence, uniqueness,
+  visibility, clickability); a candidate matching several elements is only
+  accepted if its first match holds the target text
+- walks up from the first valid match to the nearest clickable ancestor
+  (a/button/input/label/select/summary and their ARIA roles); a match with
+  no clickable ancestor is not clickable
+- returns a stable selector that uniquely identifies that clickable element
+"""
+
+import json
+import logging
+import os
+from tests.element_fingerprint import FINGERPRINT_FUNCTIONS_JS
+from tests.dom_tracker import TRACKER_JS
+from tests.selector_candidates import CLICKABLE_CSS
+
+logger = logging.getLogger(__name__)
+
+# Characters of <body> HTML returned when no text anchor is found
+# (html_compactor reduces this to the prompt's token budget)
+FALLBACK_CONTEXT_LIMIT = 500000
+
+# Ranked regions serialized into the heal context (0 = first text anchor only)
+RETRIEVAL_TOP_K = int(os.environ.get("HEAL_RETRIEVAL_TOP_K", "3"))
+
+# A ranked element's parent is used as its region unless it serializes larger than this
+REGION_CHAR_LIMIT = 4000
+
+# Interactive elements scored per page, in document order
+MAX_RANKED_ELEMENTS = 3000
+
+# Selector syntax that says nothing about the element
+SELECTOR_NOISE_TOKENS = ["internal", "nth", "child", "type", "of", "has", "text", "name", "exact", "true"]
+
+# Installed once per page (idempotent, so re-injecting is harmless)
+RESOLVER_JS = f"""(() => {{
+    if (window.__healResolver) return;
+    {FINGERPRINT_FUNCTIONS_JS}
+    const CLICKABLE = {json.dumps(CLICKABLE_CSS)};
+    const SKIP = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE', 'HEAD']);
+    const normalize = text => (text || '').replace(/\\s+/g, ' ').trim().toLowerCase();
+    const isVisible = el => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    // Cached, compacted serialization when the DOM tracker is installed
+    const serializeContext = el => window.__domTracker ? window.__domTracker.serialize(el) : el.outerHTML;
+
+    // Deepest element (first in document order) whose text contains the description,
+    // mirroring page.get_by_text(desc, exact=False).first
+    const findAnchor = desc => {{
+        const query = normalize(desc);
+        if (!query || !document.body) return null;
+        let anchor = null;
+        let parent = document.body;
+        while (parent) {{
+            let next = null;
+            for (const child of parent.children) {{
+                if (!SKIP.has(child.tagName) && normalize(child.textContent).includes(query)) {{
+                    next = child;
+                    break;
+                }}
+            }}
+            if (next) anchor = next;
+            parent = next;
+        }}
+        return anchor;
+    }};
+
+    // --- Ranked retrieval: BM25 over the page's interactive elements ---
+    const INTERACTIVE = 'a, button, input, select, textarea, label, summary, [role], [tabindex], [onclick]';
+    const STOP = new Set(['the', 'an', 'to', 'of', 'and', 'or', 'in', 'on', 'for', 'by', 'with', 'is', 'it']);
+    const SELECTOR_NOISE = new Set({json.dumps(SELECTOR_NOISE_TOKENS)});
+    // Words plus camelCase/kebab/snake fragments, so ids and classes match description words
+    const tokenize = text => (text || '').replace(/([a-z])([A-Z])/g, '$1 $2').toLowerCase()
+        .split(/[^a-z0-9]+/).filter(t => t.length > 1 && !STOP.has(t));
+
+    const elementTerms = el => {{
+        const attr = name => el.getAttribute(name) || '';
+        let text = (el.textContent || '').slice(0, 200);
+        // Icon-only controls are described by their surroundings
+        if (!text.trim() && el.parentElement) text = (el.parentElement.textContent || '').slice(0, 100);
+        const labels = el.labels ? Array.from(el.labels, l => l.textContent).join(' ') : '';
+        const href = attr('href').split(/[?#]/)[0];
+        return tokenize([
+            el.tagName, attr('role'), text, labels, attr('aria-label'), attr('title'), attr('alt'),
+            attr('placeholder'), attr('name'), attr('value'), attr('data-testid'), el.id,
+            typeof el.className === 'string' ? el.className : '', href,
+        ].join(' '));
+    }};
+
+    const rank = (desc, selector, topK) => {{
+        const query = new Map();
+        for (const t of tokenize(desc)) query.set(t, 1);
+        for (const t of tokenize(selector)) {{
+            if (!SELECTOR_NOISE.has(t) && !query.has(t)) query.set(t, 0.5);
+        }}
+        if (!query.size || !document.body) return [];
+        const units = [];
+        for (const el of document.body.querySelectorAll(INTERACTIVE)) {{
+            if (units.length >= {MAX_RANKED_ELEMENTS}) break;
+            if (SKIP.has(el.tagName) || el.closest('script, style, noscript, template') || !isVisible(el)) continue;
+            const terms = elementTerms(el);
+            if (terms.length) units.push({{el, terms}});
+        }}
+        if (!units.length) return [];
+        const df = new Map();
+        let totalLength = 0;
+        for (const unit of units) {{
+            unit.tf = new Map();
+            for (const t of unit.terms) unit.tf.set(t, (unit.tf.get(t) || 0) + 1);
+            for (const t of unit.tf.keys()) if (query.has(t)) df.set(t, (df.get(t) || 0) + 1);
+            totalLength += unit.terms.length;
+        }}
+        const k1 = 1.2, b = 0.75, n = units.length, avgLength = totalLength / n;
+        const phrase = normalize(desc);
+        for (const unit of units) {{
+            let score = 0;
+            for (const [t, weight] of query) {{
+                const tf = unit.tf.get(t);
+                if (!tf) continue;
+                const idf = Math.log(1 + (n - df.get(t) + 0.5) / (df.get(t) + 0.5));
+                score += weight * idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * unit.terms.length / avgLength));
+            }}
+            // The whole description verbatim beats the same words scattered around
+            if (phrase && normalize(unit.el.textContent).includes(phrase)) score *= 1.5;
+            unit.score = score;
+        }}
+        return units.filter(u => u.score > 0).sort((x, y) => y.score - x.score).slice(0, topK);
+    }};
+
+    // Parent of each top element (the element itself when the parent is too large), outermost only
+    const rankedContext = (top) => {{
+        const regions = [];
+        for (const unit of top) {{
+            let region = unit.el.parentElement || unit.el;
+            let html = serializeContext(region);
+            if (html.length > {REGION_CHAR_LIMIT} && region !== unit.el) {{
+                region = unit.el;
+                html = serializeContext(region);
+            }}
+            if (regions.some(r => r.region.contains(region))) continue;
+            for (let i = regions.length - 1; i >= 0; i--) {{
+                if (region.contains(regions[i].region)) regions.splice(i, 1);
+            }}
+            regions.push({{region, html}});
+        }}
+        return {{html: regions.map(r => r.html).join('\\n'), regions: regions.map(r => r.region)}};
+    }};
+
+    const isClickable = el => !el.disabled && el.getAttribute('aria-disabled') !== 'true'
+        && getComputedStyle(el).pointerEvents !== 'none';
+
+    // Whether an element's text or accessible name contains the description
+    const holdsText = (el, text) => !!text && (normalize(el.textContent).includes(text)
+        || normalize(accessibleName(el)).includes(text));
+
+    // Existence, uniqueness, visibility and clickability of one candidate selector; the
+    // click target is the match itself or its clickable ancestor, never a bare container
+    const validate = (selector, text) => {{
+        try {{
+            const matches = Array.from(document.querySelectorAll(selector));
+            const visible = matches.filter(isVisible);
+            const element = visible[0] || null;
+            const target = element && (element.matches(CLICKABLE) ? element : element.closest(CLICKABLE));
+            return {{
+                selector,
+                count: matches.length,
+                visible: visible.length,
+                unique: visible.length === 1,
+                clickable: !!target && isClickable(target),
+                holdsText: !!element && holdsText(element, text),
+                target,
+            }};
+        }} catch (e) {{
+            // Not a CSS selector (e.g. Playwright's role=/text= engines) - caller falls back to Playwright
+            return {{selector, count: null, visible: null, unique: null, clickable: null, holdsText: null,
+                     target: null, error: String(e.message || e)}};
+        }}
+    }};
+
+    window.__healResolver = {{
+        resolve({{desc, selector, topK, candidates, contextLimit, includeChanges, target}}) {{
+            const result = {{anchorFound: false, context: null, candidates: [], resolved: null}};
+            const top = desc && topK ? rank(desc, selector, topK) : [];
+            if (top.length) {{
+                result.anchorFound = true;
+                result.scores = top.map(unit => unit.score);
+                const ranked = rankedContext(top);
+                result.context = ranked.html;
+                result.regionSelectors = ranked.regions.map(uniqueSelector);
+            }} else if (desc) {{
+                const anchor = topK ? null : findAnchor(desc);
+                result.anchorFound = !!anchor;
+                result.context = anchor && anchor.parentElement
+                    ? serializeContext(anchor.parentElement)
+                    : serializeContext(document.body || document.documentElement).slice(0, contextLimit);
+                result.regionSelectors = anchor && anchor.parentElement ? [uniqueSelector(anchor.parentElement)] : [];
+            }}
+            if (includeChanges) {{
+                result.changes = window.__domTracker ? window.__domTracker.changes() : null;
+            }}
+            // The first candidate that is visible and clickable and either unique or, when it
+            // matches several elements, whose first match holds the target text
+            const text = normalize(target);
+            for (const selector of candidates || []) {{
+                const check = validate(selector, text);
+                const clickTarget = check.target;
+                delete check.target;
+                result.candidates.push(check);
+                if (result.resolved || !check.clickable || !(check.unique || check.holdsText)) continue;
+                result.resolved = {{
+                    selector: selector,
+                    clickableSelector: uniqueSelector(clickTarget),
+                    tag: clickTarget.tagName.toLowerCase(),
+                }};
+            }}
+            return result;
+        }},
+    }};
+}})()"""
+
+_RESOLVE_CALL = "args => window.__healResolver ? window.__healResolver.resolve(args) : null"
+
+
+def install_resolver(context):
+    """
+    Register the resolver as an init script so every page in the context has it.
+
+    Args:
+        context (BrowserContext): Playwright browser context (pages opened later,
+            including popups, inherit the script)
+    """
+    context.add_init_script(script=RESOLVER_JS)
+
+
+def resolve(page, desc=None, candidates=(), context_limit=FALLBACK_CONTEXT_LIMIT, include_changes=False,
+            selector=None, top_k=RETRIEVAL_TOP_K, target=None):
+    """
+    Run the in-page resolver in a single round trip.
+
+    Args:
+        page (Page): Playwright page object to resolve against
+        desc (str): Element description to retrieve context for; when None no context is serialized
+        candidates (Iterable[str]): Candidate selectors to validate, in priority order
+        context_limit (int): Characters of body HTML to return when no anchor is found
+        include_changes (bool): Also return the DOM tracker's changes since the last click
+        selector (str): Broken selector; its tokens (id/class fragments, role, name) refine the ranking
+        top_k (int): Ranked regions to serialize (0 = parent of the first text match only)
+        target (str): Text a non-unique candidate's first match must contain to be resolved
+            (without it only unique candidates are)
+
+    Returns:
+        dict: {
+            "anchorFound": bool (True if any element matched),
+            "context": str | None,
+            "scores": [float, ...] (relevance of the serialized regions, when ranked),
+            "regionSelectors": [str, ...] (unique CSS selectors of the serialized regions, when anchored),
+            "candidates": [{"selector", "count", "visible", "unique", "clickable", "holdsText", "error"?}, ...],
+            "resolved": {"selector", "clickableSelector", "tag"} | None,
+            "changes": {"overflow", "regions", "removed"} | None (only with include_changes),
+        }
+    """
+    args = {"desc": desc, "selector": selector, "topK": top_k, "candidates": list(candidates),
+            "contextLimit": context_limit, "includeChanges": include_changes, "target": target}
+    result = page.evaluate(_RESOLVE_CALL, args)
+    if result is None:
+        # Page was loaded before the init scripts were registered - inject them once now
+        # (the tracker starts with an empty cache and no change history)
+        logger.info("Heal resolver missing on page; injecting it")
+        page.evaluate(TRACKER_JS)
+        page.evaluate(RESOLVER_JS)
+        result = page.evaluate(_RESOLVE_CALL, args)
+    return result
+
+
+async def install_resolver_async(context):
+    """Async version of install_resolver() for playwright.async_api contexts."""
+    await context.add_init_script(script=RESOLVER_JS)
+
+
+async def resolve_async(page, desc=None, candidates=(), context_limit=FALLBACK_CONTEXT_LIMIT,
+                        include_changes=False, selector=None, top_k=RETRIEVAL_TOP_K, target=None):
+    """Async version of resolve() for playwright.async_api pages (same arguments and result)."""
+    args = {"desc": desc, "selector": selector, "topK": top_k, "candidates": list(candidates),
+            "contextLimit": context_limit, "includeChanges": include_changes, "target": target}
+    result = await page.evaluate(_RESOLVE_CALL, args)
+    if result is None:
+        logger.info("Heal resolver missing on page; injecting it")
+        await page.evaluate(TRACKER_JS)
+        await page.evaluate(RESOLVER_JS)
+        result = await page.evaluate(_RESOLVE_CALL, args)
+    return result
@@ -0,0 +1,310 @@
+"""
+Per-phase healing telemetry.
+
+Every heal started by smart_click() produces one structured trace with the time
+spent in each phase (original-selector wait, fingerprint match, context
+extraction, model call, validation, click), the prompt size in bytes and
+estimated tokens, and Ollama's own timings (prompt_eval_duration, eval_duration
+and token counts) taken from the model response.
+
+Traces are appended to a per-process JSONL file as they finish. At the end of a
+pytest session the traces from all workers are aggregated into a Prometheus
+textfile and a terminal summary with totals and percentiles.
+
+Instrumentation is done with a context variable, so it is safe across threads
+and asyncio tasks and costs nothing when no heal is in progress:
+
+    with heal_trace(selector, desc, original_wait_ms=...):
+        with phase("context_extraction"):
+            ...
+        record_outcome("model")
+"""
+
+import contextvars
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from tests.selector_health import percentile
+from tests.shared_files import write_atomic
+
+logger = logging.getLogger(__name__)
+
+TELEMETRY_DIR = os.environ.get("HEAL_TELEMETRY_DIR", ".heal_telemetry")
+
+# Phases in the order they normally happen (used to order reports)
+PHASES = ("original_wait", "fingerprint_match", "context_extraction", "model", "validation", "click")
+
+_current_trace = contextvars.ContextVar("heal_trace", default=None)
+
+# Flow step heals are attributed to (set by flow_step(), e.g. in the load runner)
+_current_step = contextvars.ContextVar("heal_step", default=None)
+
+
+class HealTrace:
+    """Measurements for a single heal."""
+
+    def __init__(self, selector, desc):
+        self.selector = selector
+        self.desc = desc
+        self.test = os.environ.get("PYTEST_CURRENT_TEST", "").split(" ")[0]
+        self.step = _current_step.get()
+        self.started_at = time.time()
+        self.phases_ms = {}
+        self.prompt_bytes = 0
+        self.prompt_tokens = 0
+        self.model = {}
+        self.model_calls = 0
+        self.outcome = "failed"
+        self.total_ms = 0.0
+
+    def add_phase(self, name, elapsed_ms):
+        """Accumulate time into a phase (a phase may run more than once per heal)."""
+        self.phases_ms[name] = round(self.phases_ms.get(name, 0.0) + elapsed_ms, 2)
+
+    def to_dict(self):
+        return {
+            "selector": self.selector,
+            "desc": self.desc,
+            "test": self.test,
+            "step": self.step,
+            "started_at": self.started_at,
+            "total_ms": round(self.total_ms, 2),
+            "phases_ms": self.phases_ms,
+            "prompt_bytes": self.prompt_bytes,
+            "prompt_tokens": self.prompt_tokens,
+            "model": self.model,
+            "model_calls": self.model_calls,
+            "outcome": self.outcome,
+        }
+
+
+class TelemetryCollector:
+    """Collects finished traces and writes them to this process's JSONL file."""
+
+    def __init__(self, directory=TELEMETRY_DIR):
+        """
+        Args:
+            directory (str): Directory for JSONL and Prometheus output, or None to keep traces in memory only
+        """
+        self.directory = directory
+        self.traces = []
+        self._lock = threading.Lock()
+        self._path = None
+
+    def reset(self):
+        """
+        Start a new session: forget traces and truncate this process's JSONL file.
+
+        The main process (not a pytest-xdist worker) also removes the previous
+        session's worker files so load_all() only sees this session's heals.
+        """
+        with self._lock:
+            self.traces = []
+            self._path = None
+            if not self.directory:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            worker = os.environ.get("PYTEST_XDIST_WORKER")
+            if worker is None:
+                for stale_path in glob.glob(os.path.join(self.directory, "heals-*.jsonl")):
+                    os.remove(stale_path)
+            self._path = os.path.join(self.directory, f"heals-{worker or 'main'}.jsonl")
+            open(self._path, "w").close()
+
+    def add(self, trace):
+        """Record a finished trace."""
+        record = trace.to_dict()
+        with self._lock:
+            self.traces.append(record)
+            if self._path:
+                try:
+                    with open(self._path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(record) + "\n")
+                except OSError as e:
+                    logger.warning(f"Could not write heal telemetry {self._path}: {e}")
+
+    def load_all(self):
+        """
+        Read the traces written by every worker of the current session.
+
+        Returns:
+            list[dict]: All traces (falls back to this process's in-memory traces)
+        """
+        if not self.directory:
+            return list(self.traces)
+        records = []
+        for path in sorted(glob.glob(os.path.join(self.directory, "heals-*.jsonl"))):
+            with open(path, encoding="utf-8") as f:
+                records.extend(json.loads(line) for line in f if line.strip())
+        return records
+
+
+telemetry = TelemetryCollector()
+
+
+@contextmanager
+def heal_trace(selector, desc, original_wait_ms=None):
+    """
+    Trace one heal; the trace becomes the current trace for phase()/record_model_response().
+
+    Args:
+        selector (str): Selector being healed
+        desc (str): Human-readable description of the element
+        original_wait_ms (float): Time spent waiting on the original selector before healing
+
+    Yields:
+        HealTrace: The trace, whose outcome the caller sets ("failed" if left unset)
+    """
+    trace = HealTrace(selector, desc)
+    if original_wait_ms is not None:
+        trace.add_phase("original_wait", original_wait_ms)
+    token = _current_trace.set(trace)
+    started = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        trace.total_ms = (time.perf_counter() - started) * 1000 + trace.phases_ms.get("original_wait", 0.0)
+        _current_trace.reset(token)
+        telemetry.add(trace)
+
+
+@contextmanager
+def flow_step(name):
+    """Attribute the heals started inside the block (on this thread or task) to a named flow step."""
+    token = _current_step.set(name)
+    try:
+        yield
+    finally:
+        _current_step.reset(token)
+
+
+@contextmanager
+def phase(name):
+    """Time a block as a phase of the current heal (no-op outside a heal)."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_phase(name, (time.perf_counter() - started) * 1000)
+
+
+def record_outcome(outcome):
+    """
+    Set how the current heal ended.
+
+    Outcomes: "fingerprint", "cache", "model", "circuit", "preflight" (clicked with a
+    background heal), "background" (model call made by pre-flight) or "failed".
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.outcome = outcome
+
+
+def record_prompt(prompt, system, tokens):
+    """Record the size of a prompt sent to the model for the current heal."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.prompt_bytes += len(prompt.encode("utf-8")) + len(system.encode("utf-8"))
+        trace.prompt_tokens += tokens
+
+
+def record_model_response(response):
+    """
+    Record Ollama's timings from a generate response for the current heal.
+
+    Args:
+        response: ollama generate response (mapping-style access to its fields)
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    trace.model_calls += 1
+    for field in ("prompt_eval_duration", "eval_duration", "total_duration", "load_duration"):
+        value = response.get(field) if hasattr(response, "get") else getattr(response, field, None)
+        if value:
+            key = f"{field}_ms"
+            trace.model[key] = round(trace.model.get(key, 0.0) + value / 1e6, 2)
+    for field in ("prompt_eval_count", "eval_count"):
+        value = response.get(field) if hasattr(response, "get") else getattr(response, field, None)
+        if value:
+            trace.model[field] = trace.model.get(field, 0) + value
+
+
+def summarize(records):
+    """
+    Aggregate traces into totals and per-phase percentiles.
+
+    Args:
+        records (list[dict]): Traces as written to the JSONL files
+
+    Returns:
+        dict: {"heals", "outcomes", "model_calls", "total_ms": {...}, "phases": {name: {...}},
+               "prompt_tokens": {...}}
+    """
+    def describe(values):
+        return {
+            "count": len(values),
+            "sum": round(sum(values), 2),
+            "p50": percentile(values, 0.5),
+            "p95": percentile(values, 0.95),
+            "max": max(values) if values else None,
+        }
+
+    outcomes = {}
+    for record in records:
+        outcomes[record["outcome"]] = outcomes.get(record["outcome"], 0) + 1
+    phase_names = [p for p in PHASES if any(p in r["phases_ms"] for r in records)]
+    return {
+        "heals": len(records),
+        "outcomes": outcomes,
+        "model_calls": sum(r["model_calls"] for r in records),
+        "total_ms": describe([r["total_ms"] for r in records]),
+        "phases": {name: describe([r["phases_ms"][name] for r in records if name in r["phases_ms"]])
+                   for name in phase_names},
+        "prompt_tokens": describe([r["prompt_tokens"] for r in records if r["prompt_tokens"]]),
+    }
+
+
+def write_prometheus(records, path):
+    """
+    Write aggregated heal metrics in Prometheus textfile-collector format.
+
+    Args:
+        records (list[dict]): Traces as written to the JSONL files
+        path (str): Destination .prom file (written atomically)
+    """
+    summary = summarize(records)
+    lines = [
+        "# HELP selfheal_heals_total Heals attempted, by outcome.",
+        "# TYPE selfheal_heals_total counter",
+    ]
+    lines += [f'selfheal_heals_total{{outcome="{outcome}"}} {count}' for outcome, count in summary["outcomes"].items()]
+    lines += [
+        "# HELP selfheal_model_calls_total Model requests made while healing.",
+        "# TYPE selfheal_model_calls_total counter",
+        f"selfheal_model_calls_total {summary['model_calls']}",
+        "# HELP selfheal_phase_duration_seconds Time spent per heal phase.",
+        "# TYPE selfheal_phase_duration_seconds summary",
+    ]
+    for name, stats in {"total": summary["total_ms"], **summary["phases"]}.items():
+        if not stats["count"]:
+            continue
+        for key, quantile in (("p50", "0.5"), ("p95", "0.95")):
+            lines.append(f'selfheal_phase_duration_seconds{{phase="{name}",quantile="{quantile}"}} '
+                         f"{stats[key] / 1000:.6f}")
+        lines.append(f'selfheal_phase_duration_seconds_sum{{phase="{name}"}} {stats["sum"] / 1000:.6f}')
+        lines.append(f'selfheal_phase_duration_seconds_count{{phase="{name}"}} {stats["count"]}')
+    lines += [
+        "# HELP selfheal_prompt_tokens_total Estimated prompt tokens sent to the model.",
+        "# TYPE selfheal_prompt_tokens_total counter",
+        f"selfheal_prompt_tokens_total {summary['prompt_tokens']['sum']}",
+    ]
+    write_atomic(path, "\n".join(lines) + "\n")
@@ -0,0 +1,244 @@
+"""
+Compact HTML context serializer for selector-healing prompts.
+
+Raw page HTML is mostly noise to the model: <head>, inline scripts and styles,
+SVG icons, tracking attributes and hundreds of near-identical result cards. On
+CPU-only Ollama hosts prompt evaluation time grows with prompt size, so the
+context sent with each heal is reduced to what a selector can actually use:
+
+- script/style/svg/noscript/template/head subtrees and comments are dropped
+- only selector-relevant attributes are kept (id, class, role, aria-*, name,
+  type, data-testid, href stems and a few label-like attributes)
+- runs of structurally identical siblings are collapsed to a couple of examples
+- the result is fitted into a token budget centred on the element that
+  contains the target description
+"""
+
+import os
+import re
+from html.parser import HTMLParser
+
+# Approximate prompt budget for the HTML context, in model tokens
+DEFAULT_TOKEN_BUDGET = int(os.environ.get("HEAL_CONTEXT_TOKEN_BUDGET", "1500"))
+
+# Rough characters-per-token ratio for markup with code-oriented tokenizers
+CHARS_PER_TOKEN = 4
+
+# Identical siblings kept before the rest of the run is collapsed
+MAX_REPEATED_SIBLINGS = 2
+
+# Longest text node kept verbatim
+MAX_TEXT_LENGTH = 80
+
+DROPPED_TAGS = {"script", "style", "svg", "noscript", "template", "head", "link", "meta", "iframe"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+KEPT_ATTRIBUTES = {"id", "class", "role", "name", "type", "href", "data-testid", "for", "alt", "title", "placeholder"}
+
+
+def estimate_tokens(text):
+    """Estimate the number of model tokens in a piece of text."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class _Node:
+    """Minimal element tree node (text children are stored as plain strings)."""
+
+    __slots__ = ("tag", "attrs", "children", "parent", "_text", "_signature")
+
+    def __init__(self, tag, attrs, parent):
+        self.tag = tag
+        self.attrs = attrs
+        self.children = []
+        self.parent = parent
+        self._text = None
+        self._signature = None
+
+    def text(self):
+        """Lower-cased, whitespace-normalized text content of the subtree (cached)."""
+        if self._text is None:
+            parts = [c.lower() if isinstance(c, str) else c.text() for c in self.children if not isinstance(c, _Omitted)]
+            self._text = " ".join(p for p in parts if p)
+        return self._text
+
+    def signature(self):
+        """Structural signature used to detect repeated sibling subtrees (cached)."""
+        if self._signature is None:
+            child_signatures = ",".join(c.signature() for c in self.children if isinstance(c, _Node))
+            self._signature = f"{self.tag}.{self.attrs.get('class', '')}({child_signatures})"
+        return self._signature
+
+
+class _Omitted:
+    """Placeholder for a collapsed run of repeated siblings."""
+
+    __slots__ = ("count",)
+
+    def __init__(self, count):
+        self.count = count
+
+
+class _TreeBuilder(HTMLParser):
+    """Builds a _Node tree, skipping dropped subtrees, comments and irrelevant attributes."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = _Node("#root", {}, None)
+        self._current = self.root
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if self._skip_depth:
+            if tag not in VOID_TAGS:
+                self._skip_depth += 1
+            return
+        if tag in DROPPED_TAGS:
+            if tag not in VOID_TAGS:
+                self._skip_depth = 1
+            return
+        node = _Node(tag, _filter_attributes(attrs), self._current)
+        self._current.children.append(node)
+        if tag not in VOID_TAGS:
+            self._current = node
+
+    def handle_startendtag(self, tag, attrs):
+        if not self._skip_depth and tag not in DROPPED_TAGS:
+            self._current.children.append(_Node(tag, _filter_attributes(attrs), self._current))
+
+    def handle_endtag(self, tag):
+        if self._skip_depth:
+            if tag not in VOID_TAGS:
+                self._skip_depth -= 1
+            return
+        # Pop up to the matching open element (tolerates unclosed tags)
+        node = self._current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self._current = node.parent
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        text = re.sub(r"\s+", " ", data).strip()
+        if text:
+            if len(text) > MAX_TEXT_LENGTH:
+                text = text[:MAX_TEXT_LENGTH] + "…"
+            self._current.children.append(text)
+
+
+def _filter_attributes(attrs):
+    """Keep only attributes a selector could reasonably use."""
+    kept = {}
+    for name, value in attrs:
+        if value is None:
+            value = ""
+        if name == "href":
+            # Keep the path stem only; query strings are session/tracking noise
+            value = value.split("?", 1)[0].split("#", 1)[0][:60]
+        elif not (name in KEPT_ATTRIBUTES or name.startswith("aria-")):
+            continue
+        kept[name] = value[:MAX_TEXT_LENGTH]
+    return kept
+
+
+def _collapse_repeats(node, target):
+    """Collapse runs of structurally identical siblings, never hiding the target text."""
+    collapsed = []
+    run_signature, run_length, omitted = None, 0, 0
+    for child in node.children:
+        if isinstance(child, str):
+            if omitted:
+                collapsed.append(_Omitted(omitted))
+            run_signature, run_length, omitted = None, 0, 0
+            collapsed.append(child)
+            continue
+        # Signatures and text are cached before collapsing; identical siblings collapse identically
+        signature = child.signature()
+        holds_target = bool(target) and target in child.text()
+        _collapse_repeats(child, target)
+        if signature == run_signature and run_length >= MAX_REPEATED_SIBLINGS and not holds_target:
+            omitted += 1
+            continue
+        if omitted:
+            collapsed.append(_Omitted(omitted))
+            omitted = 0
+        run_length = run_length + 1 if signature == run_signature else 1
+        run_signature = signature
+        collapsed.append(child)
+    if omitted:
+        collapsed.append(_Omitted(omitted))
+    node.children = collapsed
+
+
+def _quote(value):
+    """Escape an attribute value for double-quoted serialization."""
+    return value.replace("&", "&amp;").replace('"', "&quot;")
+
+
+def _serialize(node):
+    """Serialize a subtree to compact HTML."""
+    if isinstance(node, str):
+        return node
+    if isinstance(node, _Omitted):
+        return f"<!-- {node.count} similar omitted -->"
+    inner = "".join(_serialize(c) for c in node.children)
+    if node.tag == "#root":
+        return inner
+    attrs = "".join(f' {k}="{_quote(v)}"' if v else f" {k}" for k, v in node.attrs.items())
+    if node.tag in VOID_TAGS:
+        return f"<{node.tag}{attrs}>"
+    return f"<{node.tag}{attrs}>{inner}</{node.tag}>"
+
+
+def _find_target(node, target):
+    """Deepest element whose text contains the target (first in document order)."""
+    for child in node.children:
+        if isinstance(child, _Node) and target in child.text():
+            return _find_target(child, target) or child
+    return None
+
+
+def compact_html(html, target_text=None, token_budget=DEFAULT_TOKEN_BUDGET):
+    """
+    Reduce an HTML context to selector-relevant markup within a token budget.
+
+    Args:
+        html (str): Raw HTML (an element's outerHTML or a whole page)
+        target_text (str): Description of the element being healed; the budget
+            window is centred on the deepest element containing it
+        token_budget (int): Approximate maximum size of the result in model tokens
+
+    Returns:
+        str: Compacted HTML context
+    """
+    builder = _TreeBuilder()
+    builder.feed(html or "")
+    builder.close()
+    target = re.sub(r"\s+", " ", target_text or "").strip().lower()
+    _collapse_repeats(builder.root, target)
+
+    max_chars = token_budget * CHARS_PER_TOKEN
+    serialized = _serialize(builder.root)
+    if len(serialized) <= max_chars:
+        return serialized
+
+    target_node = _find_target(builder.root, target) if target else None
+    if target_node is None:
+        return serialized[:max_chars]
+
+    # Widen from the target to the largest ancestor that still fits the budget
+    region = _serialize(target_node)
+    node = target_node.parent
+    while node is not None and node is not builder.root:
+        widened = _serialize(node)
+        if len(widened) > max_chars:
+            break
+        region = widened
+        node = node.parent
+
+    if len(region) <= max_chars:
+        return region
+    # Even the target element alone is too large: keep a window around its text
+    position = max(region.lower().find(target), 0)
+    start = max(0, position - max_chars // 2)
+    return region[start:start + max_chars]
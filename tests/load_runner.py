@@ -0,0 +1,301 @@
+"""
+Concurrent load runner for the shopping journey.
+
+test_run drives one hard-coded journey in one context, which says nothing about
+how far one machine scales or when healing becomes the bottleneck. This runner
+drives the HomePage -> SearchResultsPage -> ProductPage -> CartPage chain for a
+list of search queries across N concurrent browser contexts:
+
+- each worker thread has its own sync_playwright instance and browser (the sync
+  API must not be shared between threads) and a one-context ContextPool, so
+  contexts are warmed once and reset between flows exactly as in the tests
+- flows are taken from a shared queue (queries repeated round-robin) until
+  --flows have been started
+- every step is timed, and heals started inside it are attributed to it (see
+  heal_telemetry.flow_step)
+
+The report gives throughput (completed flows per minute), per-step latency
+percentiles and heal counts per step and outcome. It is printed and written to
+.heal_telemetry/load-report.json.
+
+Runs can target a recorded site instead of amazon.in: --network-mode replay
+serves every context from the HAR archives recorded with --network-mode record
+(see network_mode), and --start-url points the flows at a local mirror.
+
+    python -m tests.load_runner --concurrency 4 --flows 20 --network-mode replay \\
+        --query "computer mouse" --query "keyboard"
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from playwright.sync_api import sync_playwright
+from pages.home_page import HomePage
+from pages.search_results_page import SearchResultsPage
+from tests.context_pool import ContextPool, capture_storage_state
+from tests.heal_telemetry import TELEMETRY_DIR, flow_step, telemetry
+from tests.network_mode import DEFAULT_NETWORK_MODE, NETWORK_MODES, NetworkMode
+from tests.selector_health import percentile
+
+logger = logging.getLogger(__name__)
+
+START_URL = "https://www.amazon.in/"
+
+DEFAULT_QUERIES = ("computer mouse",)
+
+# Steps of one flow, in order (also the order of the report)
+FLOW_STEPS = (
+    "dismiss_popup", "search", "apply_filters", "open_product", "set_quantity",
+    "add_to_cart", "go_to_cart", "decrease_quantity", "delete_item", "go_home",
+)
+
+# Same as the tests: maximized window, no forced viewport, 10 s locator timeout
+LAUNCH_ARGS = {"args": ["--start-maximized"]}
+CONTEXT_ARGS = {"no_viewport": True}
+DEFAULT_TIMEOUT_MS = 10000
+
+REPORT_PATH = os.path.join(TELEMETRY_DIR, "load-report.json")
+
+
+def run_flow(page, query, step):
+    """
+    Drive one shopping journey (the same steps as test_run) for a search query.
+
+    Args:
+        page (Page): Page of a warm context, on the start URL
+        query (str): Search term
+        step (Callable[[str], ContextManager]): Times a named step
+    """
+    home_page = HomePage(page)
+    with step("dismiss_popup"):
+        home_page.dismiss_popup_if_present()
+    with step("search"):
+        home_page.search(query)
+    search_results_page = SearchResultsPage(page)
+    with step("apply_filters"):
+        search_results_page.apply_get_it_today_filter()
+        search_results_page.apply_price_filter()
+    with step("open_product"):
+        product_page = search_results_page.open_first_product()
+    with step("set_quantity"):
+        product_page.set_quantity(current_quantity=1, new_quantity=2)
+    with step("add_to_cart"):
+        product_page.add_to_cart()
+    with step("go_to_cart"):
+        cart_page = product_page.go_to_cart()
+    with step("decrease_quantity"):
+        cart_page.decrease_quantity()
+    with step("delete_item"):
+        cart_page.delete_item()
+    with step("go_home"):
+        cart_page.go_home()
+
+
+class FlowResult:
+    """Timings and outcome of one flow."""
+
+    def __init__(self, worker, query):
+        self.worker = worker
+        self.query = query
+        self.steps_ms = {}
+        self.failed_step = None
+        self.error = None
+        self.total_ms = 0.0
+
+    @contextmanager
+    def step(self, name):
+        """Time a step; a step that raises is recorded as the failed one."""
+        started = time.perf_counter()
+        try:
+            with flow_step(name):
+                yield
+        except Exception:
+            self.failed_step = self.failed_step or name
+            raise
+        finally:
+            self.steps_ms[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    @property
+    def ok(self):
+        return self.failed_step is None and self.error is None
+
+
+class LoadRunner:
+    """Runs shopping flows for a set of queries across concurrent browser contexts."""
+
+    def __init__(self, queries=DEFAULT_QUERIES, concurrency=2, flows=None, start_url=START_URL,
+                 network_mode=DEFAULT_NETWORK_MODE, headless=True, browser_name="chromium"):
+        """
+        Args:
+            queries (Iterable[str]): Search terms, used round-robin
+            concurrency (int): Concurrent contexts (one worker thread and browser each)
+            flows (int): Flows to run in total (defaults to one per query per context)
+            start_url (str): Page every context starts on (a local mirror to avoid the live site)
+            network_mode (str): One of NETWORK_MODES ("replay" runs offline from recorded HARs)
+            headless (bool): Launch browsers headless
+            browser_name (str): "chromium", "firefox" or "webkit"
+        """
+        self.queries = list(queries)
+        self.concurrency = concurrency
+        self.flows = flows or len(self.queries) * concurrency
+        self.start_url = start_url
+        self.network = NetworkMode(network_mode)
+        self.headless = headless
+        self.browser_name = browser_name
+        self.results = []
+        self._lock = threading.Lock()
+        self._pending = queue.Queue()
+
+    def run(self):
+        """
+        Run every flow and build the report.
+
+        Returns:
+            dict: See report()
+        """
+        telemetry.reset()
+        for i in range(self.flows):
+            self._pending.put(self.queries[i % len(self.queries)])
+        storage_state = self._capture_storage_state()
+        started = time.perf_counter()
+        workers = [threading.Thread(target=self._worker, args=(i, storage_state), name=f"load-worker-{i}")
+                   for i in range(self.concurrency)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return self.report(time.perf_counter() - started)
+
+    def _launch(self, playwright):
+        return getattr(playwright, self.browser_name).launch(headless=self.headless, **LAUNCH_ARGS)
+
+    def _capture_storage_state(self):
+        # Once, before the workers start, so they do not all pass the interstitial themselves
+        with sync_playwright() as playwright:
+            browser = self._launch(playwright)
+            try:
+                return capture_storage_state(
+                    browser, CONTEXT_ARGS, self.start_url,
+                    prepare=lambda page: HomePage(page).dismiss_popup_if_present(), network=self.network,
+                )
+            finally:
+                browser.close()
+
+    def _worker(self, index, storage_state):
+        with sync_playwright() as playwright:
+            browser = self._launch(playwright)
+            pool = ContextPool(browser, 1, CONTEXT_ARGS, self.start_url, storage_state,
+                               network=self.network).start()
+            try:
+                while True:
+                    try:
+                        query = self._pending.get_nowait()
+                    except queue.Empty:
+                        break
+                    context, page = pool.acquire()
+                    page.set_default_timeout(DEFAULT_TIMEOUT_MS)
+                    result = FlowResult(index, query)
+                    started = time.perf_counter()
+                    try:
+                        run_flow(page, query, result.step)
+                    except Exception as e:
+                        result.error = f"{type(e).__name__}: {e}"
+                        logger.warning(f"LOAD: Flow '{query}' failed on worker {index} "
+                                       f"at {result.failed_step}: {result.error}")
+                    result.total_ms = round((time.perf_counter() - started) * 1000, 1)
+                    with self._lock:
+                        self.results.append(result)
+                    pool.release(context, page)
+            finally:
+                pool.close()
+                browser.close()
+
+    def report(self, elapsed_s):
+        """
+        Aggregate flow results and heal traces.
+
+        Args:
+            elapsed_s (float): Wall time of the run
+
+        Returns:
+            dict: {"flows", "completed", "failed", "elapsed_s", "flows_per_minute", "concurrency",
+                   "flow_ms": {...}, "steps": {step: {"count", "p50", "p95", "max", "failures",
+                   "heals": {outcome: count}}}}
+        """
+        completed = [r for r in self.results if r.ok]
+        heals = {}
+        for trace in telemetry.traces:
+            by_outcome = heals.setdefault(trace.get("step") or "unattributed", {})
+            by_outcome[trace["outcome"]] = by_outcome.get(trace["outcome"], 0) + 1
+        steps = {}
+        for name in FLOW_STEPS + (("unattributed",) if "unattributed" in heals else ()):
+            values = [r.steps_ms[name] for r in self.results if name in r.steps_ms]
+            steps[name] = {
+                "count": len(values),
+                "p50": percentile(values, 0.5),
+                "p95": percentile(values, 0.95),
+                "max": max(values) if values else None,
+                "failures": sum(1 for r in self.results if r.failed_step == name),
+                "heals": heals.get(name, {}),
+            }
+        flow_ms = [r.total_ms for r in completed]
+        return {
+            "flows": len(self.results),
+            "completed": len(completed),
+            "failed": len(self.results) - len(completed),
+            "elapsed_s": round(elapsed_s, 1),
+            "flows_per_minute": round(len(completed) / elapsed_s * 60, 2) if elapsed_s else 0.0,
+            "concurrency": self.concurrency,
+            "flow_ms": {"p50": percentile(flow_ms, 0.5), "p95": percentile(flow_ms, 0.95)},
+            "steps": steps,
+        }
+
+
+def format_report(report):
+    """
+    Render a load report as a terminal table.
+
+    Returns:
+        str: Throughput line followed by one row per step
+    """
+    lines = [
+        f"{report['completed']}/{report['flows']} flows completed in {report['elapsed_s']}s "
+        f"with {report['concurrency']} contexts: {report['flows_per_minute']} flows/min "
+        f"(flow p50 {report['flow_ms']['p50']} ms, p95 {report['flow_ms']['p95']} ms)",
+        f"{'step':<18} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'failed':>7}  heals",
+    ]
+    for name, step in report["steps"].items():
+        heals = ", ".join(f"{outcome}={count}" for outcome, count in sorted(step["heals"].items())) or "-"
+        lines.append(f"{name:<18} {step['count']:>6} {str(step['p50']):>9} {str(step['p95']):>9} "
+                     f"{str(step['max']):>9} {step['failures']:>7}  {heals}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the shopping journey concurrently and report throughput")
+    parser.add_argument("--query", action="append", dest="queries", help="Search term (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=2, help="Concurrent browser contexts")
+    parser.add_argument("--flows", type=int, default=None, help="Flows in total (default: queries x concurrency)")
+    parser.add_argument("--start-url", default=START_URL, help="Start page (e.g. a local mirror)")
+    parser.add_argument("--network-mode", choices=NETWORK_MODES, default=DEFAULT_NETWORK_MODE)
+    parser.add_argument("--browser", default="chromium", choices=("chromium", "firefox", "webkit"))
+    parser.add_argument("--headed", action="store_true", help="Show the browser windows")
+    parser.add_argument("--report", default=REPORT_PATH, help="JSON report path")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(name)-25s | %(levelname)-8s | %(message)s')
+
+    runner = LoadRunner(
+        queries=args.queries or DEFAULT_QUERIES, concurrency=args.concurrency, flows=args.flows,
+        start_url=args.start_url, network_mode=args.network_mode, headless=not args.headed,
+        browser_name=args.browser,
+    )
+    load_report = runner.run()
+    os.makedirs(os.path.dirname(args.report) or ".", exist_ok=True)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(load_report, f, indent=2)
+    print(format_report(load_report))
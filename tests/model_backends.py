@@ -0,0 +1,342 @@
+"""
+Pluggable model backends for selector healing.
+
+ai_utils and async_ai_utils send every heal prompt through the backend returned
+by get_model_backend() instead of calling ollama directly, so the model can be
+swapped without touching the healing flow:
+
+- OllamaBackend: the local Ollama server (default)
+- StubBackend: deterministic in-process stand-in for offline tests and
+  benchmarks; answers with rule-based selectors for the target named in the
+  prompt, optionally after an artificial delay
+
+The default is chosen with HEAL_MODEL_BACKEND ("ollama" or "stub"), or replaced
+at runtime with set_model_backend(). Every backend also answers health(model),
+the readiness check used before warming the model up (see ai_utils).
+
+generate() takes an optional stop_when(text) predicate. With one, the response
+is streamed and the request is dropped as soon as the predicate accepts the
+text so far (closing the stream makes Ollama stop generating), so a heal does
+not wait for explanations the model adds after the selector.
+
+generate() also takes an optional timeout in seconds (the model router passes
+what is left of a heal's latency budget); a request that does not finish in
+time raises TimeoutError. OllamaBackend keeps one connection pool per backend
+for all requests, timed or not.
+"""
+
+import asyncio
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import httpx
+import ollama
+from tests.selector_candidates import rule_based_candidates
+
+# How long Ollama keeps the model loaded after a request (Ollama's own default is 5m,
+# short enough for the model to unload between heals that are far apart)
+MODEL_KEEP_ALIVE = os.environ.get("HEAL_MODEL_KEEP_ALIVE", "60m")
+
+# Threads running timed requests; the caller stops waiting at the timeout, the request winds down behind it
+_timed_requests = ThreadPoolExecutor(max_workers=8, thread_name_prefix="model-request")
+
+# Timing fields copied from the final chunk of a stream that ran to the end
+_TIMING_FIELDS = ("total_duration", "load_duration", "prompt_eval_count", "prompt_eval_duration",
+                  "eval_count", "eval_duration")
+
+
+def _streamed_response(text, final, chunks, started_ns):
+    """Build a generate-style response from streamed chunks (final is None if stopped early)."""
+    if final is not None:
+        response = {field: final.get(field) for field in _TIMING_FIELDS}
+        response.update(response=text, done=True, done_reason=final.get("done_reason"))
+        return response
+    elapsed_ns = time.perf_counter_ns() - started_ns
+    # Each streamed chunk is one generated token
+    return {"response": text, "done": False, "done_reason": "early_stop", "total_duration": elapsed_ns,
+            "eval_count": chunks, "eval_duration": elapsed_ns}
+
+
+def _check_deadline(deadline, model):
+    if deadline is not None and time.monotonic() > deadline:
+        raise TimeoutError(f"{model} did not finish before the deadline")
+
+
+def stream_generate(client, stop_when, deadline=None, **request):
+    """
+    Stream a generate request and stop once stop_when accepts the text so far.
+
+    Args:
+        client: ollama.Client, or the ollama module for the default client
+        stop_when (Callable[[str], bool]): Called with the accumulated response text after each chunk
+        deadline (float): time.monotonic() by which the response must be complete, if any
+        **request: generate() arguments
+
+    Returns:
+        dict: Generate-style response; done is False when it was stopped early
+
+    Raises:
+        TimeoutError: If the deadline passes while the response is still streaming
+    """
+    started = time.perf_counter_ns()
+    stream = client.generate(stream=True, **request)
+    text, chunks, final = "", 0, None
+    try:
+        for part in stream:
+            text += part["response"]
+            chunks += 1
+            if part.get("done"):
+                # Nothing follows the final chunk; reading the stream to its end keeps the connection reusable
+                final = part
+                continue
+            if stop_when(text):
+                break
+            _check_deadline(deadline, request.get("model"))
+    finally:
+        stream.close()
+    return _streamed_response(text, final, chunks, started)
+
+
+async def stream_generate_async(client, stop_when, **request):
+    """Async version of stream_generate() for ollama.AsyncClient."""
+    started = time.perf_counter_ns()
+    stream = await client.generate(stream=True, **request)
+    text, chunks, final = "", 0, None
+    try:
+        async for part in stream:
+            text += part["response"]
+            chunks += 1
+            if part.get("done"):
+                # Nothing follows the final chunk; reading the stream to its end keeps the connection reusable
+                final = part
+                continue
+            if stop_when(text):
+                break
+    finally:
+        await stream.aclose()
+    return _streamed_response(text, final, chunks, started)
+
+
+class OllamaBackend:
+    """Sends generate requests to an Ollama server."""
+
+    def __init__(self, host=None, keep_alive=MODEL_KEEP_ALIVE):
+        """
+        Args:
+            host (str): Ollama server URL (None uses the client's default / OLLAMA_HOST)
+            keep_alive (str): Sent with every request so the model stays resident
+        """
+        self.host = host
+        self.keep_alive = keep_alive
+        # Connection pool shared by the untimed client and the per-timeout clients
+        self._transport = httpx.HTTPTransport()
+        self._client = ollama.Client(host=host, transport=self._transport) if host else None
+        # AsyncClient instances are bound to the event loop that created them
+        self._async_clients = {}
+
+    def generate(self, model, prompt, system, options=None, stop_when=None, timeout=None):
+        """
+        Run one generate request.
+
+        Args:
+            stop_when (Callable[[str], bool]): Stream and stop as soon as it accepts the text so far
+            timeout (float): Seconds the whole request may take (None waits as long as Ollama needs)
+
+        Returns:
+            Mapping: Ollama generate response ('response' plus timing fields)
+
+        Raises:
+            TimeoutError: If the request did not finish within timeout
+        """
+        request = dict(model=model, prompt=prompt, system=system, options=options, keep_alive=self.keep_alive)
+        if timeout is None:
+            # Module-level calls when no host is set, so the default client (and anything patching it) is used
+            client = ollama if self._client is None else self._client
+            return self._generate(client, request, stop_when)
+        # Only the timeout differs per request; the connection comes from the shared pool. The
+        # client's timeout bounds each read and the deadline each streamed chunk, so a request the
+        # caller stopped waiting for does not hold its connection and thread much longer.
+        client = ollama.Client(host=self.host, timeout=timeout, transport=self._transport)
+        request_done = _timed_requests.submit(self._generate, client, request, stop_when,
+                                              time.monotonic() + timeout)
+        try:
+            return request_done.result(timeout=timeout)
+        except (FutureTimeoutError, httpx.TimeoutException) as e:
+            raise TimeoutError(f"{model} did not answer within {timeout:.1f} s") from e
+
+    @staticmethod
+    def _generate(client, request, stop_when, deadline=None):
+        if stop_when is not None:
+            return stream_generate(client, stop_when, deadline=deadline, **request)
+        return client.generate(**request)
+
+    async def generate_async(self, model, prompt, system, options=None, stop_when=None, timeout=None):
+        """Async version of generate() using one AsyncClient per event loop."""
+        if timeout is None:
+            return await self._generate_async(model, prompt, system, options, stop_when)
+        try:
+            return await asyncio.wait_for(self._generate_async(model, prompt, system, options, stop_when), timeout)
+        except asyncio.TimeoutError as e:
+            raise TimeoutError(f"{model} did not answer within {timeout:.1f} s") from e
+
+    async def _generate_async(self, model, prompt, system, options, stop_when):
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            for stale_loop in [l for l in self._async_clients if l.is_closed()]:
+                del self._async_clients[stale_loop]
+            client = self._async_clients[loop] = ollama.AsyncClient(host=self.host)
+        request = dict(model=model, prompt=prompt, system=system, options=options, keep_alive=self.keep_alive)
+        if stop_when is not None:
+            return await stream_generate_async(client, stop_when, **request)
+        return await client.generate(**request)
+
+    def health(self, model):
+        """
+        Check that the server is reachable and has the model pulled.
+
+        Returns:
+            dict: {"reachable", "model_available", "models", "error"}
+        """
+        try:
+            response = ollama.list() if self._client is None else self._client.list()
+        except Exception as e:
+            return {"reachable": False, "model_available": False, "models": [], "error": str(e)}
+        models = [m.model for m in response.models]
+        return {"reachable": True, "model_available": model in models, "models": models, "error": None}
+
+
+def rule_based_responder(prompt, system):
+    """
+    Default StubBackend responder: answer like a model would, from the prompt alone.
+
+    Extracts the target description, HTML context and requested candidate count
+    from a build_heal_prompt() prompt and answers with rule-based selectors.
+
+    Returns:
+        str: One selector per line (empty if nothing matches)
+    """
+    desc = re.search(r"TARGET ELEMENT:\s*(.*)", prompt)
+    html = re.search(r"HTML CONTEXT:\s*(.*?)\n\s*TASK:", prompt, re.DOTALL)
+    broken = re.search(r"broken selector '(.*?)'", prompt + "\n" + system)
+    count = re.search(r"List up to (\d+)", prompt)
+    candidates = rule_based_candidates(
+        html.group(1) if html else prompt,
+        desc.group(1).strip() if desc else "",
+        broken.group(1) if broken else None,
+        limit=int(count.group(1)) if count else 1,
+    )
+    return "\n".join(candidates)
+
+
+class StubBackend:
+    """Deterministic, offline stand-in for the model."""
+
+    def __init__(self, responder=rule_based_responder, delay=0.0):
+        """
+        Args:
+            responder (str | Callable[[str, str], str] | dict): Fixed response text, or a function
+                receiving (prompt, system) and returning the response text; a dict maps model
+                names to either, to simulate models of different quality
+            delay (float | dict): Seconds to wait before answering, to simulate model latency
+                (a dict maps model names to delays)
+        """
+        self.responder = responder
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _for_model(setting, model, default):
+        return setting.get(model, default) if isinstance(setting, dict) else setting
+
+    def _response(self, model, prompt, system, elapsed_ns, stop_when=None):
+        responder = self._for_model(self.responder, model, "")
+        text = responder(prompt, system) if callable(responder) else responder
+        done = True
+        if stop_when is not None:
+            # Replay the answer word by word, as a stream would arrive
+            streamed = ""
+            for chunk in re.findall(r"\s*\S+|\s+", text):
+                streamed += chunk
+                if streamed != text and stop_when(streamed):
+                    text, done = streamed, False
+                    break
+        return {
+            "response": text,
+            "done": done,
+            "total_duration": elapsed_ns,
+            "prompt_eval_count": len(prompt + system) // 4,
+            "prompt_eval_duration": 0,
+            "eval_count": len(text.split()),
+            "eval_duration": elapsed_ns,
+        }
+
+    def generate(self, model, prompt, system, options=None, stop_when=None, timeout=None):
+        """Answer a generate request without any I/O (raises TimeoutError if the delay exceeds timeout)."""
+        with self._lock:
+            self.calls += 1
+        started = time.perf_counter_ns()
+        delay = self._for_model(self.delay, model, 0.0)
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"{model} did not answer within {timeout:.1f} s")
+        if delay:
+            time.sleep(delay)
+        return self._response(model, prompt, system, time.perf_counter_ns() - started, stop_when)
+
+    async def generate_async(self, model, prompt, system, options=None, stop_when=None, timeout=None):
+        """Async version of generate()."""
+        with self._lock:
+            self.calls += 1
+        started = time.perf_counter_ns()
+        delay = self._for_model(self.delay, model, 0.0)
+        if timeout is not None and delay > timeout:
+            await asyncio.sleep(timeout)
+            raise TimeoutError(f"{model} did not answer within {timeout:.1f} s")
+        if delay:
+            await asyncio.sleep(delay)
+        return self._response(model, prompt, system, time.perf_counter_ns() - started, stop_when)
+
+    def health(self, model):
+        """The stub is always ready, whatever model is asked for."""
+        return {"reachable": True, "model_available": True, "models": [model], "error": None}
+
+
+def create_model_backend(name, **kwargs):
+    """
+    Build a backend by name.
+
+    Args:
+        name (str): "ollama" or "stub"
+        **kwargs: Passed to the backend's constructor
+
+    Returns:
+        OllamaBackend | StubBackend: The backend
+    """
+    backends = {"ollama": OllamaBackend, "stub": StubBackend}
+    if name not in backends:
+        raise ValueError(f"Unknown model backend {name!r}; expected one of {sorted(backends)}")
+    return backends[name](**kwargs)
+
+
+_backend = create_model_backend(os.environ.get("HEAL_MODEL_BACKEND", "ollama"))
+
+
+def get_model_backend():
+    """Return the backend heal requests are sent to."""
+    return _backend
+
+
+def set_model_backend(backend):
+    """
+    Replace the backend heal requests are sent to.
+
+    Returns:
+        The previous backend, so callers can restore it
+    """
+    global _backend
+    previous, _backend = _backend, backend
+    return previous
@@ -0,0 +1,378 @@
+"""
+Tiered model routing for selector heals.
+
+Every heal used to go to qwen2.5-coder:7b, although most broken selectors are
+simple renames (an id or class got a new suffix) that a 0.5-1.5B model fixes
+in a fraction of the time. The router tries the configured models from the
+smallest up (HEAL_MODEL_TIERS, comma-separated) and only moves to the next
+tier when none of the previous tier's candidates validates against the live
+DOM:
+
+- each heal has a latency budget (HEAL_LATENCY_BUDGET_MS); every model call
+  gets what is left of it as its timeout, a tier whose typical latency no longer
+  fits is not started, and escalation stops once the budget is spent
+- non-model candidates (rule-based, ARIA) are only validated after every tier
+  has failed
+- success rates are learned per model and per kind of selector (id, class,
+  attribute, role, text, compound) and persisted between runs; a tier that
+  rarely heals a kind of selector is skipped for it (the last tier never is),
+  with an occasional re-probe in case it has started working
+- a model the server does not have is skipped for the rest of the session
+
+It works with any model backend, including the stub backend and the stub
+Ollama server used for offline tests.
+"""
+
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+import time
+from tests.ai_utils import HEAL_MODEL, get_healed_selectors
+from tests.async_ai_utils import get_healed_selectors as get_healed_selectors_async
+from tests.heal_broker_client import BrokerTimeout
+from tests.heal_telemetry import phase
+from tests.shared_files import file_lock, write_atomic
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.environ.get("HEAL_MODEL_ROUTER_PATH", os.path.join(".heal_cache", "model_router.json"))
+
+# Models tried in order, smallest first; the last one is always tried if the others fail
+MODEL_TIERS = [m.strip() for m in os.environ.get(
+    "HEAL_MODEL_TIERS", f"qwen2.5-coder:0.5b,qwen2.5-coder:1.5b,{HEAL_MODEL}"
+).split(",") if m.strip()]
+
+# Time one heal may spend across all tiers
+LATENCY_BUDGET_MS = int(os.environ.get("HEAL_LATENCY_BUDGET_MS", "20000"))
+
+# Attempts before a tier's success rate is trusted, and the rate below which it is skipped
+MIN_ATTEMPTS = 5
+SKIP_BELOW = 0.2
+
+# A skipped tier is tried again on every Nth heal of that selector kind
+REPROBE_INTERVAL = 10
+
+# Weight of the newest sample in a model's latency moving average
+LATENCY_SMOOTHING = 0.3
+
+
+def _smoothed(previous, latency_ms):
+    if previous is None:
+        return round(latency_ms, 1)
+    return round(LATENCY_SMOOTHING * latency_ms + (1 - LATENCY_SMOOTHING) * previous, 1)
+
+
+def merge_stats(stored, pending):
+    """
+    Merge one process's unsaved attempts into the statistics another process may have saved meanwhile.
+
+    Args:
+        stored (dict): Statistics as read from the store ({"outcomes", "latency_ms"})
+        pending (dict): Attempts recorded since the last flush: {"outcomes": {key: {"attempts",
+            "successes"}}, "latency_ms": {model: [samples, oldest first]}}
+
+    Returns:
+        dict: The merged statistics (counts added up, latency samples folded into the moving averages)
+    """
+    merged = {"outcomes": {key: dict(value) for key, value in stored.get("outcomes", {}).items()},
+              "latency_ms": dict(stored.get("latency_ms", {}))}
+    for key, delta in pending["outcomes"].items():
+        outcome = merged["outcomes"].setdefault(key, {"attempts": 0, "successes": 0})
+        outcome["attempts"] += delta["attempts"]
+        outcome["successes"] += delta["successes"]
+    for model, samples in pending["latency_ms"].items():
+        for latency_ms in samples:
+            merged["latency_ms"][model] = _smoothed(merged["latency_ms"].get(model), latency_ms)
+    return merged
+
+
+def _no_pending():
+    return {"outcomes": {}, "latency_ms": {}}
+
+
+def selector_kind(selector):
+    """
+    Classify a selector by what a heal has to recover.
+
+    Args:
+        selector (str): Broken selector
+
+    Returns:
+        str: "id", "class", "attribute", "role", "text" or "compound"
+    """
+    selector = selector.strip()
+    if ">>" in selector:
+        return "compound"
+    if selector.startswith(("role=", "internal:role=")):
+        return "role"
+    if selector.startswith(("text=", "internal:text=", '"', "'")):
+        return "text"
+    # Attribute values may contain spaces and combinator characters
+    bare = re.sub(r"\[[^\]]*\]", "[]", selector)
+    if re.search(r"[\s>+~]", bare):
+        return "compound"
+    if re.fullmatch(r"[a-zA-Z]*#[\w-]+", bare):
+        return "id"
+    if re.fullmatch(r"[a-zA-Z]*(\.[\w-]+)+", bare):
+        return "class"
+    if re.fullmatch(r"[a-zA-Z]*(\[\])+", bare):
+        return "attribute"
+    return "compound"
+
+
+class ModelRouter:
+    """Tries model tiers in order for a heal, learning which tiers succeed for which selector kinds."""
+
+    def __init__(self, tiers=None, budget_ms=LATENCY_BUDGET_MS, path=DEFAULT_STORE_PATH):
+        """
+        Args:
+            tiers (list[str]): Models, smallest (fastest) first; defaults to MODEL_TIERS
+            budget_ms (int): Default latency budget per heal
+            path (str): Location of the JSON store, or None for memory only
+        """
+        self.tiers = list(tiers or MODEL_TIERS)
+        self.budget_ms = budget_ms
+        self.path = path
+        self._lock = threading.Lock()
+        self._stats = {"outcomes": {}, "latency_ms": {}}
+        self._plans = {}
+        self._unavailable = set()
+        # Attempts recorded since the last flush, merged into the store then (see merge_stats)
+        self._pending = _no_pending()
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._stats = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read model router store {path}: {e}")
+
+    def success_rate(self, model, kind):
+        """
+        Returns:
+            tuple[float | None, int]: Success rate (None before any attempt) and number of attempts
+        """
+        with self._lock:
+            outcome = self._stats["outcomes"].get(f"{model}|{kind}")
+        if not outcome or not outcome["attempts"]:
+            return None, 0
+        return outcome["successes"] / outcome["attempts"], outcome["attempts"]
+
+    def expected_latency_ms(self, model):
+        """Moving average of the model's heal latency (None until it has been used)."""
+        with self._lock:
+            return self._stats["latency_ms"].get(model)
+
+    def plan(self, kind):
+        """
+        Tiers to try for a selector kind, in order.
+
+        Returns:
+            list[str]: Available tiers, minus those that rarely succeed for this kind
+        """
+        with self._lock:
+            self._plans[kind] = self._plans.get(kind, 0) + 1
+            reprobe = self._plans[kind] % REPROBE_INTERVAL == 0
+        available = [m for m in self.tiers if m not in self._unavailable]
+        planned = []
+        for index, model in enumerate(available):
+            rate, attempts = self.success_rate(model, kind)
+            last = index == len(available) - 1
+            if not last and not reprobe and attempts >= MIN_ATTEMPTS and rate < SKIP_BELOW:
+                logger.info(f"ROUTER: Skipping {model} for {kind} selectors (success rate {rate:.0%})")
+                continue
+            planned.append(model)
+        return planned
+
+    def record(self, model, kind, success, latency_ms):
+        """Record one tier attempt: whether it produced the selector that worked, and how long it took."""
+        with self._lock:
+            for stats in (self._stats, self._pending):
+                outcome = stats["outcomes"].setdefault(f"{model}|{kind}", {"attempts": 0, "successes": 0})
+                outcome["attempts"] += 1
+                outcome["successes"] += int(success)
+            self._stats["latency_ms"][model] = _smoothed(self._stats["latency_ms"].get(model), latency_ms)
+            self._pending["latency_ms"].setdefault(model, []).append(round(latency_ms, 1))
+
+    def _tier_timeout(self, model, started, budget_ms, attempted):
+        """
+        Timeout for the next tier's model call: what is left of the budget.
+
+        Args:
+            model (str): Tier about to be asked
+            started (float): perf_counter() when the heal started
+            budget_ms (int): Latency budget for the heal
+            attempted (bool): Whether an earlier tier was already asked (the first
+                tier always gets the whole budget, whatever its typical latency)
+
+        Returns:
+            float | None: Seconds the call may take, or None if the tier does not fit
+        """
+        spent_ms = (time.perf_counter() - started) * 1000
+        remaining_ms = budget_ms - spent_ms
+        expected = self.expected_latency_ms(model) if attempted else None
+        if remaining_ms <= 0 or (expected or 0) > remaining_ms:
+            logger.info(f"ROUTER: {model} does not fit the remaining budget "
+                        f"({max(remaining_ms, 0):.0f} of {budget_ms} ms left); stopping")
+            return None
+        return remaining_ms / 1000
+
+    def _mark_unavailable(self, model, error):
+        logger.warning(f"ROUTER: Model {model} unavailable ({error}); skipping it for this session")
+        with self._lock:
+            self._unavailable.add(model)
+
+    def _tier_failed(self, model, kind, desc, error, latency_ms):
+        """Handle a tier whose model call raised instead of answering."""
+        if getattr(error, "status_code", None) == 404:
+            self._mark_unavailable(model, error)
+        elif isinstance(error, (TimeoutError, BrokerTimeout)):
+            # Counts against the tier, and its latency estimate learns how slow it was
+            logger.warning(f"ROUTER: {model} ran out of the latency budget for {desc}")
+            self.record(model, kind, False, latency_ms)
+        else:
+            logger.warning(f"ROUTER: {model} failed for {desc}: {error}")
+
+    def _tier_answered(self, model, kind, desc, healed, latency_ms):
+        """Record a tier whose candidates were validated; returns True if one of them worked."""
+        self.record(model, kind, healed is not None, latency_ms)
+        if healed is not None:
+            logger.info(f"ROUTER: {model} healed {kind} selector for {desc} in {latency_ms:.0f} ms")
+            return True
+        logger.info(f"ROUTER: No candidate from {model} validated for {desc}; escalating")
+        return False
+
+    @staticmethod
+    def _untried(candidates, tried):
+        """Candidates not validated yet (each is validated at most once per heal)."""
+        return [c for c in candidates if c not in tried]
+
+    def _heal_steps(self, broken_selector, desc, extra_candidates, budget_ms):
+        """
+        The tier loop shared by heal() and heal_async(), as a generator of I/O requests.
+
+        Yields ("model", model, timeout), to which the caller sends the model's
+        candidates (or the exception the call raised), and ("validate", candidates),
+        to which it sends validate()'s result. Returns (healed, tried).
+        """
+        kind = selector_kind(broken_selector)
+        budget_ms = self.budget_ms if budget_ms is None else budget_ms
+        tried = []
+        started = time.perf_counter()
+        for index, model in enumerate(self.plan(kind)):
+            timeout = self._tier_timeout(model, started, budget_ms, attempted=index > 0)
+            if timeout is None:
+                break
+            model_started = time.perf_counter()
+            candidates = yield "model", model, timeout
+            latency_ms = (time.perf_counter() - model_started) * 1000
+            if isinstance(candidates, Exception):
+                self._tier_failed(model, kind, desc, candidates, latency_ms)
+                continue
+            candidates = self._untried(candidates, tried)
+            tried += candidates
+            healed = (yield "validate", candidates) if candidates else None
+            if self._tier_answered(model, kind, desc, healed, latency_ms):
+                return healed, tried
+        extra = self._untried(extra_candidates, tried)
+        if not extra:
+            return None, tried
+        # Every tier failed; the non-model candidates still get their chance
+        tried += extra
+        healed = yield "validate", extra
+        return healed, tried
+
+    def heal(self, broken_selector, html_snippet, desc, validate, extra_candidates=(), budget_ms=None,
+             context_kind="html"):
+        """
+        Heal a selector, escalating through the tiers until a candidate validates.
+
+        Each model call gets what is left of the latency budget as its timeout, so a
+        slow tier cannot overrun it. The non-model candidates are validated last,
+        once every tier has failed or the budget is spent, so a heal the model could
+        fix is never credited to (or clicked through) a rule-based guess.
+
+        Args:
+            broken_selector (str): Selector that failed
+            html_snippet (str): HTML context for the model
+            desc (str): Human-readable description of the element
+            validate (Callable[[list[str]], str | None]): Validates candidates against the live
+                page (and clicks); returns the one that worked, or None
+            extra_candidates (Iterable[str]): Non-model candidates (e.g. rule-based) validated after
+                every tier has failed
+            budget_ms (int): Latency budget for this heal (defaults to the router's)
+            context_kind (str): "html", or "aria" when html_snippet is an accessibility-tree snapshot
+
+        Returns:
+            tuple[str | None, list[str]]: The selector that worked (None if every tier failed),
+            and every candidate that was tried
+        """
+        steps = self._heal_steps(broken_selector, desc, extra_candidates, budget_ms)
+        reply = None
+        while True:
+            try:
+                request = steps.send(reply)
+            except StopIteration as finished:
+                return finished.value
+            if request[0] == "validate":
+                reply = validate(request[1])
+                continue
+            _, model, timeout = request
+            try:
+                with phase("model"):
+                    reply = get_healed_selectors(broken_selector, html_snippet, desc, model=model,
+                                                 context_kind=context_kind, timeout=timeout)
+            except Exception as e:
+                reply = e
+
+    async def heal_async(self, broken_selector, html_snippet, desc, validate, extra_candidates=(),
+                         budget_ms=None, context_kind="html"):
+        """Async version of heal(); validate is a coroutine function (same arguments and result)."""
+        steps = self._heal_steps(broken_selector, desc, extra_candidates, budget_ms)
+        reply = None
+        while True:
+            try:
+                request = steps.send(reply)
+            except StopIteration as finished:
+                return finished.value
+            if request[0] == "validate":
+                reply = await validate(request[1])
+                continue
+            _, model, timeout = request
+            try:
+                with phase("model"):
+                    reply = await get_healed_selectors_async(broken_selector, html_snippet, desc, model=model,
+                                                             context_kind=context_kind, timeout=timeout)
+            except Exception as e:
+                reply = e
+
+    def flush(self):
+        """Persist the attempts recorded in this process, merged into whatever other workers saved."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._pending["outcomes"]:
+                return
+            try:
+                # Locked from the re-read to the write, so two workers flushing together both count
+                with file_lock(f"{self.path}.lock"):
+                    stored = {}
+                    if os.path.exists(self.path):
+                        try:
+                            with open(self.path, encoding="utf-8") as f:
+                                stored = json.load(f)
+                        except (OSError, ValueError):
+                            stored = {}
+                    merged = merge_stats(stored, self._pending)
+                    write_atomic(self.path, json.dumps(merged))
+                # Later plans also see what the other workers learned
+                self._stats, self._pending = merged, _no_pending()
+            except OSError as e:
+                logger.warning(f"Could not write model router store {self.path}: {e}")
+
+
+# Shared router used by smart_click(); flushed at interpreter exit as a fallback to pytest_sessionfinish
+model_router = ModelRouter()
+atexit.register(model_router.flush)
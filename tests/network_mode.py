@@ -0,0 +1,129 @@
+"""
+Network modes for browser contexts: resource blocking and HAR record/replay.
+
+Every run used to download the full amazon.in page weight (images, fonts, ads,
+trackers), and a run could not be reproduced without network access, so heal
+behaviour changed with whatever the live site served that day. The test
+contexts can now be put in one of these modes (--network-mode or
+HEAL_NETWORK_MODE):
+
+- live: no routing, the behaviour before this module existed (default)
+- block: abort requests for resource types and domains the flows do not need
+- record: block as above and record everything else to a HAR archive, one per
+  context, under HEAL_HAR_DIR
+- replay: serve every request from the recorded archives and abort anything
+  they do not contain, so a run needs no network at all and sees exactly the
+  DOM that was recorded
+
+The archives are zip files whose response bodies are stored as separate,
+content-addressed entries (Playwright names them by SHA-1), so repeated assets
+are stored once per archive.
+"""
+
+import glob
+import itertools
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+NETWORK_MODES = ("live", "block", "record", "replay")
+
+DEFAULT_NETWORK_MODE = os.environ.get("HEAL_NETWORK_MODE", "live")
+
+HAR_DIR = os.environ.get("HEAL_HAR_DIR", os.path.join(".heal_cache", "network"))
+
+# Resource types the flows never look at; images stay in the DOM as <img> elements,
+# only their bytes are skipped
+BLOCKED_RESOURCE_TYPES = frozenset(
+    os.environ.get("HEAL_BLOCKED_RESOURCE_TYPES", "image,media,font").split(",")
+) - {""}
+
+# Ad, analytics and tracking hosts (matched as the host or any of its subdomains)
+BLOCKED_DOMAINS = tuple(d for d in os.environ.get(
+    "HEAL_BLOCKED_DOMAINS",
+    "amazon-adsystem.com,doubleclick.net,googlesyndication.com,google-analytics.com,"
+    "googletagmanager.com,scorecardresearch.com,fls-eu.amazon.in,unagi.amazon.in",
+).split(",") if d)
+
+
+def _host(url):
+    return url.split("://", 1)[-1].split("/", 1)[0].split(":", 1)[0].lower()
+
+
+def is_blocked(resource_type, url):
+    """
+    Whether a request is dropped in block/record mode.
+
+    Args:
+        resource_type (str): Playwright resource type ("image", "script", ...)
+        url (str): Request URL
+
+    Returns:
+        bool: True if the resource type or the host is on the block list
+    """
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    host = _host(url)
+    return any(host == domain or host.endswith("." + domain) for domain in BLOCKED_DOMAINS)
+
+
+def _block(route):
+    if is_blocked(route.request.resource_type, route.request.url):
+        route.abort("blockedbyclient")
+    else:
+        route.fallback()
+
+
+class NetworkMode:
+    """Applies one of NETWORK_MODES to every browser context a run creates."""
+
+    def __init__(self, mode=DEFAULT_NETWORK_MODE, har_dir=HAR_DIR):
+        """
+        Args:
+            mode (str): One of NETWORK_MODES
+            har_dir (str): Directory the HAR archives are recorded to and replayed from
+        """
+        if mode not in NETWORK_MODES:
+            raise ValueError(f"Unknown network mode {mode!r}; expected one of {', '.join(NETWORK_MODES)}")
+        self.mode = mode
+        self.har_dir = har_dir
+        # Shared by every thread creating contexts (e.g. the load runner's workers)
+        self._recorded = itertools.count()
+        if mode == "record":
+            os.makedirs(har_dir, exist_ok=True)
+            # A recording replaces this worker's previous one rather than mixing with it
+            for path in glob.glob(os.path.join(har_dir, f"{self._prefix()}-*.har.zip")):
+                os.remove(path)
+        elif mode == "replay" and not self.har_paths():
+            raise FileNotFoundError(f"No recorded HAR archives in {har_dir}; run once with --network-mode record")
+
+    @staticmethod
+    def _prefix():
+        return f"session-{os.environ.get('PYTEST_XDIST_WORKER', 'main')}"
+
+    def har_paths(self):
+        """Recorded archives, from every worker that recorded."""
+        return sorted(glob.glob(os.path.join(self.har_dir, "session-*.har.zip")))
+
+    def apply(self, context):
+        """
+        Install this mode's routes on a new browser context (before any page is opened).
+
+        Args:
+            context (BrowserContext): Playwright browser context
+        """
+        if self.mode == "replay":
+            # Routes run newest first: each archive falls through to the next, and
+            # a request none of them recorded is aborted instead of going online
+            context.route("**/*", lambda route: route.abort("internetdisconnected"))
+            for path in self.har_paths():
+                context.route_from_har(path, not_found="fallback")
+            return
+        if self.mode == "record":
+            path = os.path.join(self.har_dir, f"{self._prefix()}-{next(self._recorded)}.har.zip")
+            # Written when the context closes; bodies stored as separate zip entries
+            context.route_from_har(path, update=True, update_content="attach", update_mode="minimal")
+            logger.info(f"Recording network traffic to {path}")
+        if self.mode in ("block", "record"):
+            context.route("**/*", _block)
@@ -0,0 +1,210 @@
+"""
+In-page readiness signal for page objects.
+
+Page objects used to follow almost every action with expect_primary_nav_visible(),
+which passes as soon as the nav bar is on screen - usually before the action
+did anything - so the next step often ran against a half-rendered page, timed
+out and healed a selector that was never broken.
+
+This module injects a small monitor (window.__pageReadiness) into every page of
+a browser context. It tracks:
+
+- fetch/XHR requests in flight (requests open longer than LONG_REQUEST_MS, such
+  as long polls and beacons, are not waited for)
+- the time since the last DOM mutation; animation does not count: attribute-only
+  changes to ANIMATION_ATTRIBUTES (style, class, aria-hidden) and any change inside
+  an ANIMATED_REGIONS element (a carousel rotating on its own) are ignored, so
+  pages with carousels still go quiet
+- navigation state (document still loading, or unloading for a navigation; a
+  navigation that was cancelled after beforeunload, e.g. a download link, stops
+  counting after NAVIGATION_GRACE_MS)
+
+wait_for_quiescence() waits until the page has been quiet for READY_IDLE_MS,
+polling inside the page in a single Playwright call that survives navigations.
+If the page is still busy at READY_TIMEOUT_MS it logs a warning with what kept
+it busy and carries on. BasePage.wait_until_ready() combines it with the
+action's own condition (a URL or an element that must appear).
+"""
+
+import json
+import logging
+import os
+import time
+from playwright.sync_api import Error as PlaywrightError
+
+logger = logging.getLogger(__name__)
+
+# Quiet time (no DOM mutations, no network activity) that counts as ready
+READY_IDLE_MS = int(os.environ.get("HEAL_READY_IDLE_MS", "400"))
+
+# Longest wait for quiescence before carrying on anyway
+READY_TIMEOUT_MS = int(os.environ.get("HEAL_READY_TIMEOUT_MS", "5000"))
+
+# Requests open longer than this are treated as background traffic
+LONG_REQUEST_MS = 2000
+
+# In-page polling interval
+POLL_INTERVAL_MS = 50
+
+# A beforeunload not followed by an unload within this time was a cancelled navigation
+NAVIGATION_GRACE_MS = 3000
+
+# Attribute-only mutations of these attributes are animation, not content changes
+ANIMATION_ATTRIBUTES = ("style", "class", "aria-hidden")
+
+# Mutations inside these elements are ignored (they change on a timer, not in response to actions)
+ANIMATED_REGIONS = '[aria-roledescription="carousel"], .a-carousel-container, marquee'
+
+# Installed once per page (idempotent, so re-injecting is harmless)
+READINESS_JS = """(() => {
+    if (window.__pageReadiness) return;
+    const inflight = new Map();
+    let nextId = 0;
+    let lastActivity = performance.now();
+    let navigatingSince = null;
+    const begin = () => {
+        const id = nextId++;
+        inflight.set(id, performance.now());
+        lastActivity = performance.now();
+        return id;
+    };
+    const end = id => {
+        inflight.delete(id);
+        lastActivity = performance.now();
+    };
+
+    const originalFetch = window.fetch;
+    if (originalFetch) {
+        window.fetch = function (...args) {
+            const id = begin();
+            return originalFetch.apply(this, args).finally(() => end(id));
+        };
+    }
+    const originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function (...args) {
+        const id = begin();
+        this.addEventListener('loadend', () => end(id), {once: true});
+        return originalSend.apply(this, args);
+    };
+
+    const animationAttributes = new Set(__ANIMATION_ATTRIBUTES__);
+    const isAnimation = r => {
+        if (r.type === 'attributes' && animationAttributes.has(r.attributeName)) return true;
+        const element = r.target.nodeType === Node.ELEMENT_NODE ? r.target : r.target.parentElement;
+        return !!(element && element.closest(__ANIMATED_REGIONS__));
+    };
+    new MutationObserver(records => {
+        if (records.some(r => !isAnimation(r))) lastActivity = performance.now();
+    }).observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+
+    // A cancelled navigation never unloads the page, so the flag also expires (see state())
+    const loaded = () => { navigatingSince = null; lastActivity = performance.now(); };
+    window.addEventListener('beforeunload', () => { navigatingSince = performance.now(); });
+    window.addEventListener('pageshow', loaded);
+    document.addEventListener('DOMContentLoaded', loaded);
+
+    window.__pageReadiness = {
+        state(longRequestMs, navigationGraceMs) {
+            const now = performance.now();
+            let active = 0;
+            for (const started of inflight.values()) if (now - started < longRequestMs) active++;
+            if (navigatingSince !== null && now - navigatingSince >= navigationGraceMs) {
+                navigatingSince = null;
+            }
+            return {
+                loading: document.readyState === 'loading',
+                navigating: navigatingSince !== null,
+                inflight: active,
+                idleMs: now - lastActivity,
+            };
+        },
+        isQuiet({idleMs, longRequestMs, navigationGraceMs}) {
+            const s = this.state(longRequestMs, navigationGraceMs);
+            return !s.loading && !s.navigating && s.inflight === 0 && s.idleMs >= idleMs;
+        },
+    };
+})()""".replace("__ANIMATION_ATTRIBUTES__", json.dumps(list(ANIMATION_ATTRIBUTES))).replace(
+    "__ANIMATED_REGIONS__", json.dumps(ANIMATED_REGIONS))
+
+# Installs the monitor if the page predates the init script, then checks it
+_QUIET_CHECK = f"args => {{ {READINESS_JS}; return window.__pageReadiness.isQuiet(args); }}"
+
+# What kept the page busy, for the soft-fail warning
+_BUSY_STATE = ("args => window.__pageReadiness"
+               " ? window.__pageReadiness.state(args.longRequestMs, args.navigationGraceMs) : null")
+
+_QUIET_ARGS = {"longRequestMs": LONG_REQUEST_MS, "navigationGraceMs": NAVIGATION_GRACE_MS}
+
+
+def install_readiness(context):
+    """
+    Register the readiness monitor as an init script so every page in the context has it.
+
+    Args:
+        context (BrowserContext): Playwright browser context (pages opened later,
+            including popups, inherit the script)
+    """
+    context.add_init_script(script=READINESS_JS)
+
+
+async def install_readiness_async(context):
+    """Async version of install_readiness() for playwright.async_api contexts."""
+    await context.add_init_script(script=READINESS_JS)
+
+
+def _log_result(quiet, started, busy_state=None):
+    waited_ms = (time.perf_counter() - started) * 1000
+    if quiet:
+        logger.debug(f"Page quiet after {waited_ms:.0f} ms")
+    else:
+        logger.warning(f"Page still busy after {waited_ms:.0f} ms ({_describe(busy_state)}); carrying on")
+    return quiet
+
+
+def _describe(busy_state):
+    """Summarize a readiness state ({"loading", "navigating", "inflight", "idleMs"}) for the log."""
+    if not busy_state:
+        return "state unavailable"
+    return (f"loading={busy_state['loading']}, navigating={busy_state['navigating']}, "
+            f"{busy_state['inflight']} requests in flight, last change {busy_state['idleMs']:.0f} ms ago")
+
+
+def wait_for_quiescence(page, idle_ms=READY_IDLE_MS, timeout=READY_TIMEOUT_MS):
+    """
+    Wait until the page has no pending navigation or requests and has stopped changing.
+
+    Args:
+        page (Page): Playwright page to wait on
+        idle_ms (int): Quiet time required
+        timeout (int): Milliseconds to wait before giving up
+
+    Returns:
+        bool: True if the page went quiet, False if it was still busy at the timeout
+            (callers carry on either way; readiness is not an assertion)
+    """
+    started = time.perf_counter()
+    try:
+        page.wait_for_function(_QUIET_CHECK, arg={"idleMs": idle_ms, **_QUIET_ARGS},
+                               polling=POLL_INTERVAL_MS, timeout=timeout)
+        return _log_result(True, started)
+    except PlaywrightError:
+        try:
+            busy_state = page.evaluate(_BUSY_STATE, _QUIET_ARGS)
+        except PlaywrightError:
+            busy_state = None
+        return _log_result(False, started, busy_state)
+
+
+async def wait_for_quiescence_async(page, idle_ms=READY_IDLE_MS, timeout=READY_TIMEOUT_MS):
+    """Async version of wait_for_quiescence() for playwright.async_api pages."""
+    started = time.perf_counter()
+    try:
+        await page.wait_for_function(_QUIET_CHECK, arg={"idleMs": idle_ms, **_QUIET_ARGS},
+                                     polling=POLL_INTERVAL_MS, timeout=timeout)
+        return _log_result(True, started)
+    except PlaywrightError:
+        try:
+            busy_state = await page.evaluate(_BUSY_STATE, _QUIET_ARGS)
+        except PlaywrightError:
+            busy_state = None
+        return _log_result(False, started, busy_state)
@@ -0,0 +1,319 @@
+"""
+Opt-in profiling of page object steps.
+
+Heal telemetry says how long healing takes, but not which page object step is
+slow otherwise (a search, a filter click, a popup wait, a quantity dropdown).
+With profiling enabled (--profile-pom or HEAL_PROFILE_POM=1), every public
+method of a BasePage/AsyncBasePage subclass becomes a profiled step (wrapped by
+profile_methods() from __init_subclass__), which records:
+
+- wall time
+- Playwright API calls made by the step: public sync API methods of pages,
+  frames, locators, element handles, keyboard/mouse and expect() assertions;
+  calls made by another API call are not counted twice
+- browser round trips: protocol messages sent to the Playwright driver (one per
+  call that reaches the browser; locator building makes none)
+- time in waits (wait_for_*, expect() assertions) versus actions (everything
+  else); the rest of the wall time is Python, heal and expect_* blocks
+
+Steps nest (a step calling another page object method includes its figures).
+Each test's steps are written as a Chrome trace-event timeline to
+.heal_telemetry/profiles/<test>.json (open it in chrome://tracing or
+Perfetto), and at the end of the session the steps of all tests and workers
+are aggregated into a slowest-steps table.
+
+When profiling is off the wrappers only check a flag, and Playwright is not
+patched at all.
+"""
+
+import contextvars
+import functools
+import glob
+import inspect
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from playwright._impl._connection import Connection
+from playwright.sync_api import (
+    BrowserContext, ElementHandle, Frame, FrameLocator, Keyboard, Locator, LocatorAssertions, Mouse, Page,
+    PageAssertions,
+)
+from tests.heal_telemetry import TELEMETRY_DIR
+from tests.selector_health import percentile
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.path.join(TELEMETRY_DIR, "profiles")
+
+PROFILING_ENABLED = os.environ.get("HEAL_PROFILE_POM", "0") == "1"
+
+# Public sync API classes whose method calls are counted as Playwright calls
+INSTRUMENTED_CLASSES = (
+    Page, Frame, Locator, FrameLocator, ElementHandle, Keyboard, Mouse, BrowserContext,
+    LocatorAssertions, PageAssertions,
+)
+
+# Rows in the session-end slowest-steps table
+TABLE_ROWS = 15
+
+_current_step = contextvars.ContextVar("pom_step", default=None)
+_in_api_call = contextvars.ContextVar("pom_api_call", default=False)
+
+
+def is_wait(method_name):
+    """Whether a Playwright method waits for a condition rather than acting on the page."""
+    return method_name.startswith(("wait_for", "expect_", "to_", "not_to_"))
+
+
+class StepRecord:
+    """Measurements for one page object step."""
+
+    def __init__(self, name, parent):
+        self.name = name
+        self.parent = parent
+        self.started_ns = time.perf_counter_ns()
+        self.wall_ms = 0.0
+        self.api_calls = 0
+        self.round_trips = 0
+        self.wait_ms = 0.0
+        self.action_ms = 0.0
+
+    def add_api_call(self, wait, elapsed_ms):
+        """Count an API call in this step and every step it is nested in."""
+        step = self
+        while step is not None:
+            step.api_calls += 1
+            if wait:
+                step.wait_ms += elapsed_ms
+            else:
+                step.action_ms += elapsed_ms
+            step = step.parent
+
+    def add_round_trip(self):
+        step = self
+        while step is not None:
+            step.round_trips += 1
+            step = step.parent
+
+
+class PomProfiler:
+    """Collects page object steps for the current test and writes them as a Chrome trace."""
+
+    def __init__(self, directory=PROFILE_DIR):
+        """
+        Args:
+            directory (str): Directory for per-test trace files
+        """
+        self.directory = directory
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._events = []
+        self._origin_ns = time.perf_counter_ns()
+        self._installed = False
+
+    def enable(self):
+        """Patch Playwright's counters in (once) and start recording steps."""
+        if not self._installed:
+            _instrument_playwright()
+            self._installed = True
+        self.enabled = True
+
+    def reset(self):
+        """
+        Start a new session: the main process (not a pytest-xdist worker) removes
+        the previous session's trace files.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        if os.environ.get("PYTEST_XDIST_WORKER") is None:
+            for stale_path in glob.glob(os.path.join(self.directory, "*.json")):
+                os.remove(stale_path)
+
+    def begin_test(self):
+        """Start a new timeline (steps recorded before it, e.g. by session fixtures, are dropped)."""
+        with self._lock:
+            self._events = []
+            self._origin_ns = time.perf_counter_ns()
+
+    def end_test(self, test_id):
+        """
+        Write the current timeline as a Chrome trace-event file.
+
+        Args:
+            test_id (str): Test node id (also the file name, sanitized)
+
+        Returns:
+            str | None: Path of the trace file, or None if the test ran no profiled step
+        """
+        with self._lock:
+            events, self._events = self._events, []
+        if not events:
+            return None
+        path = os.path.join(self.directory, re.sub(r"[^\w.-]+", "_", test_id).strip("_") + ".json")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": events, "otherData": {"test": test_id}}, f)
+        except OSError as e:
+            logger.warning(f"Could not write page object profile {path}: {e}")
+            return None
+        return path
+
+    @contextmanager
+    def step(self, name):
+        """Profile a block as a page object step (nested in the current step, if any)."""
+        record = StepRecord(name, _current_step.get())
+        token = _current_step.set(record)
+        try:
+            yield record
+        finally:
+            _current_step.reset(token)
+            record.wall_ms = (time.perf_counter_ns() - record.started_ns) / 1e6
+            self._add_event(record)
+
+    def _add_event(self, record):
+        with self._lock:
+            self._events.append({
+                "name": record.name,
+                "cat": "pom",
+                "ph": "X",
+                "ts": (record.started_ns - self._origin_ns) / 1000,
+                "dur": record.wall_ms * 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": {
+                    "api_calls": record.api_calls,
+                    "round_trips": record.round_trips,
+                    "wait_ms": round(record.wait_ms, 2),
+                    "action_ms": round(record.action_ms, 2),
+                    "nested": record.parent is not None,
+                },
+            })
+
+    def load_all(self):
+        """
+        Read the step events of every trace file written this session (all workers).
+
+        Returns:
+            list[dict]: Trace events
+        """
+        events = []
+        for path in sorted(glob.glob(os.path.join(self.directory, "*.json"))):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    events.extend(json.load(f)["traceEvents"])
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Skipping unreadable page object profile {path}: {e}")
+        return events
+
+
+profiler = PomProfiler()
+
+
+def summarize_steps(events):
+    """
+    Aggregate step events by step name, slowest (by total wall time) first.
+
+    Args:
+        events (list[dict]): Trace events as written by PomProfiler
+
+    Returns:
+        list[dict]: {"step", "count", "total_ms", "p50_ms", "p95_ms", "max_ms",
+                     "api_calls", "round_trips", "wait_ms", "action_ms"} per step;
+                     call, round-trip, wait and action figures are per-step means
+    """
+    by_name = {}
+    for event in events:
+        by_name.setdefault(event["name"], []).append(event)
+    rows = []
+    for name, group in by_name.items():
+        wall = [e["dur"] / 1000 for e in group]
+        count = len(group)
+        rows.append({
+            "step": name,
+            "count": count,
+            "total_ms": round(sum(wall), 1),
+            "p50_ms": round(percentile(wall, 0.5), 1),
+            "p95_ms": round(percentile(wall, 0.95), 1),
+            "max_ms": round(max(wall), 1),
+            "api_calls": round(sum(e["args"]["api_calls"] for e in group) / count, 1),
+            "round_trips": round(sum(e["args"]["round_trips"] for e in group) / count, 1),
+            "wait_ms": round(sum(e["args"]["wait_ms"] for e in group) / count, 1),
+            "action_ms": round(sum(e["args"]["action_ms"] for e in group) / count, 1),
+        })
+    return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+
+def profile_method(name, func):
+    """
+    Wrap a page object method so each call is a profiled step while profiling is enabled.
+
+    Args:
+        name (str): Step name, e.g. "HomePage.search"
+        func (Callable): The method (sync or async)
+
+    Returns:
+        Callable: The wrapper
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return await func(*args, **kwargs)
+            with profiler.step(name):
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not profiler.enabled:
+            return func(*args, **kwargs)
+        with profiler.step(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def profile_methods(cls):
+    """Wrap every public method a page object class defines (called from __init_subclass__)."""
+    for name, value in list(vars(cls).items()):
+        if not name.startswith("_") and inspect.isfunction(value):
+            setattr(cls, name, profile_method(f"{cls.__name__}.{name}", value))
+
+
+def _count_api_call(name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        step = _current_step.get()
+        if step is None or _in_api_call.get():
+            return func(*args, **kwargs)
+        token = _in_api_call.set(True)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _in_api_call.reset(token)
+            step.add_api_call(is_wait(name), (time.perf_counter() - started) * 1000)
+    return wrapper
+
+
+def _instrument_playwright():
+    for cls in INSTRUMENTED_CLASSES:
+        for name, value in list(vars(cls).items()):
+            if not name.startswith("_") and inspect.isfunction(value):
+                setattr(cls, name, _count_api_call(name, value))
+
+    # Every protocol message to the driver goes through here; the sync API runs it in
+    # a task created from the calling code, so the current step is visible
+    send = Connection._send_message_to_server
+
+    @functools.wraps(send)
+    def counting_send(self, *args, **kwargs):
+        step = _current_step.get()
+        if step is not None:
+            step.add_round_trip()
+        return send(self, *args, **kwargs)
+
+    Connection._send_message_to_server = counting_send
@@ -0,0 +1,145 @@
+"""
+Rule-based selector candidate generation.
+
+Produces a ranked list of candidate selectors for the element described by
+`desc` straight from the HTML context, without a model call. The candidates are
+appended after the model's own suggestions and validated together in a single
+in-page call (see heal_resolver), so a wrong model answer can still be rescued
+by a deterministic selector instead of another multi-second model request.
+
+Only the elements a click would land on are used: clickable matches and the
+innermost matches (e.g. a span inside a link). Containers whose text merely
+includes a match - a list item, the list, the whole filter panel - are skipped,
+as their selectors would resolve to a sibling or to nothing clickable. Candidates
+are ranked by how stable the attribute they rely on tends to be: data-testid, id,
+aria-label, name, then classes. An href prefix is not used: sibling links on a
+page (filters, pagination) usually share it.
+"""
+
+import re
+from html.parser import HTMLParser
+from tests.html_compactor import VOID_TAGS
+
+# Elements a click would normally land on (the heal flow and the in-page resolver use the same set)
+CLICKABLE_TAGS = {"a", "button", "input", "label", "select", "summary"}
+CLICKABLE_ROLES = {"button", "link", "checkbox", "menuitem", "option", "tab"}
+
+# CSS selector list matching CLICKABLE_TAGS and CLICKABLE_ROLES, for Element.closest() in page scripts
+CLICKABLE_CSS = ", ".join(sorted(CLICKABLE_TAGS) + [f'[role="{role}"]' for role in sorted(CLICKABLE_ROLES)])
+
+# Attributes whose value is compared against the description, besides text content
+LABEL_ATTRIBUTES = ("aria-label", "title", "alt", "placeholder", "value")
+
+_CSS_IDENTIFIER = re.compile(r"^-?[_a-zA-Z][_a-zA-Z0-9-]*$")
+
+
+class _Element:
+    __slots__ = ("tag", "attrs", "depth", "parent", "text")
+
+    def __init__(self, tag, attrs, depth, parent):
+        self.tag = tag
+        self.attrs = attrs
+        self.depth = depth
+        self.parent = parent
+        self.text = []
+
+    @property
+    def clickable(self):
+        return self.tag in CLICKABLE_TAGS or self.attrs.get("role") in CLICKABLE_ROLES
+
+
+class _ElementCollector(HTMLParser):
+    """Collects every element with its attributes, depth, parent and full text content."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.elements = []
+        self._open = []
+
+    def handle_starttag(self, tag, attrs):
+        element = _Element(tag, {k: v or "" for k, v in attrs}, len(self._open), self._open[-1] if self._open else None)
+        self.elements.append(element)
+        if tag not in VOID_TAGS:
+            self._open.append(element)
+
+    def handle_endtag(self, tag):
+        for index in range(len(self._open) - 1, -1, -1):
+            if self._open[index].tag == tag:
+                del self._open[index:]
+                break
+
+    def handle_data(self, data):
+        for element in self._open:
+            element.text.append(data)
+
+
+def _quote(value):
+    """Quote a value for use inside a CSS attribute selector."""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _selectors_for(element):
+    """Selectors for one element, most stable attribute first."""
+    tag, attrs = element.tag, element.attrs
+    selectors = []
+    if attrs.get("data-testid"):
+        selectors.append(f"[data-testid={_quote(attrs['data-testid'])}]")
+    if attrs.get("id"):
+        element_id = attrs["id"]
+        selectors.append(f"#{element_id}" if _CSS_IDENTIFIER.match(element_id) else f"[id={_quote(element_id)}]")
+    if attrs.get("aria-label"):
+        selectors.append(f"{tag}[aria-label={_quote(attrs['aria-label'])}]")
+    if attrs.get("name"):
+        selectors.append(f"{tag}[name={_quote(attrs['name'])}]")
+    classes = [c for c in attrs.get("class", "").split() if _CSS_IDENTIFIER.match(c)][:3]
+    if classes:
+        selectors.append(tag + "".join(f".{c}" for c in classes))
+    return selectors
+
+
+def rule_based_candidates(html_snippet, desc, broken_selector=None, limit=8):
+    """
+    Generate candidate selectors for the element matching a description.
+
+    Args:
+        html_snippet (str): HTML context containing the target element
+        desc (str): Human-readable description of the element to locate
+        broken_selector (str): Selector that failed; never returned as a candidate
+        limit (int): Maximum number of candidates to return
+
+    Returns:
+        list[str]: Candidate selectors, most stable first
+    """
+    target = re.sub(r"\s+", " ", desc or "").strip().lower()
+    if not target:
+        return []
+
+    collector = _ElementCollector()
+    collector.feed(html_snippet or "")
+    collector.close()
+
+    matches = []
+    for element in collector.elements:
+        text = re.sub(r"\s+", " ", "".join(element.text)).strip().lower()
+        labels = " ".join(element.attrs.get(name, "") for name in LABEL_ATTRIBUTES).lower()
+        if target in text or target in labels:
+            matches.append(element)
+
+    # Skip containers: non-clickable elements that only match through a matching descendant
+    containers = set()
+    for element in matches:
+        ancestor = element.parent
+        while ancestor is not None and id(ancestor) not in containers:
+            containers.add(id(ancestor))
+            ancestor = ancestor.parent
+    matches = [e for e in matches if e.clickable or id(e) not in containers]
+
+    # Clickable elements first, then the most specific (deepest) matches
+    matches.sort(key=lambda e: (not e.clickable, -e.depth))
+
+    candidates = []
+    for element in matches:
+        for selector in _selectors_for(element):
+            if selector != broken_selector and selector not in candidates:
+                candidates.append(selector)
+    return candidates[:limit]
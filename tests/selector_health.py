@@ -0,0 +1,233 @@
+"""
+Adaptive click timeouts and a circuit breaker for known-broken selectors.
+
+smart_click() used to wait the full hard-coded 3000 ms on the original selector
+before healing, and never remembered the outcome, so a permanently broken
+selector cost 3 s plus a heal on every run. This module keeps per-selector
+health, persisted between runs:
+
+- time-to-actionable samples, whose p95 sets the initial timeout (clamped to
+  [MIN_TIMEOUT_MS, DEFAULT_TIMEOUT_MS], or a caller's own ceiling) once enough
+  samples exist
+- a circuit breaker: after FAILURE_THRESHOLD consecutive failures the original
+  selector is skipped and the last good healed selector is used directly; every
+  PROBE_INTERVAL-th call re-probes the original in case it has been fixed, and
+  falls back to the healed selector if it has not
+"""
+
+import atexit
+import json
+import logging
+import math
+import os
+import threading
+from tests.shared_files import file_lock, write_atomic
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.environ.get(
+    "HEAL_SELECTOR_HEALTH_PATH", os.path.join(".heal_cache", "selector_health.json")
+)
+
+# Timeout used until a selector has MIN_SAMPLES latency samples, and the upper bound afterwards
+# (callers such as slow page objects may pass a higher ceiling)
+DEFAULT_TIMEOUT_MS = 3000
+
+# Lower bound for the adaptive timeout
+MIN_TIMEOUT_MS = 500
+
+# Headroom applied to the p95 time-to-actionable
+TIMEOUT_HEADROOM = 2.0
+
+# Samples needed before the timeout adapts, and samples kept per selector
+MIN_SAMPLES = 5
+MAX_SAMPLES = 50
+
+# Consecutive failures that open the circuit
+FAILURE_THRESHOLD = 3
+
+# While the circuit is open, the original selector is re-probed on every Nth call
+PROBE_INTERVAL = 10
+
+
+def percentile(samples, fraction):
+    """
+    Nearest-rank percentile of a list of numbers.
+
+    Args:
+        samples (Iterable[float]): Values to summarize
+        fraction (float): Percentile as a fraction, e.g. 0.95
+
+    Returns:
+        float | None: The percentile, or None if there are no samples
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    # Rank ceil(fraction * n); round() would round halves to even and pick a lower rank
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class SelectorHealth:
+    """Per-selector latency statistics and circuit-breaker state."""
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        """
+        Args:
+            path (str): Location of the JSON store, or None for memory only
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = set()
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read selector health store {path}: {e}")
+
+    @staticmethod
+    def _key(selector, desc):
+        return f"{selector}\x1f{desc}"
+
+    def _entry(self, selector, desc):
+        key = self._key(selector, desc)
+        self._dirty.add(key)
+        return self._entries.setdefault(key, {
+            "samples_ms": [],
+            "consecutive_failures": 0,
+            "open": False,
+            "calls_since_probe": 0,
+            "healed_selector": None,
+        })
+
+    def stats(self, selector, desc):
+        """
+        Returns:
+            dict: p50/p95 time-to-actionable (ms), sample count, failure streak and breaker state
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(selector, desc), {})
+            samples = entry.get("samples_ms", [])
+            return {
+                "p50_ms": percentile(samples, 0.5),
+                "p95_ms": percentile(samples, 0.95),
+                "samples": len(samples),
+                "consecutive_failures": entry.get("consecutive_failures", 0),
+                "open": entry.get("open", False),
+            }
+
+    def timeout_for(self, selector, desc, max_timeout=None):
+        """
+        Initial timeout for the original selector, derived from its p95 time-to-actionable.
+
+        Args:
+            selector (str): Original selector
+            desc (str): Human-readable description of the element
+            max_timeout (int): Timeout until enough samples exist, and the upper bound afterwards
+                (None for DEFAULT_TIMEOUT_MS, looked up on every call)
+
+        Returns:
+            int: Timeout in milliseconds
+        """
+        if max_timeout is None:
+            max_timeout = DEFAULT_TIMEOUT_MS
+        with self._lock:
+            samples = self._entries.get(self._key(selector, desc), {}).get("samples_ms", [])
+            if len(samples) < MIN_SAMPLES:
+                return max_timeout
+            adaptive = percentile(samples, 0.95) * TIMEOUT_HEADROOM
+            return int(min(max_timeout, max(MIN_TIMEOUT_MS, adaptive)))
+
+    def bypass_selector(self, selector, desc):
+        """
+        Healed selector to use instead of the original while the circuit is open.
+
+        Returns:
+            str | None: The last good healed selector, or None when the original
+            should be tried (circuit closed, no healed selector, or probe due)
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(selector, desc))
+            if not entry or not entry["open"] or not entry["healed_selector"]:
+                return None
+            self._dirty.add(self._key(selector, desc))
+            entry["calls_since_probe"] += 1
+            if entry["calls_since_probe"] >= PROBE_INTERVAL:
+                # Half-open: let this call try the original selector again
+                entry["calls_since_probe"] = 0
+                return None
+            return entry["healed_selector"]
+
+    def healed_selector(self, selector, desc):
+        """
+        Healed selector to fall back to after a failed probe of the original.
+
+        Returns:
+            str | None: The last good healed selector while the circuit is open, else None
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(selector, desc))
+            if not entry or not entry["open"]:
+                return None
+            return entry["healed_selector"]
+
+    def record_success(self, selector, desc, elapsed_ms):
+        """Record a successful click on the original selector and close the circuit."""
+        with self._lock:
+            entry = self._entry(selector, desc)
+            entry["samples_ms"] = (entry["samples_ms"] + [round(elapsed_ms, 1)])[-MAX_SAMPLES:]
+            entry["consecutive_failures"] = 0
+            if entry["open"]:
+                logger.info(f"Circuit closed for {desc}: original selector {selector} works again")
+                entry["open"] = False
+
+    def record_failure(self, selector, desc):
+        """Record a timeout on the original selector; opens the circuit after FAILURE_THRESHOLD in a row."""
+        with self._lock:
+            entry = self._entry(selector, desc)
+            entry["consecutive_failures"] += 1
+            if not entry["open"] and entry["consecutive_failures"] >= FAILURE_THRESHOLD:
+                logger.warning(f"Circuit opened for {desc}: {selector} failed {entry['consecutive_failures']} times in a row")
+                entry["open"] = True
+                entry["calls_since_probe"] = 0
+
+    def record_heal(self, selector, desc, healed_selector):
+        """Remember the healed selector that last worked for a broken selector."""
+        with self._lock:
+            self._entry(selector, desc)["healed_selector"] = healed_selector
+
+    def forget_heal(self, selector, desc):
+        """Drop a healed selector that stopped working while the circuit was open."""
+        with self._lock:
+            self._entry(selector, desc)["healed_selector"] = None
+
+    def flush(self):
+        """Persist entries changed in this process, merged over whatever other workers wrote."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                # Locked from the re-read to the write, so workers flushing together keep each other's entries
+                with file_lock(f"{self.path}.lock"):
+                    merged = {}
+                    if os.path.exists(self.path):
+                        try:
+                            with open(self.path, encoding="utf-8") as f:
+                                merged = json.load(f)
+                        except (OSError, ValueError):
+                            merged = {}
+                    merged.update({key: self._entries[key] for key in self._dirty})
+                    write_atomic(self.path, json.dumps(merged))
+                self._dirty.clear()
+            except OSError as e:
+                logger.warning(f"Could not write selector health store {self.path}: {e}")
+
+
+# Shared store used by smart_click(); flushed at interpreter exit as a fallback to pytest_sessionfinish
+selector_health = SelectorHealth()
+atexit.register(selector_health.flush)
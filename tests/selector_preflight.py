@@ -0,0 +1,118 @@
+"""
+Eager selector pre-flight for page objects.
+
+Broken selectors used to be discovered one at a time, when the flow reached
+them, each costing a full click timeout plus a model call on the critical path.
+Page objects now declare their selectors as data (BasePage.SELECTORS) and call
+preflight() when they are constructed:
+
+- every declared selector is checked against the live page; CSS selectors are
+  validated together in one resolver call, Playwright-engine selectors (role=,
+  text=, ...) with one count() each, since the page cannot evaluate them itself
+- for each missing selector the context (HTML, or an accessibility-tree snapshot
+  for role selectors; see aria_context) is extracted on the calling thread
+  (sync Playwright is not thread-safe), then the model call is handed to a
+  background thread pool while the test carries on
+- smart_click() picks up the finished heal when the step is reached, so the
+  model latency overlaps with the test instead of adding to it
+
+Set HEAL_PREFLIGHT=0 to disable pre-flight.
+"""
+
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from tests import heal_flow
+from tests.ai_utils import get_healed_selectors
+from tests.aria_context import aria_context, context_kind_for
+from tests.heal_cache import heal_cache
+from tests.heal_resolver import resolve
+from tests.heal_telemetry import heal_trace, phase, record_outcome
+from tests.model_router import LATENCY_BUDGET_MS
+
+logger = logging.getLogger(__name__)
+
+PREFLIGHT_ENABLED = os.environ.get("HEAL_PREFLIGHT", "1") != "0"
+
+# Background model calls running at once across all page objects
+PREFLIGHT_WORKERS = int(os.environ.get("HEAL_PREFLIGHT_WORKERS", "2"))
+
+_executor = ThreadPoolExecutor(max_workers=PREFLIGHT_WORKERS, thread_name_prefix="heal-preflight")
+
+
+def _heal_in_background(selector, desc, context):
+    """Model call for a missing selector (runs on a pool thread; no Playwright calls here)."""
+    with heal_trace(selector, desc):
+        with phase("model"):
+            # Bounded like a heal on the test thread, which stops waiting for this one after the budget
+            candidates = get_healed_selectors(selector, context.model_html, desc, context_kind=context.kind,
+                                              timeout=LATENCY_BUDGET_MS / 1000)
+        extra = heal_flow.fallback_candidates(selector, desc, context)
+        candidates += [c for c in extra if c not in candidates]
+        record_outcome("background")
+    logger.info(f"PREFLIGHT: Background heal for {desc} ready with {len(candidates)} candidates")
+    return candidates
+
+
+def preflight(page, selectors, page_name="page"):
+    """
+    Validate declared selectors and start healing the missing ones in the background.
+
+    Args:
+        page (Page): Playwright page the selectors belong to
+        selectors (Iterable[tuple[str, str]]): (selector, description) pairs
+        page_name (str): Page object name, for logging
+
+    Returns:
+        dict[tuple[str, str], Future]: Background heals for the missing selectors, keyed by
+        (selector, description); each resolves to (dom_fingerprint, candidate selectors)
+    """
+    selectors = list(dict.fromkeys(selectors))
+    if not selectors:
+        return {}
+    # Elements rendered during page load should not be mistaken for broken selectors
+    page.wait_for_load_state()
+
+    # One in-page call for all CSS selectors; the resolver reports an error for the rest
+    checks = resolve(page, candidates=[selector for selector, _ in selectors])["candidates"]
+    counts = {}
+    for check in checks:
+        if "error" in check:
+            counts[check["selector"]] = page.locator(check["selector"]).count()
+        else:
+            counts[check["selector"]] = check["count"]
+    missing = [(selector, desc) for selector, desc in selectors if not counts[selector]]
+    if not missing:
+        logger.info(f"PREFLIGHT: All {len(selectors)} selectors found on {page_name}")
+        return {}
+    logger.warning(f"PREFLIGHT: {len(missing)} of {len(selectors)} selectors missing on {page_name}; "
+                   f"healing in the background: {[desc for _, desc in missing]}")
+
+    preheals = {}
+    for selector, desc in missing:
+        anchor_result = resolve(page, desc=desc, selector=selector)
+        snapshot = aria_context(page, anchor_result, desc) if context_kind_for(selector) == "aria" else None
+        context = heal_flow.build_context(anchor_result, desc, snapshot, include_changes=False)
+        cached = heal_cache.get(selector, desc, context.fingerprint)
+        if cached is not None:
+            future = Future()
+            future.set_result([cached])
+        else:
+            future = _executor.submit(_heal_in_background, selector, desc, context)
+        # Callers need the fingerprint to cache whichever candidate ends up working
+        preheals[(selector, desc)] = _with_fingerprint(future, context.fingerprint)
+    return preheals
+
+
+def _with_fingerprint(future, fingerprint):
+    """Chain a candidates future into one resolving to (fingerprint, candidates)."""
+    chained = Future()
+
+    def _done(source):
+        if source.exception() is not None:
+            chained.set_exception(source.exception())
+        else:
+            chained.set_result((fingerprint, source.result()))
+
+    future.add_done_callback(_done)
+    return chained
@@ -0,0 +1,76 @@
+"""
+Files shared between processes.
+
+The heal cache, the selector health store, the model router's statistics and
+the captured storage state are single files that every pytest-xdist worker (and
+any parallel session) reads and writes. file_lock() serializes their
+read-modify-write cycles across processes, and write_atomic() replaces a file in
+one step so readers never see a partial one and a failed write leaves nothing
+behind.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+# Seconds to wait for a store lock; a lock file older than this was left by a crashed process
+STORE_LOCK_TIMEOUT = 10
+
+
+@contextmanager
+def file_lock(path, timeout=STORE_LOCK_TIMEOUT):
+    """
+    Cross-process lock held by creating `path` exclusively; stale locks expire after `timeout`.
+
+    Raises:
+        TimeoutError: If the lock could not be taken within timeout seconds
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) > timeout:
+                    os.remove(path)
+                    continue
+            except OSError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out waiting for lock {path}")
+            time.sleep(0.01)
+    try:
+        os.close(fd)
+        yield
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def write_atomic(path, text):
+    """
+    Replace a file's contents in one step.
+
+    Args:
+        path (str): File to write (its directory is created if needed)
+        text (str): New contents
+
+    Raises:
+        OSError: If the file could not be written (the temporary file is removed)
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,137 @@
+"""
+Stub Ollama server for offline tests and benchmarks.
+
+Implements just enough of the Ollama HTTP API (/api/generate, /api/tags) for the
+ollama client to talk to it, with a deterministic responder instead of a real
+model. Counts calls and can add artificial latency so tests can check request
+deduplication, concurrency limits and timeouts without a GPU or network.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubModelServer:
+    """Threaded HTTP server that answers Ollama generate requests deterministically."""
+
+    def __init__(self, responder="#healed", delay=0.0, host="127.0.0.1", port=0):
+        """
+        Args:
+            responder (str | Callable[[dict], str]): Fixed response text, or a function
+                receiving the decoded request body and returning the response text
+            delay (float): Seconds to sleep before answering each generate request
+            host (str): Interface to bind to
+            port (int): Port to bind to (0 picks a free port)
+        """
+        self.responder = responder
+        self.delay = delay
+        self.calls = 0
+        self.connections = 0
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """Base URL to pass as the ollama client's host."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Shut the server down and wait for the serving thread to exit."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _respond(self, body):
+        """Record a generate request and produce its response text."""
+        with self._lock:
+            self.calls += 1
+            self.requests.append(body)
+        if self.delay:
+            time.sleep(self.delay)
+        return self.responder(body) if callable(self.responder) else self.responder
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def _send_json(self, payload, status=200):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json({"models": [{"model": "stub", "name": "stub"}]})
+                else:
+                    self._send_json({"error": "not found"}, status=404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if self.path != "/api/generate":
+                    self._send_json({"error": "not found"}, status=404)
+                    return
+
+                started = time.perf_counter_ns()
+                text = stub._respond(body)
+                elapsed = time.perf_counter_ns() - started
+                final = {
+                    "model": body.get("model", "stub"),
+                    "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    "done": True,
+                    "done_reason": "stop",
+                    "total_duration": elapsed,
+                    "prompt_eval_count": len(body.get("prompt", "")) // 4,
+                    "prompt_eval_duration": 0,
+                    "eval_count": len(text.split()),
+                    "eval_duration": elapsed,
+                }
+
+                if body.get("stream", True):
+                    # Newline-delimited JSON chunks, one per word, like a real streaming model
+                    chunks = [{"model": final["model"], "created_at": final["created_at"],
+                               "response": word, "done": False}
+                              for word in text.replace(" ", " \0").split("\0") if word]
+                    data = b"".join(json.dumps(c).encode("utf-8") + b"\n" for c in chunks)
+                    data += json.dumps({**final, "response": ""}).encode("utf-8") + b"\n"
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/x-ndjson")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                else:
+                    self._send_json({**final, "response": text})
+
+        return Handler
@@ -0,0 +1,65 @@
+"""
+Tests for parsing heal responses and the streaming stop condition.
+
+These run fully offline on hand-written model responses (no Ollama call).
+"""
+
+import pytest
+from tests.ai_utils import parse_response, parse_selectors, selectors_complete
+
+BROKEN = "#old-check"
+
+
+def test_parse_selectors_strips_list_decorations():
+    """Numbering, bullets and backticks are removed; order is kept."""
+    response = "1. `#today`\n2) a.s-navigation-item\n- li[aria-label=\"Get It Today\"] a\n* [data-testid=\"today\"]\n"
+
+    assert parse_selectors(response, BROKEN, 5) == [
+        "#today", "a.s-navigation-item", 'li[aria-label="Get It Today"] a', '[data-testid="today"]',
+    ]
+
+
+def test_parse_selectors_drops_prose_duplicates_and_the_broken_selector():
+    """Lead-in and closing sentences, repeats and the selector being healed are not candidates."""
+    response = (
+        "Here are the selectors:\n"
+        "#old-check\n"
+        "#today\n"
+        "\n"
+        "#today\n"
+        "#sw-gtc >> role=link[name=\"Go to Cart\"]\n"
+        "These target the delivery filter link.\n"
+    )
+
+    assert parse_selectors(response, BROKEN, 5) == ["#today", '#sw-gtc >> role=link[name="Go to Cart"]']
+
+
+def test_parse_selectors_drops_cut_off_lines_and_honours_count():
+    """A line with an unclosed quote or bracket is dropped; at most count candidates are returned."""
+    assert parse_selectors('#today\na[aria-label="Apply the filter', BROKEN, 5) == ["#today"]
+    assert parse_selectors("li:has(a\n#today\n", BROKEN, 5) == ["#today"]
+    assert parse_selectors("#a\n#b\n#c\n", BROKEN, 2) == ["#a", "#b"]
+
+
+def test_single_selector_is_complete_once_its_token_ends():
+    """With one selector requested, whitespace after a whole token (outside quotes) completes the response."""
+    assert not selectors_complete("#tod", BROKEN, 1)
+    assert not selectors_complete('a[aria-label="Go to ', BROKEN, 1)
+    assert selectors_complete('a[aria-label="Go to Cart"] ', BROKEN, 1)
+    assert parse_response('a[aria-label="Go to Cart"]\n\nThis selects the link.', BROKEN, 1) == [
+        'a[aria-label="Go to Cart"]'
+    ]
+
+
+def test_candidate_list_is_complete_after_count_finished_lines():
+    """With several requested, only newline-terminated valid lines count towards completion."""
+    assert not selectors_complete("#a\n#b\n#c", BROKEN, 3)
+    assert not selectors_complete("Here are the selectors:\n#a\n#old-check\n#b\n", BROKEN, 3)
+    assert selectors_complete("#a\n#b\n#c\n#d", BROKEN, 3)
+    assert parse_response("#a\n#b\n#c\n", BROKEN, 3) == ["#a", "#b", "#c"]
+
+
+def test_empty_single_selector_response_raises():
+    """An empty response cannot be healed from."""
+    with pytest.raises(IndexError):
+        parse_response("  \n", BROKEN, 1)
@@ -0,0 +1,57 @@
+"""
+Tests for the accessibility-tree heal context.
+
+These run fully offline on a hand-written ARIA snapshot (the same YAML-like
+format Playwright's aria_snapshot() returns).
+"""
+
+from tests.aria_context import aria_candidates, context_kind_for, prune_snapshot
+from tests.html_compactor import estimate_tokens
+
+SNAPSHOT = "\n".join([
+    '- navigation "Filters":',
+    '  - heading "Delivery Day" [level=2]',
+    '  - list:',
+    '    - listitem:',
+    '      - link "Apply the filter Get It Today to narrow results":',
+    '        - /url: /s?k=computer+mouse',
+    '    - listitem:',
+    '      - link "Apply the filter Get It by Tomorrow to narrow results"',
+    '  - heading "Brands" [level=2]',
+] + [f'  - checkbox "Brand {i}"' for i in range(200)])
+
+
+def test_role_selectors_heal_from_the_accessibility_tree():
+    """Only role selectors switch to the ARIA context in auto mode."""
+    assert context_kind_for('role=link[name="Apply the filter Get It Today to narrow results"]') == "aria"
+    assert context_kind_for('internal:role=button[name="Add to cart"s]') == "aria"
+    assert context_kind_for("#sw-gtc >> role=link[name=\"Go to Cart\"]") == "html"
+    assert context_kind_for("#nav-logo-sprites") == "html"
+    assert context_kind_for("#nav-logo-sprites", mode="aria") == "aria"
+
+
+def test_pruned_snapshot_keeps_the_anchor_and_its_ancestors():
+    """Pruning fits the budget around the best-matching line without losing the tree path to it."""
+    pruned = prune_snapshot(SNAPSHOT, "Get It Today", budget=80)
+
+    assert estimate_tokens(pruned) <= 80 + len(pruned.splitlines())
+    lines = pruned.splitlines()
+    assert '      - link "Apply the filter Get It Today to narrow results":' in lines
+    assert lines[0] == '- navigation "Filters":'
+    assert '    - listitem:' in lines
+    assert '  - checkbox "Brand 199"' not in lines
+
+
+def test_aria_candidates_match_the_whole_description_only():
+    """The node holding the description is a candidate; a sibling sharing some words and the broken selector are not."""
+    candidates = aria_candidates(SNAPSHOT, "Get It Today", broken_selector='role=link[name="Get It Today"]')
+
+    assert candidates == ['role=link[name="Apply the filter Get It Today to narrow results"]']
+    assert 'role=link[name="Apply the filter Get It by Tomorrow to narrow results"]' not in candidates
+    assert aria_candidates(SNAPSHOT, "Today Get It") == candidates
+
+
+def test_aria_candidates_skip_names_matching_several_nodes():
+    """A name that is also a substring of another node's name (Brand 1 of Brand 10..19) is not a candidate."""
+    assert aria_candidates(SNAPSHOT, "Brand 1") == []
+    assert aria_candidates(SNAPSHOT, "Brand 199") == ['role=checkbox[name="Brand 199"]']
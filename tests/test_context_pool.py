@@ -0,0 +1,173 @@
+"""
+Tests for the pre-warmed browser context pool.
+
+These run fully offline: a fake browser hands out fake contexts and pages that
+record what the pool does to them, and storage state files go to a temporary
+directory.
+"""
+
+import json
+import os
+import pytest
+from tests.context_pool import ContextPool, capture_storage_state, pool_size_for_worker
+
+START_URL = "https://www.amazon.in/"
+ORIGIN = "https://www.amazon.in"
+STATE = {
+    "cookies": [{"name": "session-id", "value": "123", "domain": ".amazon.in", "path": "/"}],
+    "origins": [{"origin": ORIGIN, "localStorage": [{"name": "csm-hit", "value": "abc"}]}],
+}
+
+
+class FakePage:
+    """Records navigation and storage restores; its origin is ORIGIN."""
+
+    def __init__(self, context):
+        self.context = context
+        self.visited = []
+        self.restored = None
+        self.closed = False
+
+    def goto(self, url):
+        self.visited.append(url)
+
+    def evaluate(self, expression, arg=None):
+        if arg is None:
+            return ORIGIN
+        self.restored = arg
+
+    def close(self):
+        self.closed = True
+        self.context.pages.remove(self)
+
+
+class FakeContext:
+    """Records init scripts, routes, cookie changes and whether it was closed."""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.pages = []
+        self.scripts = []
+        self.cookies = list(STATE["cookies"])
+        self.closed = False
+        self.fail_reset = False
+
+    def add_init_script(self, script=None):
+        self.scripts.append(script)
+
+    def new_page(self):
+        page = FakePage(self)
+        self.pages.append(page)
+        return page
+
+    def clear_cookies(self):
+        if self.fail_reset:
+            raise RuntimeError("Target page, context or browser has been closed")
+        self.cookies = []
+
+    def add_cookies(self, cookies):
+        self.cookies.extend(cookies)
+
+    def storage_state(self, path=None):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(STATE, f)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    """Hands out FakeContexts and keeps them for inspection."""
+
+    def __init__(self):
+        self.contexts = []
+
+    def new_context(self, **kwargs):
+        context = FakeContext(**kwargs)
+        self.contexts.append(context)
+        return context
+
+
+@pytest.fixture
+def state_path(tmp_path):
+    """A captured storage state file."""
+    path = tmp_path / "storage_state.json"
+    path.write_text(json.dumps(STATE), encoding="utf-8")
+    return str(path)
+
+
+def test_pool_size_is_shared_between_workers(monkeypatch):
+    """Each worker gets its share of the total, rounded up, and never fewer than one context."""
+    assert pool_size_for_worker(8, worker_count=4) == 2
+    assert pool_size_for_worker(5, worker_count=2) == 3
+    assert pool_size_for_worker(2, worker_count=16) == 1
+    monkeypatch.setenv("PYTEST_XDIST_WORKER_COUNT", "3")
+    assert pool_size_for_worker(6) == 2
+
+
+def test_fresh_storage_state_is_reused(state_path):
+    """A storage state captured recently is returned without opening a context."""
+    browser = FakeBrowser()
+
+    assert capture_storage_state(browser, {}, START_URL, lambda page: None, path=state_path) == state_path
+    assert browser.contexts == []
+
+
+def test_stale_storage_state_is_captured_again(tmp_path, state_path):
+    """An old storage state is captured after `prepare`, and the capture context is closed."""
+    os.utime(state_path, (0, 0))
+    browser = FakeBrowser()
+    prepared = []
+
+    capture_storage_state(browser, {"locale": "en-IN"}, START_URL, prepared.append, path=state_path)
+
+    [context] = browser.contexts
+    assert context.kwargs == {"locale": "en-IN"} and context.closed
+    assert prepared == context.pages and prepared[0].visited == [START_URL]
+    assert json.loads(open(state_path, encoding="utf-8").read()) == STATE
+    assert sorted(os.listdir(tmp_path)) == ["storage_state.json"]
+
+
+def test_pool_warms_every_context_on_the_start_url(state_path):
+    """Started contexts load the storage state, have the init scripts and a page on the start URL."""
+    browser = FakeBrowser()
+    pool = ContextPool(browser, 2, {"locale": "en-IN"}, START_URL, storage_state_path=state_path).start()
+
+    assert len(browser.contexts) == 2
+    for context in browser.contexts:
+        assert context.kwargs == {"locale": "en-IN", "storage_state": state_path}
+        assert len(context.scripts) == 3
+        assert context.pages[0].visited == [START_URL]
+    context, page = pool.acquire(timeout=0)
+    assert page is context.pages[0]
+
+
+def test_release_puts_a_context_back_to_the_captured_state(state_path):
+    """Extra pages are closed, localStorage and cookies restored and the page sent back to the start URL."""
+    pool = ContextPool(FakeBrowser(), 1, {}, START_URL, storage_state_path=state_path).start()
+    context, page = pool.acquire(timeout=0)
+    popup = context.new_page()
+    context.cookies.append({"name": "cart", "value": "1"})
+
+    pool.release(context, page)
+
+    assert popup.closed and context.pages == [page]
+    assert page.restored == STATE["origins"][0]["localStorage"]
+    assert context.cookies == STATE["cookies"]
+    assert page.visited == [START_URL, START_URL]
+    assert pool.acquire(timeout=0) == (context, page)
+
+
+def test_context_that_cannot_be_reset_is_replaced(state_path):
+    """A context broken by its test is closed and a new warm one takes its place."""
+    browser = FakeBrowser()
+    pool = ContextPool(browser, 1, {}, START_URL, storage_state_path=state_path).start()
+    context, page = pool.acquire(timeout=0)
+    context.fail_reset = True
+
+    pool.release(context, page)
+
+    replacement, _ = pool.acquire(timeout=0)
+    assert context.closed and replacement is browser.contexts[-1] and replacement is not context
+    pool.close()
+    assert replacement.closed
@@ -0,0 +1,78 @@
+"""
+Tests for the DOM change tracker's Python side.
+
+These run fully offline: the changed-regions hint is built from resolver-shaped
+dicts, and the init script is registered on fake browser contexts.
+"""
+
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from tests.dom_tracker import TRACKER_JS, changes_hint, install_tracker, install_tracker_async
+from tests.html_compactor import DROPPED_TAGS, KEPT_ATTRIBUTES, VOID_TAGS
+
+
+class FakeContext:
+    """Records add_init_script() calls."""
+
+    def __init__(self):
+        self.scripts = []
+
+    def add_init_script(self, script=None):
+        self.scripts.append(script)
+
+
+class FakeAsyncContext(FakeContext):
+    """Records awaited add_init_script() calls."""
+
+    async def add_init_script(self, script=None):
+        self.scripts.append(script)
+
+
+def test_no_hint_without_usable_changes():
+    """Missing, overflowed or empty change records add nothing to the heal context."""
+    assert changes_hint(None, "buy button") == ""
+    assert changes_hint({"overflow": True, "regions": ["<button>Buy</button>"], "removed": []}, "buy button") == ""
+    assert changes_hint({"overflow": False, "regions": [], "removed": []}, "buy button") == ""
+
+
+def test_hint_lists_changed_regions_and_removed_elements():
+    """Changed regions are compacted after a marker comment; removed elements follow in one comment."""
+    changes = {
+        "overflow": False,
+        "regions": ["<div class='buy'><script>x()</script><button id='buy-now'>Buy now</button></div>"],
+        "removed": ["button#add-to-cart \"Add to Cart\""],
+    }
+
+    hint = changes_hint(changes, "buy now button").splitlines()
+
+    assert hint[0] == "<!-- changed since the last click -->"
+    assert "buy-now" in hint[1] and "<script>" not in hint[1]
+    assert hint[-1] == "<!-- removed since the last click: button#add-to-cart \"Add to Cart\" -->"
+
+
+def test_removed_summaries_cannot_end_the_comment_early():
+    """A "--" in a removed element's summary is broken up so the HTML comment stays well-formed."""
+    hint = changes_hint({"overflow": False, "regions": [], "removed": ["a.x-->y"]}, "link")
+
+    assert hint.endswith("<!-- removed since the last click: a.x- ->y -->")
+    assert hint.count("-->") == 2
+
+
+def test_tracker_is_installed_as_an_init_script():
+    """Sync and async contexts both register the tracker once, for every page they open."""
+    context, async_context = FakeContext(), FakeAsyncContext()
+
+    install_tracker(context)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pool.submit(asyncio.run, install_tracker_async(async_context)).result()
+
+    assert context.scripts == [TRACKER_JS]
+    assert async_context.scripts == [TRACKER_JS]
+
+
+def test_tracker_serializes_like_the_compactor():
+    """The in-page serializer drops, closes and keeps the same tags and attributes as html_compactor."""
+    assert json.dumps(sorted(t.upper() for t in DROPPED_TAGS)) in TRACKER_JS
+    assert json.dumps(sorted(t.upper() for t in VOID_TAGS)) in TRACKER_JS
+    assert json.dumps(sorted(KEPT_ATTRIBUTES)) in TRACKER_JS
@@ -0,0 +1,84 @@
+"""
+Tests for fingerprint scoring and similarity-based healing.
+
+These run fully offline on hand-written fingerprints shaped like the ones
+FINGERPRINT_JS records for the search results page's delivery filter links.
+"""
+
+from tests.element_fingerprint import (
+    CONFIDENCE_THRESHOLD, FingerprintStore, best_match, label_similarity, rank_candidates, score,
+)
+
+
+def filter_link(label, refinement_id, classes=("a-link-normal", "s-navigation-item")):
+    """Fingerprint of a "Delivery Day" / "Prime" refinement link."""
+    name = f"Apply the filter {label} to narrow results"
+    return {
+        "tag": "a",
+        "id": "",
+        "classes": list(classes),
+        "role": "",
+        "name": name,
+        "text": label,
+        "attrs": {"data-routing": "", "class": " ".join(classes), "tabindex": "-1",
+                  "href": f"/s?k=computer+mouse&rh=n%3A1388921031%2C{refinement_id}", "aria-label": name},
+        "path": "div>div>div>div>div>ul>li>span",
+        "selector": f"#{refinement_id} > span > a",
+    }
+
+
+GET_IT_TODAY = filter_link("Get It Today", "p_90-6741118031")
+GET_IT_BY_TOMORROW = filter_link("Get It by Tomorrow", "p_90-6741117031")
+PRIME = filter_link("Prime", "p_85-10440599031")
+
+
+def test_features_missing_on_both_sides_are_neutral():
+    """No id and no role on either element is not evidence of a match."""
+    bare = {"tag": "span", "id": "", "classes": [], "role": "", "name": "", "text": "", "attrs": {}, "path": ""}
+    other = {**bare, "tag": "div"}
+
+    assert score(bare, other) == 0.0
+    assert score(GET_IT_TODAY, GET_IT_TODAY) == 1.0
+
+
+def test_sibling_links_are_never_matched():
+    """With the recorded link gone, its siblings are rejected however similar their markup is."""
+    ranked = rank_candidates(GET_IT_TODAY, [PRIME, GET_IT_BY_TOMORROW])
+    assert [candidate["text"] for _, candidate in ranked] == ["Get It by Tomorrow", "Prime"]
+    assert ranked[0][0] >= CONFIDENCE_THRESHOLD
+    assert label_similarity(GET_IT_TODAY, GET_IT_BY_TOMORROW) < 0.9
+
+    _, selector = best_match(GET_IT_TODAY, [PRIME, GET_IT_BY_TOMORROW])
+
+    assert selector is None
+
+
+def test_renamed_element_is_matched_among_its_siblings():
+    """The recorded link with new classes still wins, by a clear margin over its siblings."""
+    renamed = filter_link("Get It Today", "p_90-6741118031", classes=("a-link-normal", "s-nav-item-3f9a"))
+
+    match_score, selector = best_match(GET_IT_TODAY, [GET_IT_BY_TOMORROW, renamed, PRIME])
+
+    assert selector == renamed["selector"]
+    assert match_score >= CONFIDENCE_THRESHOLD
+
+
+def test_ambiguous_duplicates_are_not_matched():
+    """Two equally good candidates (e.g. two "Delete" links) leave the choice to the model."""
+    duplicate = {**GET_IT_TODAY, "selector": "#p_90-dup > span > a"}
+
+    _, selector = best_match(GET_IT_TODAY, [GET_IT_TODAY, duplicate])
+
+    assert selector is None
+
+
+def test_stores_sharing_a_file_keep_each_others_fingerprints(tmp_path):
+    """A worker recording a fingerprint does not overwrite the ones another worker recorded."""
+    path = str(tmp_path / "fingerprints.json")
+    first, second = FingerprintStore(path=path), FingerprintStore(path=path)
+    first.put("#today", "Get It Today", GET_IT_TODAY)
+    second.put("#tomorrow", "Get It by Tomorrow", filter_link("Get It by Tomorrow", "p_90-6741117031"))
+
+    reader = FingerprintStore(path=path)
+    assert reader.get("#today", "Get It Today")["text"] == "Get It Today"
+    assert reader.get("#tomorrow", "Get It by Tomorrow")["text"] == "Get It by Tomorrow"
@@ -0,0 +1,82 @@
+"""
+Tests for the content-addressed heal artifact store.
+
+These run fully offline: every store writes to a temporary directory.
+"""
+
+import gzip
+import os
+from tests.heal_artifacts import REFERENCE_LENGTH, ArtifactStore, artifact_path
+
+CONTEXT = "<div id='buy'><button>Buy now</button></div>"
+
+
+def stored_files(directory):
+    """Every file under the store, relative to it."""
+    return sorted(os.path.relpath(os.path.join(root, name), directory)
+                  for root, _, names in os.walk(directory) for name in names)
+
+
+def test_put_stores_the_payload_compressed_and_returns_its_reference(tmp_path):
+    """The reference names the kind and hash prefix, and resolves to the gzip-compressed payload."""
+    store = ArtifactStore(directory=str(tmp_path))
+
+    reference = store.put(CONTEXT, "html")
+    store.flush()
+
+    kind, prefix = reference.split(":")[1:]
+    assert reference.startswith("artifact:") and kind == "html" and len(prefix) == REFERENCE_LENGTH
+    path = artifact_path(reference, directory=str(tmp_path))
+    assert os.path.basename(path).startswith(prefix) and path.endswith(".html.gz")
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert f.read() == CONTEXT
+
+
+def test_same_payload_is_stored_once_per_kind(tmp_path):
+    """Storing a payload again returns the same reference without another file; a new kind is a new file."""
+    store = ArtifactStore(directory=str(tmp_path))
+
+    first = store.put(CONTEXT, "html")
+    assert store.put(CONTEXT, "html") == first
+    store.put(CONTEXT, "prompt")
+    store.flush()
+
+    assert [os.path.basename(p).split(".", 1)[1] for p in stored_files(tmp_path)] == ["html.gz", "prompt.gz"]
+
+
+def test_payload_stored_by_another_process_is_not_rewritten(tmp_path):
+    """A second store sharing the directory leaves an existing artifact alone."""
+    first = ArtifactStore(directory=str(tmp_path))
+    reference = first.put(CONTEXT)
+    first.flush()
+    path = artifact_path(reference, directory=str(tmp_path))
+    os.utime(path, (0, 0))
+
+    second = ArtifactStore(directory=str(tmp_path))
+    second.put(CONTEXT)
+    second.flush()
+
+    assert os.path.getmtime(path) == 0
+
+
+def test_unknown_reference_resolves_to_nothing(tmp_path):
+    """A reference whose artifact was never stored (or was pruned) resolves to None."""
+    assert artifact_path("artifact:html:0123456789abcdef", directory=str(tmp_path)) is None
+
+
+def test_prune_removes_the_oldest_artifacts_first(tmp_path):
+    """Pruning deletes by age until the store fits, and a pruned payload is written again when next stored."""
+    store = ArtifactStore(directory=str(tmp_path))
+    references = [store.put(f"{CONTEXT} {i}" * 50) for i in range(3)]
+    store.flush()
+    paths = [artifact_path(reference, directory=str(tmp_path)) for reference in references]
+    for age, path in enumerate(reversed(paths)):
+        os.utime(path, (1000 - age, 1000 - age))
+    newest_size = os.path.getsize(paths[2])
+
+    assert store.prune(max_bytes=newest_size) == 2
+
+    assert [os.path.exists(path) for path in paths] == [False, False, True]
+    store.put(f"{CONTEXT} 0" * 50)
+    store.flush()
+    assert os.path.exists(paths[0])
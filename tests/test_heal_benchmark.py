@@ -0,0 +1,281 @@
+"""
+Offline healing benchmark.
+
+Measures healing speed and accuracy without amazon.in or an Ollama server. Local
+fixtures modelled on the pages the POM classes drive (tests/fixtures/bench) are
+loaded with page.set_content() in programmatically mutated variants (see
+dom_mutations), and the model is replaced by a deterministic stub backend (see
+model_backends). Every case knows which element it should land on, so the suite
+reports heal success rate alongside latency percentiles, prompt sizes and model
+calls per heal, for both smart_click() and get_healed_selector().
+
+Runs as a pytest-benchmark target (skipped if the plugin is not installed):
+
+    pytest tests/test_heal_benchmark.py --benchmark-only --benchmark-autosave
+    pytest tests/test_heal_benchmark.py --benchmark-only --benchmark-compare --benchmark-compare-fail=mean:20%
+
+HEAL_BENCH_BACKEND=ollama benchmarks the real model instead of the stub.
+"""
+
+import json
+import os
+import pytest
+from tests import heal_flow, selector_health as selector_health_module
+from tests.ai_utils import get_healed_selector
+from tests.dom_mutations import MUTATIONS, mutate
+from tests.element_fingerprint import FingerprintStore
+from tests.heal_cache import HealCache
+from tests.heal_resolver import resolve
+from tests.heal_telemetry import TELEMETRY_DIR, heal_trace, telemetry
+from tests.html_compactor import compact_html
+from tests.model_backends import StubBackend, create_model_backend, set_model_backend
+from tests.selector_health import SelectorHealth, percentile
+from tests.ui_element_action_wrapper import smart_click
+
+pytest.importorskip("pytest_benchmark")
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "bench")
+
+# Model backend to benchmark ("stub" or "ollama") and the stub's simulated latency in seconds
+BENCH_BACKEND = os.environ.get("HEAL_BENCH_BACKEND", "stub")
+BENCH_STUB_DELAY = float(os.environ.get("HEAL_BENCH_STUB_DELAY", "0"))
+
+# Rounds per case, and the seed that makes every mutated variant reproducible
+BENCH_ROUNDS = int(os.environ.get("HEAL_BENCH_ROUNDS", "3"))
+BENCH_SEED = int(os.environ.get("HEAL_BENCH_SEED", "1"))
+
+# Static fixtures are ready immediately, so the original selector gets a short initial timeout
+BENCH_ORIGINAL_TIMEOUT_MS = int(os.environ.get("HEAL_BENCH_ORIGINAL_TIMEOUT_MS", "500"))
+
+# (fixture file, target key, original selector, description), selectors written the way the POM writes them
+TARGETS = [
+    ("home.html", "logo", "#nav-logo-sprites", "Amazon.in"),
+    ("home.html", "search_box", "#twotabsearchtextbox", "Search Amazon.in"),
+    ("home.html", "search_submit", "#nav-search-submit-button", "Go"),
+    ("home.html", "cart", "#nav-cart", "Cart"),
+    ("home.html", "deals", "#nav-xshop > li:nth-child(1) > a.nav-a", "Today's Deals"),
+    ("search_results.html", "get_it_today", "#p_90-6741118031 > span > a.s-navigation-item", "Get It Today"),
+    ("search_results.html", "price_filter", "#priceRefinements li:nth-child(1) > span > a", "Up to ₹500"),
+    ("search_results.html", "first_product", 'div[data-index="2"] h2 > a.s-link-style',
+     "boAt Airdopes 141 Bluetooth TWS Earbuds"),
+    ("product.html", "add_to_cart", "#add-to-cart-button", "Add to cart"),
+    ("product.html", "buy_now", "#buy-now-button", "Buy Now"),
+    ("product.html", "go_to_cart", "#sw-gtc > span > a", "Go to Cart"),
+    ("cart.html", "home_logo", "#nav-logo-sprites", "Amazon.in"),
+    ("cart.html", "decrease_quantity", "div.sc-quantity-stepper-container > span > button.sc-quantity-decrement",
+     "Decrease quantity by one"),
+    ("cart.html", "delete", "span.sc-action-delete > span > input[type=submit]", "Delete"),
+    ("cart.html", "proceed_to_buy", "#sc-buy-box-ptc-button input.a-button-input", "Proceed to Buy"),
+]
+TARGET_IDS = [f"{fixture[:-len('.html')]}-{key}" for fixture, key, _, _ in TARGETS]
+
+# Mutation sets applied to every fixture
+VARIANTS = {"original": (), **{name: (name,) for name in MUTATIONS}, "all": tuple(MUTATIONS)}
+
+# Records every click (and cancels its navigation/submit) so the benchmark can check where it landed
+CLICK_RECORDER_JS = """() => {
+    window.__benchClicks = [];
+    document.addEventListener('click', event => {
+        window.__benchClicks.push(event.target);
+        event.preventDefault();
+    }, true);
+}"""
+
+CLICKED_TARGET_JS = """index => {
+    const target = document.body.getElementsByTagName('*')[index];
+    return (window.__benchClicks || []).some(el => el === target || target.contains(el));
+}"""
+
+SELECTS_TARGET_JS = """([selector, index]) => {
+    const target = document.body.getElementsByTagName('*')[index];
+    try {
+        const el = document.querySelector(selector);
+        return !!el && (el === target || target.contains(el));
+    } catch (e) {
+        return false;
+    }
+}"""
+
+# One dict per benchmark round, summarized at the end of the module
+_results = []
+
+
+def _load_fixture(name, variant):
+    with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+        return mutate(f.read(), VARIANTS[variant], seed=BENCH_SEED)
+
+
+def _reset_heal_state(monkeypatch):
+    """Give smart_click() empty in-memory stores so rounds do not help each other."""
+    monkeypatch.setattr(heal_flow, "heal_cache", HealCache(path=None))
+    monkeypatch.setattr(heal_flow, "fingerprint_store", FingerprintStore(path=None))
+    monkeypatch.setattr(heal_flow, "selector_health", SelectorHealth(path=None))
+
+
+def _round_result(bench, variant, strategy, case_id, success, traces):
+    """Flatten one round and its heal traces into a result row."""
+    trace = traces[-1] if traces else None
+    return {
+        "bench": bench,
+        "variant": variant,
+        "strategy": strategy,
+        "case": case_id,
+        "success": bool(success),
+        "healed": trace is not None,
+        "outcome": trace["outcome"] if trace else "original",
+        "heal_ms": trace["total_ms"] - trace["phases_ms"].get("original_wait", 0.0) if trace else None,
+        "prompt_bytes": trace["prompt_bytes"] if trace else 0,
+        "prompt_tokens": trace["prompt_tokens"] if trace else 0,
+        "model_calls": trace["model_calls"] if trace else 0,
+    }
+
+
+def _extra_info(rows):
+    """Per-case numbers stored in the pytest-benchmark JSON for regression comparisons."""
+    heal_ms = [r["heal_ms"] for r in rows if r["heal_ms"] is not None]
+    return {
+        "success_rate": sum(r["success"] for r in rows) / len(rows),
+        "heals": sum(r["healed"] for r in rows),
+        "heal_p50_ms": percentile(heal_ms, 0.5),
+        "heal_p95_ms": percentile(heal_ms, 0.95),
+        "prompt_tokens": max(r["prompt_tokens"] for r in rows),
+        "model_calls_per_round": sum(r["model_calls"] for r in rows) / len(rows),
+    }
+
+
+@pytest.fixture
+def bench_backend():
+    """Route heal prompts to the benchmark backend for the duration of a test."""
+    if BENCH_BACKEND == "stub":
+        backend = StubBackend(delay=BENCH_STUB_DELAY)
+    else:
+        backend = create_model_backend(BENCH_BACKEND)
+    previous = set_model_backend(backend)
+    yield backend
+    set_model_backend(previous)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def benchmark_report(request):
+    """Print a per-variant summary once the module's benchmarks have run, and save it as JSON."""
+    yield
+    if not _results:
+        return
+    summary = []
+    for key in sorted({(r["bench"], r["variant"], r["strategy"]) for r in _results}):
+        rows = [r for r in _results if (r["bench"], r["variant"], r["strategy"]) == key]
+        heals = [r for r in rows if r["healed"]]
+        heal_ms = [r["heal_ms"] for r in heals]
+        tokens = [r["prompt_tokens"] for r in heals if r["prompt_tokens"]]
+        summary.append({
+            "bench": key[0],
+            "variant": key[1],
+            "strategy": key[2],
+            "rounds": len(rows),
+            "success_rate": round(sum(r["success"] for r in rows) / len(rows), 3),
+            "heals": len(heals),
+            "heal_p50_ms": percentile(heal_ms, 0.5),
+            "heal_p95_ms": percentile(heal_ms, 0.95),
+            "prompt_tokens_p50": percentile(tokens, 0.5),
+            "prompt_tokens_p95": percentile(tokens, 0.95),
+            "model_calls_per_heal": round(sum(r["model_calls"] for r in heals) / len(heals), 2) if heals else 0,
+        })
+
+    os.makedirs(TELEMETRY_DIR, exist_ok=True)
+    with open(os.path.join(TELEMETRY_DIR, "benchmark_summary.json"), "w", encoding="utf-8") as f:
+        json.dump({"backend": BENCH_BACKEND, "summary": summary, "rounds": _results}, f, indent=2)
+
+    reporter = request.config.pluginmanager.get_plugin("terminalreporter")
+    if reporter is None:
+        return
+    reporter.section(f"healing benchmark ({BENCH_BACKEND} backend)")
+    reporter.write_line(f"{'bench':<20}{'variant':<17}{'strategy':<15}{'rounds':>7}{'success':>9}"
+                        f"{'heals':>7}{'p50 ms':>9}{'p95 ms':>9}{'tokens p95':>12}{'calls/heal':>12}")
+    for row in summary:
+        reporter.write_line(
+            f"{row['bench']:<20}{row['variant']:<17}{row['strategy']:<15}{row['rounds']:>7}"
+            f"{row['success_rate']:>9.0%}{row['heals']:>7}{row['heal_p50_ms'] or 0:>9.0f}"
+            f"{row['heal_p95_ms'] or 0:>9.0f}{row['prompt_tokens_p95'] or 0:>12}{row['model_calls_per_heal']:>12}"
+        )
+
+
+@pytest.mark.parametrize("strategy", ["cold", "fingerprinted"])
+@pytest.mark.parametrize("variant", list(VARIANTS))
+@pytest.mark.parametrize("case", TARGETS, ids=TARGET_IDS)
+def test_smart_click_benchmark(page, benchmark, monkeypatch, bench_backend, case, variant, strategy):
+    """
+    Benchmark smart_click() on a mutated fixture.
+
+    "cold" starts every round with empty stores, so heals go through the model;
+    "fingerprinted" first clicks the unmutated page to record the element's fingerprint.
+    """
+    fixture, key, selector, desc = case
+    case_id = f"{fixture[:-len('.html')]}-{key}"
+    html, targets = _load_fixture(fixture, variant)
+    original_html, _ = _load_fixture(fixture, "original")
+    monkeypatch.setattr(selector_health_module, "DEFAULT_TIMEOUT_MS", BENCH_ORIGINAL_TIMEOUT_MS)
+    rounds = []
+
+    def finish_round():
+        # Checked outside the timed call: did the last round click the intended element?
+        if rounds and "success" not in rounds[-1]:
+            current = rounds[-1]
+            current["success"] = current["returned"] and page.evaluate(CLICKED_TARGET_JS, targets[key])
+            current["traces"] = telemetry.traces[current["traces_from"]:]
+
+    def setup():
+        finish_round()
+        _reset_heal_state(monkeypatch)
+        if strategy == "fingerprinted":
+            page.set_content(original_html)
+            page.evaluate(CLICK_RECORDER_JS)
+            smart_click(page, selector, desc)
+        page.set_content(html)
+        page.evaluate(CLICK_RECORDER_JS)
+        rounds.append({"traces_from": len(telemetry.traces), "returned": False})
+        return (page, selector, desc), {}
+
+    def run(page, selector, desc):
+        rounds[-1]["returned"] = smart_click(page, selector, desc)
+
+    benchmark.group = f"smart_click-{variant}"
+    benchmark.pedantic(run, setup=setup, rounds=BENCH_ROUNDS)
+    finish_round()
+
+    rows = [_round_result("smart_click", variant, strategy, case_id, r["success"], r["traces"]) for r in rounds]
+    _results.extend(rows)
+    benchmark.extra_info.update(_extra_info(rows))
+
+
+@pytest.mark.parametrize("variant", [name for name in VARIANTS if name != "original"])
+@pytest.mark.parametrize("case", TARGETS, ids=TARGET_IDS)
+def test_get_healed_selector_benchmark(page, benchmark, bench_backend, case, variant):
+    """Benchmark the model step alone: context in, one selector out, checked against the live fixture."""
+    fixture, key, selector, desc = case
+    case_id = f"{fixture[:-len('.html')]}-{key}"
+    html, targets = _load_fixture(fixture, variant)
+    page.set_content(html)
+    # Same context smart_click() would send: resolver context, compacted to the token budget
+    focused_html = compact_html(resolve(page, desc=desc, selector=selector)["context"], desc)
+    rounds = []
+
+    def run():
+        with heal_trace(selector, desc) as trace:
+            try:
+                healed_selector = get_healed_selector(selector, focused_html, desc)
+                trace.outcome = "model"
+            except IndexError:
+                # Empty model answer
+                healed_selector = None
+        rounds.append((healed_selector, telemetry.traces[-1:]))
+
+    benchmark.group = f"get_healed_selector-{variant}"
+    benchmark.pedantic(run, rounds=BENCH_ROUNDS)
+
+    rows = [
+        _round_result("get_healed_selector", variant, "model", case_id,
+                      page.evaluate(SELECTS_TARGET_JS, [healed_selector, targets[key]]), traces)
+        for healed_selector, traces in rounds
+    ]
+    _results.extend(rows)
+    benchmark.extra_info.update(_extra_info(rows))
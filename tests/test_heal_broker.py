@@ -0,0 +1,103 @@
+"""
+Tests for the local healing broker against a stub Ollama server.
+
+These run fully offline: the stub server stands in for Ollama, so the tests
+check single-flight deduplication and back-pressure without a real model.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from tests.heal_broker import HealBroker
+from tests.heal_broker_client import BrokerTimeout, request_heal
+from tests.stub_model_server import StubModelServer
+
+
+@pytest.fixture
+def run_broker():
+    """Start a HealBroker on its own event loop thread; yields a factory returning (broker, address)."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    brokers = []
+
+    def _start(**kwargs):
+        broker = HealBroker(**kwargs)
+        server = asyncio.run_coroutine_threadsafe(broker.start("127.0.0.1:0"), loop).result()
+        brokers.append(broker)
+        return broker, "127.0.0.1:%d" % server.sockets[0].getsockname()[1]
+
+    yield _start
+
+    for broker in brokers:
+        asyncio.run_coroutine_threadsafe(broker.close(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+
+
+def test_identical_heals_share_one_model_call(run_broker):
+    """Concurrent identical heals from many workers reach the model exactly once."""
+    with StubModelServer(responder="#new-get-it-today", delay=0.5) as stub:
+        broker, address = run_broker(ollama_host=stub.url)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(
+                lambda _: request_heal("#old-check", "<div>Get It Today</div>", "Get It Today", address=address),
+                range(8),
+            ))
+
+    assert results == [["#new-get-it-today"]] * 8
+    assert stub.calls == 1
+    assert broker.stats()["deduplicated"] == 7
+
+
+def test_full_queue_applies_back_pressure(run_broker):
+    """Distinct heals beyond max_queue_depth are rejected as busy and retried by the client."""
+    with StubModelServer(responder=lambda body: "#healed", delay=0.3) as stub:
+        broker, address = run_broker(ollama_host=stub.url, max_queue_depth=1)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            results = list(pool.map(
+                lambda desc: request_heal("#old", f"<a>{desc}</a>", desc, address=address),
+                ["Add to cart", "Go to Cart"],
+            ))
+
+    assert results == [["#healed"], ["#healed"]]
+    assert stub.calls == 2
+    assert broker.stats()["rejected"] >= 1
+
+
+def test_slow_broker_raises_instead_of_falling_back(run_broker):
+    """A deadline passing while the broker's model call runs is a BrokerTimeout, not an unreachable broker."""
+    with StubModelServer(responder="#new-get-it-today", delay=1.0) as stub:
+        broker, address = run_broker(ollama_host=stub.url)
+        with pytest.raises(BrokerTimeout):
+            request_heal("#old-check", "<div>Get It Today</div>", "Get It Today", address=address, timeout=0.3)
+
+    # Callers only call the model directly on OSError; this must not be one
+    assert not issubclass(BrokerTimeout, OSError)
+    assert stub.calls == 1
+
+
+def test_large_heal_context_is_accepted(run_broker):
+    """A request far above asyncio's default 64 KiB line limit still reaches the model."""
+    html = "<div>" + "<span class=\"filler\">Delivery options</span>" * 5000 + "<a>Get It Today</a></div>"
+    assert len(html) > 200 * 1024
+    with StubModelServer(responder="#new-get-it-today") as stub:
+        broker, address = run_broker(ollama_host=stub.url)
+        assert request_heal("#old-check", html, "Get It Today", address=address) == ["#new-get-it-today"]
+
+    assert stub.calls == 1
+
+
+def test_hung_model_call_is_abandoned_at_the_deadline(run_broker):
+    """The broker gives up on a model call at the request's deadline instead of keeping its slot busy."""
+    with StubModelServer(responder="#new-get-it-today", delay=2.0) as stub:
+        broker, address = run_broker(ollama_host=stub.url)
+        started = time.perf_counter()
+        with pytest.raises(BrokerTimeout):
+            request_heal("#old-check", "<div>Get It Today</div>", "Get It Today", address=address, timeout=0.3)
+        time.sleep(0.2)
+
+        assert time.perf_counter() - started < 1.0
+        assert broker.stats()["queue_depth"] == 0
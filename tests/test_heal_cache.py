@@ -0,0 +1,101 @@
+"""
+Tests for the two-level healed-selector cache.
+
+These run fully offline against a temporary on-disk store.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from tests.heal_cache import HealCache, dom_fingerprint
+
+SELECTOR = "#old-check"
+DESC = "Get It Today"
+LOGGED_IN = dom_fingerprint('<div><a id="today-in">Get It Today</a></div>')
+LOGGED_OUT = dom_fingerprint('<div><a id="today-out">Get It Today</a><a>Sign in</a></div>')
+
+
+def test_dom_variants_keep_their_own_entries():
+    """Two layouts of the same page hit their own heal instead of evicting each other's."""
+    cache = HealCache(path=None)
+    cache.put(SELECTOR, DESC, LOGGED_IN, "#today-in")
+    cache.put(SELECTOR, DESC, LOGGED_OUT, "#today-out")
+
+    assert cache.get(SELECTOR, DESC, LOGGED_IN) == "#today-in"
+    assert cache.get(SELECTOR, DESC, LOGGED_OUT) == "#today-out"
+    assert cache.get(SELECTOR, DESC, dom_fingerprint("<div>unseen</div>")) is None
+    assert cache.stats() == {"hits": 2, "misses": 1, "evictions": 0, "size": 2}
+
+    cache.invalidate(SELECTOR, DESC, LOGGED_OUT)
+    assert cache.get(SELECTOR, DESC, LOGGED_IN) == "#today-in"
+    assert cache.get(SELECTOR, DESC, LOGGED_OUT) is None
+
+
+def test_memory_level_evicts_least_recently_used(tmp_path):
+    """The in-process LRU keeps the most recently used entries; evicted ones still come back from disk."""
+    path = str(tmp_path / "healed.json")
+    cache = HealCache(path=path, memory_size=2)
+    cache.put("#a", DESC, LOGGED_IN, "#a-new")
+    cache.put("#b", DESC, LOGGED_IN, "#b-new")
+    cache.get("#a", DESC, LOGGED_IN)
+    cache.put("#c", DESC, LOGGED_IN, "#c-new")
+
+    assert list(cache._memory) == [HealCache._key(s, DESC, LOGGED_IN) for s in ("#a", "#c")]
+    assert cache.stats()["evictions"] == 1
+    assert cache.get("#b", DESC, LOGGED_IN) == "#b-new"
+
+
+def test_disk_level_persists_across_sessions_and_stays_bounded(tmp_path):
+    """A new cache reads what an earlier one wrote; the disk store drops its oldest entries."""
+    path = str(tmp_path / "healed.json")
+    writer = HealCache(path=path, disk_size=2)
+    for selector in ("#a", "#b", "#c"):
+        writer.put(selector, DESC, LOGGED_IN, f"{selector}-new")
+
+    reader = HealCache(path=path)
+    assert reader.get("#a", DESC, LOGGED_IN) is None
+    assert reader.get("#b", DESC, LOGGED_IN) == "#b-new"
+    assert reader.get("#c", DESC, LOGGED_IN) == "#c-new"
+    with open(path, encoding="utf-8") as f:
+        assert len(json.load(f)) == 2
+
+
+def test_disk_writes_are_atomic(tmp_path, monkeypatch):
+    """The store is replaced in one step: no temp files linger and a failed write keeps the old file."""
+    path = str(tmp_path / "healed.json")
+    cache = HealCache(path=path)
+    cache.put(SELECTOR, DESC, LOGGED_IN, "#today-in")
+    assert os.listdir(tmp_path) == ["healed.json"]
+    with open(path, encoding="utf-8") as f:
+        before = f.read()
+
+    def _fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", _fail)
+    cache.put(SELECTOR, DESC, LOGGED_OUT, "#today-out")
+
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == before
+    assert HealCache(path=path).get(SELECTOR, DESC, LOGGED_IN) == "#today-in"
+    # Neither the temp file nor the lock outlives the failed write
+    assert os.listdir(tmp_path) == ["healed.json"]
+
+
+def test_concurrent_writers_keep_each_others_entries(tmp_path):
+    """Caches sharing a store (one per xdist worker) storing at the same time lose no entries."""
+    path = str(tmp_path / "healed.json")
+    workers = [HealCache(path=path) for _ in range(4)]
+
+    def heal_many(worker, cache):
+        for i in range(10):
+            cache.put(f"#w{worker}-{i}", DESC, LOGGED_IN, f"#healed-{worker}-{i}")
+
+    with ThreadPoolExecutor(max_workers=len(workers)) as pool:
+        for future in [pool.submit(heal_many, worker, cache) for worker, cache in enumerate(workers)]:
+            future.result()
+
+    with open(path, encoding="utf-8") as f:
+        assert len(json.load(f)) == 40
+    reader = HealCache(path=path)
+    assert all(reader.get(f"#w{w}-{i}", DESC, LOGGED_IN) == f"#healed-{w}-{i}" for w in range(4) for i in range(10))
@@ -0,0 +1,126 @@
+"""
+Tests for per-phase heal telemetry.
+
+These run fully offline: traces go to a TelemetryCollector writing to a
+temporary directory instead of .heal_telemetry/.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from tests import heal_telemetry
+from tests.heal_telemetry import (
+    TelemetryCollector, heal_trace, phase, record_model_response, record_outcome, record_prompt,
+    summarize, write_prometheus,
+)
+
+
+@pytest.fixture
+def collector(tmp_path, monkeypatch):
+    """A fresh collector writing heals-main.jsonl into tmp_path, installed as the module's collector."""
+    monkeypatch.delenv("PYTEST_XDIST_WORKER", raising=False)
+    collector = TelemetryCollector(directory=str(tmp_path))
+    collector.reset()
+    monkeypatch.setattr(heal_telemetry, "telemetry", collector)
+    return collector
+
+
+def run_heal(selector, outcome, barrier=None):
+    """One instrumented heal; the barrier makes concurrent heals overlap inside their traces."""
+    with heal_trace(selector, f"desc of {selector}", original_wait_ms=100):
+        with phase("model"):
+            if barrier is not None:
+                barrier.wait()
+            record_prompt("prompt", "system", 10)
+            record_model_response({"eval_count": 5, "eval_duration": 2_000_000})
+        record_outcome(outcome)
+
+
+def test_helpers_do_nothing_outside_a_heal(collector):
+    """phase() and the record_* helpers are no-ops without a current trace."""
+    with phase("model"):
+        record_outcome("model")
+        record_prompt("prompt", "system", 10)
+        record_model_response({"eval_count": 5})
+
+    assert collector.traces == []
+
+
+def test_concurrent_threads_keep_separate_traces(collector):
+    """Heals overlapping on different threads each record only their own outcome and model call."""
+    barrier = threading.Barrier(4)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        for future in [pool.submit(run_heal, f"#t{i}", f"outcome-{i}", barrier) for i in range(4)]:
+            future.result()
+
+    by_selector = {trace["selector"]: trace for trace in collector.traces}
+    assert sorted(by_selector) == ["#t0", "#t1", "#t2", "#t3"]
+    for i in range(4):
+        trace = by_selector[f"#t{i}"]
+        assert trace["outcome"] == f"outcome-{i}"
+        assert trace["model_calls"] == 1
+        assert trace["prompt_tokens"] == 10
+        assert trace["model"]["eval_count"] == 5
+
+
+def test_concurrent_tasks_keep_separate_traces(collector):
+    """Heals interleaved as asyncio tasks on one thread do not write into each other's traces."""
+    async def heal(selector, outcome):
+        with heal_trace(selector, "desc"):
+            with phase("model"):
+                await asyncio.sleep(0.01)
+                record_model_response({"eval_count": 1})
+            record_outcome(outcome)
+
+    async def main():
+        await asyncio.gather(*(heal(f"#a{i}", f"outcome-{i}") for i in range(3)))
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pool.submit(asyncio.run, main()).result()
+
+    assert sorted((t["selector"], t["outcome"], t["model_calls"]) for t in collector.traces) == [
+        ("#a0", "outcome-0", 1), ("#a1", "outcome-1", 1), ("#a2", "outcome-2", 1),
+    ]
+
+
+def test_jsonl_round_trips_through_summarize(collector):
+    """Traces read back from the JSONL file summarize to the same totals as the in-memory ones."""
+    run_heal("#one", "model")
+    run_heal("#two", "model")
+    run_heal("#three", "failed")
+
+    records = collector.load_all()
+    assert records == collector.traces
+    summary = summarize(records)
+    assert summary == summarize(collector.traces)
+    assert summary["heals"] == 3
+    assert summary["outcomes"] == {"model": 2, "failed": 1}
+    assert summary["model_calls"] == 3
+    assert summary["prompt_tokens"]["sum"] == 30
+    assert list(summary["phases"]) == ["original_wait", "model"]
+    assert summary["phases"]["original_wait"]["p50"] == 100
+    assert records[0]["model"]["eval_duration_ms"] == 2.0
+
+
+def test_prometheus_text_has_the_metric_names_and_labels(collector, tmp_path):
+    """The textfile holds the outcome counter, model calls, per-phase summary and prompt tokens."""
+    run_heal("#one", "model")
+    run_heal("#two", "cache")
+    path = tmp_path / "metrics" / "heal_metrics.prom"
+
+    write_prometheus(collector.load_all(), str(path))
+
+    lines = path.read_text().splitlines()
+    assert "# TYPE selfheal_heals_total counter" in lines
+    assert 'selfheal_heals_total{outcome="model"} 1' in lines
+    assert 'selfheal_heals_total{outcome="cache"} 1' in lines
+    assert "selfheal_model_calls_total 2" in lines
+    assert "# TYPE selfheal_phase_duration_seconds summary" in lines
+    assert 'selfheal_phase_duration_seconds{phase="original_wait",quantile="0.5"} 0.100000' in lines
+    for name in ("total", "original_wait", "model"):
+        assert any(line.startswith(f'selfheal_phase_duration_seconds{{phase="{name}",quantile="0.95"}} ')
+                   for line in lines)
+        assert f'selfheal_phase_duration_seconds_count{{phase="{name}"}} 2' in lines
+    assert "selfheal_prompt_tokens_total 20" in lines
+    assert not list(path.parent.glob("*.tmp"))
@@ -0,0 +1,57 @@
+"""
+Tests for the compact HTML context serializer.
+
+These run fully offline on hand-written markup.
+"""
+
+from tests.html_compactor import CHARS_PER_TOKEN, compact_html
+
+
+def test_noise_is_dropped_and_selector_attributes_kept():
+    """Scripts, styles, SVG, comments and tracking attributes go; ids, classes, aria-* and href stems stay."""
+    html = (
+        '<head><title>Amazon</title></head>'
+        '<div id="filters" class="a-section" style="color: red" data-csa-c-id="x1y2" onclick="track()">'
+        '<script>var tracking = 1;</script><style>.a { color: red }</style><!-- ad slot -->'
+        '<a href="/s?k=mouse&amp;rh=p_90#top" aria-label="Apply the filter Get It Today to narrow results">'
+        '<svg><path d="M0 0"></path></svg><span>Get It Today</span></a>'
+        '</div>'
+    )
+
+    assert compact_html(html, "Get It Today") == (
+        '<div id="filters" class="a-section">'
+        '<a href="/s" aria-label="Apply the filter Get It Today to narrow results"><span>Get It Today</span></a>'
+        '</div>'
+    )
+
+
+def test_repeated_siblings_are_collapsed_but_the_target_kept():
+    """Identical result cards collapse to a couple of examples; the one holding the target survives."""
+    cards = "".join(f'<li class="card"><a class="title">Mouse {i}</a></li>' for i in range(20))
+    html = f'<ul class="results">{cards}<li class="card"><a class="title">Get It Today</a></li></ul>'
+
+    compacted = compact_html(html, "Get It Today")
+
+    assert compacted.count('<li class="card">') == 3
+    assert "<!-- 18 similar omitted -->" in compacted
+    assert "Get It Today" in compacted
+
+
+def test_budget_window_is_centred_on_the_target():
+    """Over budget, the largest ancestor of the target that fits is returned."""
+    filler = "".join(f'<p id="para-{i}">Unrelated paragraph number {i}</p>' for i in range(200))
+    html = (f'<main><section id="before">{filler}</section>'
+            f'<section id="filters"><div class="facet"><a id="today">Get It Today</a></div></section>'
+            f'<section id="after">{filler}</section></main>')
+
+    compacted = compact_html(html, "Get It Today", token_budget=50)
+
+    assert compacted == '<section id="filters"><div class="facet"><a id="today">Get It Today</a></div></section>'
+    assert len(compacted) <= 50 * CHARS_PER_TOKEN
+
+
+def test_without_a_target_the_context_is_truncated_to_the_budget():
+    """No target text: the start of the compacted context, cut at the budget."""
+    html = "".join(f'<p id="para-{i}">Paragraph {i}</p>' for i in range(500))
+
+    assert len(compact_html(html, "Not on the page", token_budget=20)) == 20 * CHARS_PER_TOKEN
@@ -0,0 +1,138 @@
+"""
+Tests for the load runner's flow timing and report.
+
+These run fully offline: no browser is launched. Flows run against fake page
+objects, and heals are recorded by a TelemetryCollector that keeps its traces
+in memory.
+"""
+
+import pytest
+from tests import heal_telemetry, load_runner
+from tests.heal_telemetry import TelemetryCollector, heal_trace, record_outcome
+from tests.load_runner import FLOW_STEPS, FlowResult, LoadRunner, format_report, run_flow
+
+
+@pytest.fixture
+def collector(monkeypatch):
+    """An in-memory collector shared by heal_trace() and the runner's report."""
+    collector = TelemetryCollector(directory=None)
+    monkeypatch.setattr(heal_telemetry, "telemetry", collector)
+    monkeypatch.setattr(load_runner, "telemetry", collector)
+    return collector
+
+
+class FakePageObject:
+    """Stands in for every page object: each method call is logged, and navigation returns itself."""
+
+    def __init__(self, page):
+        self.page = page
+
+    def __getattr__(self, name):
+        def method(*args, **kwargs):
+            self.page.append(name)
+            return self
+        return method
+
+
+def heal(outcome):
+    """One traced heal with the given outcome."""
+    with heal_trace("#broken", "some element"):
+        record_outcome(outcome)
+
+
+def flow(worker, query, steps_ms, failed_step=None, total_ms=None):
+    """A finished FlowResult with the given step timings."""
+    result = FlowResult(worker, query)
+    result.steps_ms = dict(steps_ms)
+    result.failed_step = failed_step
+    result.error = f"TimeoutError: {failed_step}" if failed_step else None
+    result.total_ms = total_ms if total_ms is not None else sum(steps_ms.values())
+    return result
+
+
+def test_flow_runs_every_step_in_report_order(monkeypatch):
+    """run_flow() times the same steps, in the same order, as the report lists them."""
+    monkeypatch.setattr(load_runner, "HomePage", FakePageObject)
+    monkeypatch.setattr(load_runner, "SearchResultsPage", FakePageObject)
+    calls, steps = [], []
+    result = FlowResult(0, "laptop")
+
+    def step(name):
+        steps.append(name)
+        return result.step(name)
+
+    run_flow(calls, "laptop", step)
+
+    assert tuple(steps) == FLOW_STEPS
+    assert calls[:2] == ["dismiss_popup_if_present", "search"]
+    assert set(result.steps_ms) == set(FLOW_STEPS) and result.ok
+
+
+def test_failed_step_is_timed_and_recorded():
+    """A step that raises is still timed, and only the first failing step is kept."""
+    result = FlowResult(1, "keyboard")
+
+    with pytest.raises(TimeoutError):
+        with result.step("open_product"):
+            raise TimeoutError("no product")
+    with pytest.raises(TimeoutError):
+        with result.step("go_home"):
+            raise TimeoutError("still broken")
+
+    assert result.failed_step == "open_product"
+    assert "open_product" in result.steps_ms and not result.ok
+
+
+def test_heals_are_attributed_to_the_step_they_ran_in(collector):
+    """Heals inside a step are counted under it by outcome; heals outside any step are unattributed."""
+    result = FlowResult(0, "laptop")
+    with result.step("search"):
+        heal("model")
+        heal("cache")
+    with result.step("add_to_cart"):
+        heal("model")
+    heal("failed")
+    runner = LoadRunner(queries=["laptop"], concurrency=1, network_mode="live")
+    runner.results = [result]
+
+    steps = runner.report(elapsed_s=1.0)["steps"]
+
+    assert steps["search"]["heals"] == {"model": 1, "cache": 1}
+    assert steps["add_to_cart"]["heals"] == {"model": 1}
+    assert steps["unattributed"]["heals"] == {"failed": 1}
+    assert steps["go_home"]["heals"] == {}
+
+
+def test_report_counts_throughput_over_completed_flows(collector):
+    """Throughput and flow latency cover completed flows; step figures and failures cover all of them."""
+    runner = LoadRunner(queries=["laptop", "mouse"], concurrency=2, network_mode="live")
+    runner.results = [
+        flow(0, "laptop", {"search": 100.0, "add_to_cart": 300.0}),
+        flow(1, "mouse", {"search": 200.0, "add_to_cart": 500.0}),
+        flow(0, "laptop", {"search": 900.0}, failed_step="search", total_ms=900.0),
+    ]
+
+    report = runner.report(elapsed_s=30.0)
+
+    assert runner.flows == 4
+    assert (report["flows"], report["completed"], report["failed"]) == (3, 2, 1)
+    assert report["flows_per_minute"] == 4.0
+    assert report["flow_ms"]["p95"] <= 700.0
+    assert report["steps"]["search"]["count"] == 3 and report["steps"]["search"]["max"] == 900.0
+    assert report["steps"]["search"]["failures"] == 1
+    assert report["steps"]["delete_item"] == {"count": 0, "p50": None, "p95": None, "max": None,
+                                              "failures": 0, "heals": {}}
+    assert "unattributed" not in report["steps"]
+
+
+def test_format_report_has_a_row_per_step(collector):
+    """The table starts with the throughput line and the header, then one row per step."""
+    runner = LoadRunner(queries=["laptop"], concurrency=1, network_mode="live")
+    runner.results = [flow(0, "laptop", {"search": 100.0})]
+
+    lines = format_report(runner.report(elapsed_s=6.0)).splitlines()
+
+    assert lines[0].startswith("1/1 flows completed in 6.0s with 1 contexts: 10.0 flows/min")
+    assert lines[1].split()[:2] == ["step", "count"]
+    assert [line.split()[0] for line in lines[2:]] == list(FLOW_STEPS)
+    assert lines[2 + FLOW_STEPS.index("search")].split()[1:3] == ["1", "100.0"]
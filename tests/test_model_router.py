@@ -0,0 +1,215 @@
+"""
+Tests for tiered model routing against the stub backend.
+
+These run fully offline: each tier is a stub "model" with its own canned
+answer, and validation is a plain function standing in for the live page. The
+backend timeout the router relies on is also checked against the stub Ollama
+server.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from tests import model_router as model_router_module
+from tests.heal_broker_client import BrokerTimeout
+from tests.model_backends import OllamaBackend, StubBackend, set_model_backend
+from tests.model_router import MIN_ATTEMPTS, ModelRouter
+from tests.stub_model_server import StubModelServer
+
+TIERS = ["small", "medium", "large"]
+WORKING = "#new-get-it-today"
+
+
+@pytest.fixture
+def stub_models():
+    """Install a StubBackend for the test; yields a factory taking per-model responders and delays."""
+    previous = None
+
+    def _install(responder, delay=0.0):
+        nonlocal previous
+        backend = StubBackend(responder=responder, delay=delay)
+        replaced = set_model_backend(backend)
+        previous = previous or replaced
+        return backend
+
+    yield _install
+
+    if previous is not None:
+        set_model_backend(previous)
+
+
+def run_async(coro):
+    """Run a coroutine on its own thread (sync Playwright keeps a loop running on the test thread)."""
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+def validate(candidates):
+    """Stand-in for the live page: only WORKING clicks."""
+    return WORKING if WORKING in candidates else None
+
+
+def test_escalates_until_a_tier_validates(stub_models):
+    """A tier whose candidates all fail validation hands over to the next one."""
+    stub_models({"small": "#wrong\n", "medium": f"{WORKING}\n", "large": f"{WORKING}\n"})
+    router = ModelRouter(tiers=TIERS, path=None)
+
+    healed, tried = router.heal("#old-check", "<div>Get It Today</div>", "Get It Today", validate)
+
+    assert healed == WORKING
+    assert tried == ["#wrong", WORKING]
+    assert router.success_rate("small", "id") == (0.0, 1)
+    assert router.success_rate("medium", "id") == (1.0, 1)
+    assert router.success_rate("large", "id") == (None, 0)
+
+
+def test_skips_tier_that_rarely_heals_a_kind(stub_models):
+    """After MIN_ATTEMPTS failures the small tier is no longer asked about that selector kind."""
+    backend = stub_models({"small": "#wrong\n", "medium": f"{WORKING}\n"})
+    router = ModelRouter(tiers=["small", "medium"], path=None)
+    for _ in range(MIN_ATTEMPTS):
+        router.heal("#old-check", "<div>Get It Today</div>", "Get It Today", validate)
+    calls = backend.calls
+
+    healed, tried = router.heal("#old-check", "<div>Get It Today</div>", "Get It Today", validate)
+
+    assert healed == WORKING
+    assert tried == [WORKING]
+    assert backend.calls == calls + 1
+    # Other selector kinds still start with the small tier
+    assert router.plan("class") == ["small", "medium"]
+
+
+def test_latency_budget_bounds_the_model_call(stub_models):
+    """A tier slower than the budget is cut off at the budget, and no larger tier is started after it."""
+    backend = stub_models({"small": f"{WORKING}\n", "large": f"{WORKING}\n"}, delay={"small": 1.0})
+    router = ModelRouter(tiers=["small", "large"], path=None)
+
+    started = time.perf_counter()
+    healed, tried = router.heal("#old-check", "<div>Get It Today</div>", "Get It Today", validate,
+                                budget_ms=100)
+
+    assert time.perf_counter() - started < 0.5
+    assert healed is None
+    assert tried == []
+    assert backend.calls == 1
+    # The timed-out call counts against the tier
+    assert router.success_rate("small", "id") == (0.0, 1)
+
+
+def test_extra_candidates_are_validated_after_every_tier(stub_models):
+    """Rule-based candidates do not pre-empt the model tiers; they are the last resort, each tried once."""
+    stub_models({"small": "#wrong\n", "large": "#also-wrong\n#wrong\n"})
+    router = ModelRouter(tiers=["small", "large"], path=None)
+    batches = []
+
+    def recording_validate(candidates):
+        batches.append(list(candidates))
+        return validate(candidates)
+
+    healed, tried = router.heal("#old-check", "<div>Get It Today</div>", "Get It Today", recording_validate,
+                                extra_candidates=["#wrong", WORKING])
+
+    assert healed == WORKING
+    assert batches == [["#wrong"], ["#also-wrong"], [WORKING]]
+    assert tried == ["#wrong", "#also-wrong", WORKING]
+    # The heal is not credited to either tier
+    assert router.success_rate("small", "id") == (0.0, 1)
+    assert router.success_rate("large", "id") == (0.0, 1)
+
+
+def test_extra_candidates_are_not_validated_when_a_tier_heals(stub_models):
+    """A tier that heals ends the heal before the non-model candidates are looked at."""
+    stub_models({"small": f"{WORKING}\n"})
+    router = ModelRouter(tiers=["small"], path=None)
+
+    healed, tried = router.heal("#old-check", "<div>Get It Today</div>", "Get It Today", validate,
+                                extra_candidates=["#rule-based"])
+
+    assert healed == WORKING
+    assert tried == [WORKING]
+
+
+def test_async_heal_follows_the_same_budget_and_order(stub_models):
+    """heal_async cuts a slow tier off at the budget and then falls back to the non-model candidates."""
+    stub_models({"small": f"{WORKING}\n"}, delay={"small": 1.0})
+    router = ModelRouter(tiers=["small"], path=None)
+
+    async def async_validate(candidates):
+        return validate(candidates)
+
+    started = time.perf_counter()
+    healed, tried = run_async(router.heal_async("#old-check", "<div>Get It Today</div>", "Get It Today",
+                                                async_validate, extra_candidates=[WORKING], budget_ms=100))
+
+    assert time.perf_counter() - started < 0.5
+    assert healed == WORKING
+    assert tried == [WORKING]
+    assert router.success_rate("small", "id") == (0.0, 1)
+
+
+def test_ollama_backend_enforces_the_timeout():
+    """A real HTTP model call is abandoned at the timeout with TimeoutError, streamed or not."""
+    with StubModelServer(responder="#new-get-it-today", delay=1.0) as server:
+        backend = OllamaBackend(host=server.url)
+        for stop_when in (None, lambda text: False):
+            started = time.perf_counter()
+            with pytest.raises(TimeoutError):
+                backend.generate("small", "prompt", "system", stop_when=stop_when, timeout=0.2)
+            assert time.perf_counter() - started < 0.8
+
+        with pytest.raises(TimeoutError):
+            run_async(backend.generate_async("small", "prompt", "system", timeout=0.2))
+        assert backend.generate("small", "prompt", "system", timeout=5)["response"] == "#new-get-it-today"
+
+
+def test_ollama_backend_reuses_its_connection_for_timed_requests():
+    """Timed requests share the backend's connection pool instead of connecting anew each time."""
+    with StubModelServer(responder="#new-get-it-today") as server:
+        backend = OllamaBackend(host=server.url)
+        for timeout in (5, 4, 3):
+            assert backend.generate("small", "prompt", "system", timeout=timeout)["response"] == "#new-get-it-today"
+        backend.generate("small", "prompt", "system", stop_when=lambda text: False, timeout=5)
+        backend.generate("small", "prompt", "system")
+
+        assert server.calls == 5
+        assert server.connections == 1
+
+
+def test_broker_deadline_counts_against_the_tier(monkeypatch):
+    """A heal that times out in the broker is recorded like a model timeout, with its latency."""
+    def slow_broker(*args, **kwargs):
+        time.sleep(0.05)
+        raise BrokerTimeout("Healing broker did not answer before the deadline")
+
+    monkeypatch.setattr(model_router_module, "get_healed_selectors", slow_broker)
+    router = ModelRouter(tiers=["small"], path=None)
+
+    healed, tried = router.heal("#old-check", "<div>Get It Today</div>", "Get It Today", validate)
+
+    assert (healed, tried) == (None, [])
+    assert router.success_rate("small", "id") == (0.0, 1)
+    assert router.expected_latency_ms("small") >= 50
+
+
+def test_flush_merges_the_attempts_of_every_worker(stub_models, tmp_path):
+    """Routers sharing a store (one per xdist worker) add their attempts up instead of overwriting them."""
+    stub_models({"small": f"{WORKING}\n"})
+    path = str(tmp_path / "model_router.json")
+    first, second = ModelRouter(tiers=["small"], path=path), ModelRouter(tiers=["small"], path=path)
+    first.heal("#old-check", "<div>Get It Today</div>", "Get It Today", validate)
+    second.heal("#old-check", "<div>Get It Today</div>", "Get It Today", validate)
+    second.heal("#old-check", "<div>Get It Today</div>", "Get It Today", lambda candidates: None)
+
+    second.flush()
+    first.flush()
+    assert ModelRouter(tiers=["small"], path=path).success_rate("small", "id") == (2 / 3, 3)
+    assert first.success_rate("small", "id") == (2 / 3, 3)
+
+    # Flushed attempts are not added again, and a later worker builds on the stored counts
+    second.flush()
+    third = ModelRouter(tiers=["small"], path=path)
+    third.heal("#old-check", "<div>Get It Today</div>", "Get It Today", validate)
+    third.flush()
+    assert ModelRouter(tiers=["small"], path=path).success_rate("small", "id") == (3 / 4, 4)
@@ -0,0 +1,125 @@
+"""
+Tests for the block/record/replay network modes.
+
+These run fully offline: routes are installed on a fake browser context that
+records them, and HAR archives are empty files in a temporary directory.
+"""
+
+import pytest
+from tests.network_mode import NetworkMode, is_blocked
+
+
+class FakeRoute:
+    """A routed request that records whether it was aborted or passed on."""
+
+    def __init__(self, resource_type, url):
+        self.request = type("Request", (), {"resource_type": resource_type, "url": url})()
+        self.outcome = None
+
+    def abort(self, error_code=None):
+        self.outcome = ("abort", error_code)
+
+    def fallback(self):
+        self.outcome = ("fallback", None)
+
+
+class FakeContext:
+    """Records route() and route_from_har() calls in order."""
+
+    def __init__(self):
+        self.routes = []
+
+    def route(self, url, handler):
+        self.routes.append(("route", url, handler))
+
+    def route_from_har(self, har, **kwargs):
+        self.routes.append(("har", har, kwargs))
+
+
+@pytest.fixture(autouse=True)
+def main_process(monkeypatch):
+    """Archive names use the main process prefix."""
+    monkeypatch.delenv("PYTEST_XDIST_WORKER", raising=False)
+
+
+def test_blocked_resource_types_and_ad_domains():
+    """Images, media and fonts are dropped, as is any subdomain of an ad host; pages and scripts are not."""
+    assert is_blocked("image", "https://m.media-amazon.com/images/I/1.jpg")
+    assert is_blocked("font", "https://m.media-amazon.com/fonts/ember.woff2")
+    assert is_blocked("script", "https://aax-eu.amazon-adsystem.com/e/dtb/bid")
+    assert is_blocked("xhr", "https://fls-eu.amazon.in:443/1/batch/1/OE/")
+    assert not is_blocked("document", "https://www.amazon.in/s?k=laptop")
+    assert not is_blocked("script", "https://m.media-amazon.com/images/I/61.js")
+    assert not is_blocked("script", "https://notdoubleclick.net/tag.js")
+
+
+def test_unknown_mode_is_rejected(tmp_path):
+    """A mistyped mode fails when the run starts rather than silently going live."""
+    with pytest.raises(ValueError, match="replay"):
+        NetworkMode("repaly", har_dir=str(tmp_path))
+
+
+def test_live_mode_installs_no_routes(tmp_path):
+    """Live contexts are left alone."""
+    context = FakeContext()
+    NetworkMode("live", har_dir=str(tmp_path)).apply(context)
+
+    assert context.routes == []
+
+
+def test_block_mode_aborts_only_blocked_requests(tmp_path):
+    """The block route aborts blocked requests and passes the rest on."""
+    context = FakeContext()
+    NetworkMode("block", har_dir=str(tmp_path)).apply(context)
+    [(_, pattern, handler)] = context.routes
+    image = FakeRoute("image", "https://m.media-amazon.com/a.jpg")
+    page = FakeRoute("document", "https://www.amazon.in/")
+
+    handler(image)
+    handler(page)
+
+    assert pattern == "**/*"
+    assert image.outcome == ("abort", "blockedbyclient")
+    assert page.outcome == ("fallback", None)
+
+
+def test_record_mode_writes_one_archive_per_context(tmp_path):
+    """Each context records to its own archive, replacing this worker's previous recording."""
+    stale = tmp_path / "session-main-7.har.zip"
+    stale.write_bytes(b"")
+    other_worker = tmp_path / "session-gw1-0.har.zip"
+    other_worker.write_bytes(b"")
+    mode = NetworkMode("record", har_dir=str(tmp_path))
+    first, second = FakeContext(), FakeContext()
+
+    mode.apply(first)
+    mode.apply(second)
+
+    assert not stale.exists() and other_worker.exists()
+    assert first.routes[0] == ("har", str(tmp_path / "session-main-0.har.zip"),
+                               {"update": True, "update_content": "attach", "update_mode": "minimal"})
+    assert second.routes[0][1] == str(tmp_path / "session-main-1.har.zip")
+    assert first.routes[1][:2] == ("route", "**/*")
+
+
+def test_replay_mode_serves_every_archive_and_aborts_the_rest(tmp_path):
+    """Replay aborts unrecorded requests, with every worker's archive routed on top."""
+    for name in ("session-gw0-0.har.zip", "session-main-0.har.zip"):
+        (tmp_path / name).write_bytes(b"")
+    context = FakeContext()
+    NetworkMode("replay", har_dir=str(tmp_path)).apply(context)
+    offline = FakeRoute("document", "https://www.amazon.in/unrecorded")
+
+    context.routes[0][2](offline)
+
+    assert offline.outcome == ("abort", "internetdisconnected")
+    assert [(kind, har) for kind, har, _ in context.routes[1:]] == [
+        ("har", str(tmp_path / "session-gw0-0.har.zip")), ("har", str(tmp_path / "session-main-0.har.zip"))]
+    assert all(kwargs == {"not_found": "fallback"} for _, _, kwargs in context.routes[1:])
+
+
+def test_replay_without_recordings_fails_fast(tmp_path):
+    """Replaying before anything was recorded points at --network-mode record."""
+    with pytest.raises(FileNotFoundError, match="--network-mode record"):
+        NetworkMode("replay", har_dir=str(tmp_path))
+
@@ -0,0 +1,79 @@
+"""
+Tests for the page readiness wait and the URLs page objects wait for.
+
+These run fully offline: a fake page stands in for Playwright, answering the
+quiet check and the busy-state query the way the in-page monitor would.
+"""
+
+import logging
+from playwright.sync_api import Error as PlaywrightError
+from pages.product_page import CART_URL
+from tests.page_readiness import (
+    ANIMATED_REGIONS, ANIMATION_ATTRIBUTES, LONG_REQUEST_MS, NAVIGATION_GRACE_MS, READINESS_JS,
+    wait_for_quiescence,
+)
+
+
+class FakePage:
+    """Answers wait_for_function() (quiet or timed out) and evaluate() (the busy state)."""
+
+    def __init__(self, quiet, busy_state=None):
+        self.quiet = quiet
+        self.busy_state = busy_state
+        self.calls = []
+
+    def wait_for_function(self, expression, arg=None, polling=None, timeout=None):
+        self.calls.append(("wait_for_function", arg, timeout))
+        if not self.quiet:
+            raise PlaywrightError("Timeout exceeded")
+
+    def evaluate(self, expression, arg=None):
+        self.calls.append(("evaluate", arg, None))
+        if isinstance(self.busy_state, Exception):
+            raise self.busy_state
+        return self.busy_state
+
+
+def test_quiet_page_is_ready():
+    """A page that goes quiet returns True after one in-page wait with the idle time and limits."""
+    page = FakePage(quiet=True)
+
+    assert wait_for_quiescence(page, idle_ms=250, timeout=1000) is True
+    assert page.calls == [("wait_for_function", {"idleMs": 250, "longRequestMs": LONG_REQUEST_MS,
+                                                 "navigationGraceMs": NAVIGATION_GRACE_MS}, 1000)]
+
+
+def test_busy_page_soft_fails_with_what_kept_it_busy(caplog):
+    """At the timeout the wait returns False and the warning names the busy state instead of raising."""
+    page = FakePage(quiet=False, busy_state={"loading": False, "navigating": True, "inflight": 2, "idleMs": 12.4})
+
+    with caplog.at_level(logging.WARNING, logger="tests.page_readiness"):
+        assert wait_for_quiescence(page, timeout=10) is False
+
+    assert "navigating=True, 2 requests in flight, last change 12 ms ago" in caplog.text
+
+
+def test_busy_state_that_cannot_be_read_is_reported_as_unavailable(caplog):
+    """A page that navigated away mid-query still soft-fails, with no state to report."""
+    page = FakePage(quiet=False, busy_state=PlaywrightError("Execution context was destroyed"))
+
+    with caplog.at_level(logging.WARNING, logger="tests.page_readiness"):
+        assert wait_for_quiescence(page, timeout=10) is False
+
+    assert "state unavailable" in caplog.text
+
+
+def test_monitor_ignores_animation():
+    """The injected monitor carries the animation attributes and carousel regions it ignores."""
+    assert "__ANIMATION" not in READINESS_JS and "__ANIMATED" not in READINESS_JS
+    assert all(f'"{attribute}"' in READINESS_JS for attribute in ANIMATION_ATTRIBUTES)
+    assert "aria-roledescription" in ANIMATED_REGIONS
+
+
+def test_cart_url_is_the_cart_view_not_the_confirmation():
+    """Going to the cart waits for the cart itself; the add-to-cart confirmation page does not match."""
+    assert CART_URL.search("https://www.amazon.in/gp/cart/view.html?ref_=sw_gtc")
+    assert CART_URL.search("https://www.amazon.in/cart?ref_=nav_cart")
+    assert CART_URL.search("https://www.amazon.in/cart")
+    assert not CART_URL.search("https://www.amazon.in/cart/smart-wagon?newItems=1")
+    assert not CART_URL.search("https://www.amazon.in/gp/cart/smart-wagon")
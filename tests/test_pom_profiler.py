@@ -0,0 +1,123 @@
+"""
+Tests for page object step profiling.
+
+These run fully offline and leave Playwright unpatched: a PomProfiler writing to
+a temporary directory is installed as the module's profiler and switched on
+directly, without enable().
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from tests import pom_profiler
+from tests.pom_profiler import PomProfiler, StepRecord, is_wait, profile_method, summarize_steps
+
+
+@pytest.fixture
+def profiler(tmp_path, monkeypatch):
+    """A recording profiler writing into tmp_path, installed as the module's profiler."""
+    profiler = PomProfiler(directory=str(tmp_path))
+    profiler.enabled = True
+    monkeypatch.setattr(pom_profiler, "profiler", profiler)
+    return profiler
+
+
+def run_async(coro):
+    """Run a coroutine on its own thread (sync Playwright keeps a loop running on the test thread)."""
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+def event(name, dur_ms, api_calls=0, round_trips=0, wait_ms=0.0, action_ms=0.0):
+    """A step event shaped like the ones PomProfiler writes."""
+    return {"name": name, "dur": dur_ms * 1000, "args": {"api_calls": api_calls, "round_trips": round_trips,
+                                                          "wait_ms": wait_ms, "action_ms": action_ms}}
+
+
+def test_summarize_steps_aggregates_by_name_slowest_first():
+    """Steps are grouped by name, ordered by total wall time, with per-step means of the counters."""
+    rows = summarize_steps([
+        event("HomePage.search", 100, api_calls=4, round_trips=6, wait_ms=50, action_ms=20),
+        event("HomePage.search", 300, api_calls=2, round_trips=2, wait_ms=150, action_ms=40),
+        event("ProductPage.add_to_cart", 250, api_calls=1),
+    ])
+
+    assert [row["step"] for row in rows] == ["HomePage.search", "ProductPage.add_to_cart"]
+    search = rows[0]
+    assert search["count"] == 2
+    assert search["total_ms"] == 400
+    assert search["max_ms"] == 300
+    assert (search["api_calls"], search["round_trips"]) == (3, 4)
+    assert (search["wait_ms"], search["action_ms"]) == (100, 30)
+
+
+def test_summarize_steps_of_no_events_is_empty():
+    """A session without profiled steps has an empty table."""
+    assert summarize_steps([]) == []
+
+
+def test_profile_method_records_a_sync_step(profiler):
+    """A wrapped sync method returns its result and leaves one step event behind."""
+    wrapped = profile_method("Page.search", lambda query: f"results for {query}")
+
+    assert wrapped("laptop") == "results for laptop"
+    path = profiler.end_test("tests/test_x.py::test_search[chromium]")
+
+    events = profiler.load_all()
+    assert path.endswith("tests_test_x.py_test_search_chromium.json")
+    assert [(e["name"], e["args"]["nested"]) for e in events] == [("Page.search", False)]
+
+
+def test_profile_method_records_an_async_step(profiler):
+    """A wrapped coroutine function stays awaitable and is timed across its await."""
+    async def search(query):
+        await asyncio.sleep(0.01)
+        return f"results for {query}"
+
+    wrapped = profile_method("AsyncPage.search", search)
+
+    assert asyncio.iscoroutinefunction(wrapped)
+    assert run_async(wrapped("laptop")) == "results for laptop"
+    profiler.end_test("test_async")
+    [recorded] = profiler.load_all()
+    assert recorded["name"] == "AsyncPage.search"
+    assert recorded["dur"] >= 10_000
+
+
+def test_profile_method_records_nothing_when_profiling_is_off(profiler):
+    """With profiling off the wrapper only calls through."""
+    profiler.enabled = False
+    wrapped = profile_method("Page.search", lambda: "done")
+
+    assert wrapped() == "done"
+    assert profiler.end_test("test_off") is None
+
+
+def test_nested_steps_include_their_inner_steps(profiler):
+    """A step calling another page object method is marked nested and counted in its parent."""
+    with profiler.step("Outer") as outer:
+        with profiler.step("Inner") as inner:
+            inner.add_api_call(wait=True, elapsed_ms=5)
+            inner.add_round_trip()
+        outer.add_api_call(wait=False, elapsed_ms=2)
+
+    assert inner.parent is outer
+    assert (inner.api_calls, inner.wait_ms, inner.round_trips) == (1, 5, 1)
+    assert (outer.api_calls, outer.wait_ms, outer.action_ms, outer.round_trips) == (2, 5, 2, 1)
+    profiler.end_test("test_nested")
+    assert {e["name"]: e["args"]["nested"] for e in profiler.load_all()} == {"Inner": True, "Outer": False}
+
+
+def test_step_record_without_parent_counts_only_itself():
+    """A top-level record has no parent to propagate to."""
+    record = StepRecord("Top", None)
+    record.add_api_call(wait=False, elapsed_ms=3)
+
+    assert (record.api_calls, record.action_ms, record.wait_ms) == (1, 3, 0)
+
+
+def test_waits_are_told_apart_from_actions():
+    """wait_for_*, expect_* and assertion methods count as waits; everything else as actions."""
+    assert all(is_wait(name) for name in ("wait_for_selector", "expect_navigation", "to_be_visible",
+                                          "not_to_have_text"))
+    assert not any(is_wait(name) for name in ("click", "fill", "goto", "locator"))
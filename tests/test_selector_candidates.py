@@ -0,0 +1,48 @@
+"""
+Tests for rule-based selector candidate generation.
+
+These run fully offline on the filter panel of the benchmark's search results
+fixture, where the target link sits inside a list item of sibling filters.
+"""
+
+import os
+from tests.selector_candidates import rule_based_candidates
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "bench", "search_results.html")
+
+
+def filter_panel():
+    """The search results fixture, whose filter panel holds the 'Get It Today' link."""
+    with open(FIXTURE, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_candidates_point_at_the_clickable_element_first():
+    """The link's own label leads, followed by its class and the text span inside it."""
+    candidates = rule_based_candidates(filter_panel(), "Get It Today")
+
+    assert candidates == [
+        'a[aria-label="Apply the filter Get It Today to narrow results"]',
+        "a.a-link-normal.s-navigation-item",
+        "span.a-size-base.a-color-base",
+    ]
+
+
+def test_containers_and_href_prefixes_are_not_candidates():
+    """List items, lists and panels around the match, and href prefixes shared by sibling filters, are skipped."""
+    candidates = rule_based_candidates(filter_panel(), "Get It Today")
+
+    assert "#p_90-6741118031" not in candidates
+    assert not any(c.startswith(("span.a-list-item", "ul", "div")) for c in candidates)
+    assert "#s-refinements" not in candidates
+    assert "#deliveryRefinements" not in candidates
+    assert not any("href" in c for c in candidates)
+
+
+def test_labelled_leaf_elements_are_kept():
+    """A non-clickable element that matches on its own is a candidate; its container is not."""
+    html = '<div id="panel"><div id="promo" aria-label="Get It Today">Ships now</div></div>'
+
+    assert rule_based_candidates(html, "Get It Today") == ["#promo", 'div[aria-label="Get It Today"]']
+    assert rule_based_candidates(html, "Get It Today", broken_selector="#promo") == ['div[aria-label="Get It Today"]']
+    assert rule_based_candidates(html, "  ") == []
@@ -0,0 +1,130 @@
+"""
+Tests for adaptive click timeouts and the selector circuit breaker.
+
+These run fully offline against an in-memory or temporary on-disk store.
+"""
+
+from tests import heal_flow, selector_health as selector_health_module
+from tests.selector_health import (
+    DEFAULT_TIMEOUT_MS, FAILURE_THRESHOLD, MIN_SAMPLES, MIN_TIMEOUT_MS, PROBE_INTERVAL,
+    SelectorHealth, percentile,
+)
+
+SELECTOR = "#old-check"
+DESC = "Get It Today"
+HEALED = "#today"
+
+
+def broken_selector_health():
+    """A store where SELECTOR has failed often enough to open its circuit and HEALED replaced it."""
+    health = SelectorHealth(path=None)
+    for _ in range(FAILURE_THRESHOLD):
+        health.record_failure(SELECTOR, DESC)
+    health.record_heal(SELECTOR, DESC, HEALED)
+    return health
+
+
+def test_percentile_is_nearest_rank():
+    """Percentiles pick an actual sample and stay within the list at both ends."""
+    samples = [40, 10, 30, 20, 50]
+
+    assert percentile(samples, 0.5) == 30
+    assert percentile(samples, 0.95) == 50
+    assert percentile(samples, 0.0) == 10
+    assert percentile([7], 0.95) == 7
+    assert percentile([], 0.95) is None
+
+
+def test_timeout_adapts_to_p95_within_bounds():
+    """The default applies until MIN_SAMPLES exist; then p95 x headroom, clamped to [MIN, DEFAULT]."""
+    health = SelectorHealth(path=None)
+    for _ in range(MIN_SAMPLES - 1):
+        health.record_success(SELECTOR, DESC, 400)
+    assert health.timeout_for(SELECTOR, DESC) == DEFAULT_TIMEOUT_MS
+
+    health.record_success(SELECTOR, DESC, 400)
+    assert health.timeout_for(SELECTOR, DESC) == 800
+
+    fast = SelectorHealth(path=None)
+    slow = SelectorHealth(path=None)
+    for _ in range(MIN_SAMPLES):
+        fast.record_success(SELECTOR, DESC, 20)
+        slow.record_success(SELECTOR, DESC, 2500)
+    assert fast.timeout_for(SELECTOR, DESC) == MIN_TIMEOUT_MS
+    assert slow.timeout_for(SELECTOR, DESC) == DEFAULT_TIMEOUT_MS
+
+
+def test_circuit_opens_after_consecutive_failures_only():
+    """A success resets the failure streak; FAILURE_THRESHOLD failures in a row open the circuit."""
+    health = SelectorHealth(path=None)
+    health.record_heal(SELECTOR, DESC, HEALED)
+    for _ in range(FAILURE_THRESHOLD - 1):
+        health.record_failure(SELECTOR, DESC)
+    health.record_success(SELECTOR, DESC, 100)
+    health.record_failure(SELECTOR, DESC)
+    assert not health.stats(SELECTOR, DESC)["open"]
+    assert health.bypass_selector(SELECTOR, DESC) is None
+
+    for _ in range(FAILURE_THRESHOLD - 1):
+        health.record_failure(SELECTOR, DESC)
+    assert health.stats(SELECTOR, DESC)["open"]
+    assert health.bypass_selector(SELECTOR, DESC) == HEALED
+
+
+def test_open_circuit_probes_the_original_every_interval():
+    """Every PROBE_INTERVAL-th call tries the original; a failed probe still has the healed selector."""
+    health = broken_selector_health()
+
+    bypasses = [health.bypass_selector(SELECTOR, DESC) for _ in range(PROBE_INTERVAL)]
+    assert bypasses == [HEALED] * (PROBE_INTERVAL - 1) + [None]
+
+    health.record_failure(SELECTOR, DESC)
+    assert health.healed_selector(SELECTOR, DESC) == HEALED
+    assert health.bypass_selector(SELECTOR, DESC) == HEALED
+
+
+def test_successful_probe_closes_the_circuit():
+    """Once the original works again it is used directly and no longer falls back."""
+    health = broken_selector_health()
+    health.record_success(SELECTOR, DESC, 100)
+
+    assert not health.stats(SELECTOR, DESC)["open"]
+    assert health.bypass_selector(SELECTOR, DESC) is None
+    assert health.healed_selector(SELECTOR, DESC) is None
+
+
+def test_forgotten_heal_stops_the_bypass(tmp_path):
+    """A healed selector that stopped working is dropped, and the state survives a new session."""
+    path = str(tmp_path / "selector_health.json")
+    health = SelectorHealth(path=path)
+    for _ in range(FAILURE_THRESHOLD):
+        health.record_failure(SELECTOR, DESC)
+    health.record_heal(SELECTOR, DESC, HEALED)
+    health.flush()
+    assert SelectorHealth(path=path).bypass_selector(SELECTOR, DESC) == HEALED
+
+    health.forget_heal(SELECTOR, DESC)
+    health.flush()
+    assert SelectorHealth(path=path).bypass_selector(SELECTOR, DESC) is None
+
+
+def test_caller_ceiling_replaces_the_default_bound():
+    """A slow page object's ceiling is the timeout before samples exist and the upper bound after."""
+    health = SelectorHealth(path=None)
+    assert health.timeout_for(SELECTOR, DESC, max_timeout=10000) == 10000
+
+    for _ in range(MIN_SAMPLES):
+        health.record_success(SELECTOR, DESC, 2500)
+    assert health.timeout_for(SELECTOR, DESC, max_timeout=10000) == 5000
+    assert health.timeout_for(SELECTOR, DESC) == DEFAULT_TIMEOUT_MS
+
+
+def test_default_ceiling_is_read_on_every_call(monkeypatch):
+    """Patching DEFAULT_TIMEOUT_MS (as the benchmark does) changes the timeout of callers passing no ceiling."""
+    monkeypatch.setattr(selector_health_module, "DEFAULT_TIMEOUT_MS", 500)
+    health = SelectorHealth(path=None)
+    assert health.timeout_for(SELECTOR, DESC) == 500
+
+    monkeypatch.setattr(heal_flow, "selector_health", health)
+    assert heal_flow.bypass_timeout(SELECTOR, DESC) == 500
+    assert heal_flow.begin_attempt(SELECTOR, DESC)[0] == 500
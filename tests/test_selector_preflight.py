@@ -0,0 +1,122 @@
+"""
+Tests for eager selector pre-flight.
+
+These run fully offline: the in-page resolver is replaced by a fake answering
+from a dict of selector counts, a fake page counts the Playwright-engine
+selectors, and the background model call is stubbed out.
+"""
+
+from concurrent.futures import Future
+import pytest
+from tests import selector_preflight
+from tests.heal_cache import HealCache, dom_fingerprint
+from tests.html_compactor import compact_html
+from tests.selector_preflight import _with_fingerprint, preflight
+
+CONTEXT_HTML = "<div><button id='buy'>Buy now</button></div>"
+
+
+class FakeLocator:
+    """page.locator() result; count() is recorded on the page."""
+
+    def __init__(self, page, selector):
+        self.page = page
+        self.selector = selector
+
+    def count(self):
+        self.page.counted.append(self.selector)
+        return self.page.counts[self.selector]
+
+
+class FakePage:
+    """Answers locator(...).count() from `counts` and records which selectors were counted."""
+
+    def __init__(self, counts):
+        self.counts = counts
+        self.counted = []
+
+    def wait_for_load_state(self):
+        pass
+
+    def locator(self, selector):
+        return FakeLocator(self, selector)
+
+
+def fake_resolve(page, candidates=None, desc=None, selector=None):
+    """Validates CSS candidates in one call (engine selectors are errors); anchors return CONTEXT_HTML."""
+    if candidates is None:
+        return {"anchorFound": True, "context": CONTEXT_HTML}
+    return {"candidates": [
+        {"selector": c, "error": "not a CSS selector"} if c.startswith(("text=", "role=")) else
+        {"selector": c, "count": page.counts[c]}
+        for c in candidates
+    ]}
+
+
+@pytest.fixture
+def background(monkeypatch):
+    """Fake resolver, an empty memory-only heal cache, and a background heal answering "#healed"."""
+    calls = []
+
+    def heal_in_background(selector, desc, context):
+        calls.append((selector, desc, context.kind))
+        return ["#healed"]
+
+    monkeypatch.setattr(selector_preflight, "resolve", fake_resolve)
+    monkeypatch.setattr(selector_preflight, "heal_cache", HealCache(path=None))
+    monkeypatch.setattr(selector_preflight, "_heal_in_background", heal_in_background)
+    return calls
+
+
+def test_css_selectors_are_resolved_and_engine_selectors_counted(background):
+    """Only the selectors the page cannot evaluate itself cost a count() each."""
+    page = FakePage({"#search": 1, "#gone": 0, "text=Add to Cart": 1})
+
+    preheals = preflight(page, [("#search", "search box"), ("#gone", "buy button"),
+                                ("text=Add to Cart", "add to cart button")])
+
+    assert page.counted == ["text=Add to Cart"]
+    assert list(preheals) == [("#gone", "buy button")]
+    assert background == [("#gone", "buy button", "html")]
+    assert preheals[("#gone", "buy button")].result(timeout=5) == (
+        dom_fingerprint(compact_html(CONTEXT_HTML, "buy button")), ["#healed"])
+
+
+def test_nothing_is_healed_when_every_selector_is_found(background):
+    """A page whose selectors all match starts no background heal."""
+    page = FakePage({"#search": 1, "text=Add to Cart": 2})
+
+    assert preflight(page, [("#search", "search box"), ("text=Add to Cart", "add to cart button")]) == {}
+    assert background == []
+
+
+def test_cached_heal_resolves_without_a_model_call(background):
+    """A heal cached for the same DOM is handed back at once instead of queued."""
+    fingerprint = dom_fingerprint(compact_html(CONTEXT_HTML, "buy button"))
+    selector_preflight.heal_cache.put("#gone", "buy button", fingerprint, "#buy")
+
+    preheals = preflight(FakePage({"#gone": 0}), [("#gone", "buy button")])
+
+    assert preheals[("#gone", "buy button")].result(timeout=0) == (fingerprint, ["#buy"])
+    assert background == []
+
+
+def test_with_fingerprint_passes_the_heal_result_through():
+    """The chained future resolves to (fingerprint, candidates) once the heal finishes."""
+    source = Future()
+    chained = _with_fingerprint(source, "fp")
+
+    assert not chained.done()
+    source.set_result(["#a", "#b"])
+    assert chained.result(timeout=0) == ("fp", ["#a", "#b"])
+
+
+def test_with_fingerprint_passes_a_failed_heal_on():
+    """A background heal that raised fails the chained future with the same exception."""
+    source = Future()
+    chained = _with_fingerprint(source, "fp")
+    error = TimeoutError("model took too long")
+
+    source.set_exception(error)
+
+    assert chained.exception(timeout=0) is error
@@ -7,95 +7,301 @@ a corrected selector based on the element's description and HTML context.
 
 Primary functionality:
 - smart_click(): Clicks elements with fallback to AI-generated selectors
-- Automatic element ancestor traversal to find clickable elements
+- Multi-candidate healing: model and rule-based candidates validated in one call
+- Automatic element ancestor traversal to find clickable elements, done in-page
+  by the heal resolver so a heal costs a couple of browser round trips
+- Reuse of previously validated heals via the two-level heal cache
+- Fingerprint recording on success and similarity-based healing without the AI model
+- Adaptive per-selector timeouts and a circuit breaker for known-broken selectors
+- Use of heals started in the background by page-object pre-flight (selector_preflight)
 - Comprehensive logging for debugging selector healing
 """
 
-from tests.ai_utils import get_healed_selector
+from tests import heal_flow
+from tests.aria_context import aria_context, context_kind_for
+from tests.model_router import model_router
+from tests.element_fingerprint import find_similar_element, FINGERPRINT_JS
+from tests.heal_flow import HEALED_CLICK_TIMEOUT_MS, CLICKABLE_TAGS, CLICKABLE_ANCESTOR_XPATH, MATCH_INFO_JS
+from tests.heal_resolver import resolve
+from tests.heal_telemetry import heal_trace, phase, record_outcome
 from playwright.sync_api import TimeoutError
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import logging
 
 
 logger = logging.getLogger(__name__)
 
 
-def smart_click(page, selector, desc):
+def smart_click(page, selector, desc, preheal=None, max_timeout=None):
     """
     Click an element with self-healing capability when selector fails.
     
     Attempts to click an element using the provided selector. If the selector
-    times out (3 second timeout), triggers AI-powered selector healing:
-    1. Extracts HTML context around the target element
-    2. Sends context to AI model to generate corrected selector
-    3. Attempts click with the healed selector
-    4. Handles non-clickable elements by traversing to parent clickable element
+    times out (adaptive timeout, at most max_timeout - 3 seconds by default),
+    triggers selector healing:
+    1. Scores the current DOM against the element's recorded fingerprint and
+       clicks the best match if it is confident enough
+    2. Otherwise extracts HTML context around the target element
+    3. Sends context to AI model to generate ranked candidate selectors
+    4. Attempts click with the first candidate that validates in-page
+    5. Handles non-clickable elements by traversing to parent clickable element
     
     Args:
         page (Page): Playwright page object to perform clicks on
         selector (str): CSS/Playwright selector for the element to click
         desc (str): Human-readable description of the element (used for AI context)
+        preheal (Future): Background heal started by selector_preflight because the
+            selector was missing when the page object was built, if any
+        max_timeout (int): Ceiling (ms) for the adaptive timeout on the original selector
+            and for waiting on a known-broken selector's healed replacement (None for
+            selector_health.DEFAULT_TIMEOUT_MS)
         
     Returns:
         bool: True if click succeeded (either original or healed selector),
               False if both initial attempt and healing retry failed
               
     Process flow:
-        1. Try original selector (3 second timeout)
+        0. If pre-flight found the selector missing and the element still is,
+           click the candidates healed in the background; else, if the selector's
+           circuit is open (it failed repeatedly), wait for the last good healed
+           selector with the adaptive timeout, click it and skip the original
+        1. Try original selector with a timeout derived from its p95
+           time-to-actionable, recording the element's fingerprint the first
+           time it is clicked in a session
         2. If timeout:
-           a. Extract HTML snippet containing the element
-           b. Call AI to generate new selector
-           c. Retry with healed selector
-           d. If healed element is not clickable, find clickable parent
+           a. If this was a probe of a selector whose circuit is open, click its
+              healed selector as in step 0; otherwise (or if that fails)
+           b. Click the best fingerprint match if its score reaches
+              CONFIDENCE_THRESHOLD; otherwise
+           c. Extract HTML snippet containing the element (one in-page resolver call)
+              and compact it to the prompt token budget
+           d. Reuse a cached heal for the same selector/description/DOM, if it
+              still matches the page; otherwise call AI to generate a ranked
+              list of candidates, followed by rule-based candidates
+           e. Validate all candidates in-page at once (existence, uniqueness,
+              visibility, clickability) and, if the first valid match is not
+              clickable itself, resolve its clickable parent (one resolver call)
+           f. Click the resolved element
+           g. Cache the healed selector once the click succeeds
         3. Return success/failure status
     """
+    # Selector was missing at pre-flight: use the candidates healed in the background
+    if preheal is not None and _click_preheal(page, selector, desc, preheal):
+        return True
+
+    # Known-broken selector: go straight to the last selector that healed it
+    bypass = heal_flow.circuit_bypass(selector, desc)
+    if bypass is not None and _click_bypass(page, selector, desc, bypass, max_timeout):
+        return True
+
+    timeout, started, record_fingerprint = heal_flow.begin_attempt(selector, desc, max_timeout)
     try:
         # Attempt initial click with original selector
-        logger.info(f"Attempting click on: {desc} (Selector: {selector})")
-        page.locator(selector).click(timeout=3000)
+        locator = page.locator(selector)
+        element_fingerprint = None
+        if record_fingerprint:
+            # Capture the fingerprint before clicking - the click may navigate away
+            element_fingerprint = locator.evaluate(FINGERPRINT_JS, timeout=timeout)
+        locator.click(timeout=timeout)
+        heal_flow.attempt_succeeded(selector, desc, started, element_fingerprint)
         return True
         
     except TimeoutError as e:
-        # Original selector failed - prepare for selector healing
+        # Original selector failed - heal it and remember what worked
+        heal_flow.attempt_failed(selector, desc)
+        # A failed probe of a known-broken selector: its healed selector still gets the click
+        bypass = heal_flow.probe_fallback(selector, desc)
+        if bypass is not None and _click_bypass(page, selector, desc, bypass, max_timeout):
+            return True
+        with heal_trace(selector, desc, original_wait_ms=heal_flow.elapsed_ms(started)):
+            healed_selector = _heal(page, selector, desc)
+        heal_flow.heal_finished(selector, desc, healed_selector)
+        return healed_selector is not None
+
+
+def _heal(page, selector, desc):
+    """
+    Find and click a replacement for a selector that timed out.
+
+    Args:
+        page (Page): Playwright page object to perform clicks on
+        selector (str): Selector that timed out
+        desc (str): Human-readable description of the element
+
+    Returns:
+        str | None: The selector that was clicked, or None if healing failed
+    """
+    # First try matching the element's recorded fingerprint (no model call)
+    stored_fingerprint = heal_flow.stored_fingerprint(selector, desc)
+    if stored_fingerprint is not None:
         try:
-            # Try to find element by text description and extract its HTML
-            anchor_element = page.get_by_text(desc, exact=False).first
-            logger.info(f"anchor_element\n{anchor_element}")
-            focused_html = anchor_element.evaluate("el => el.parentElement.outerHTML")
-        except:
-            # If text-based lookup fails, use full page content as context
-            logger.warning(f"Could not find element by text: {desc}. Falling back to page content.")
-            focused_html = page.content()[:20000]
-
-        # Log HTML being sent to AI model and start healing process
-        logger.info(f"HTML sent to the model {focused_html}")
-        logger.warning(f"TIMEOUT: {desc} failed. Starting self-healing...")
-        
-        # Generate new selector using AI
-        new_selector = get_healed_selector(selector, focused_html, desc)
-        logger.info(f"RETRYING: Clicking {desc} with healed selector: {new_selector}")
-        
+            with phase("fingerprint_match"):
+                match_score, match_selector = find_similar_element(page, stored_fingerprint)
+            if heal_flow.fingerprint_match_accepted(desc, match_score, match_selector):
+                with phase("click"):
+                    page.locator(match_selector).click(timeout=HEALED_CLICK_TIMEOUT_MS)
+                record_outcome("fingerprint")
+                return match_selector
+        except Exception as ex:
+            logger.warning(f"Fingerprint heal failed for {desc}: {ex}")
+
+    # Prepare for AI selector healing: ranked retrieval and context serialization in one round trip,
+    # then compaction (strip markup noise, fit the context into the prompt's token budget) or, for
+    # role selectors, an accessibility-tree snapshot of the ranked regions (see aria_context)
+    with phase("context_extraction"):
+        anchor_result = resolve(page, desc=desc, selector=selector, include_changes=True)
+        snapshot = aria_context(page, anchor_result, desc) if context_kind_for(selector) == "aria" else None
+        context = heal_flow.build_context(anchor_result, desc, snapshot)
+    heal_flow.log_context(anchor_result, context, desc)
+
+    # Reuse a previous heal of the same selector against the same DOM, if it still matches
+    new_selector = heal_flow.cached_heal(selector, desc, context)
+    if new_selector is not None:
+        if _click_healed(page, [new_selector], desc) is not None:
+            record_outcome("cache")
+            return new_selector
+        heal_flow.discard_cached_heal(selector, desc, context, new_selector)
+
+    # Ask the model tiers (smallest first) for ranked candidates, with rule-based selectors as
+    # fallbacks; each tier's candidates are validated together in one in-page call
+    def validate(candidates):
+        heal_flow.log_retry(desc, candidates)
+        return _click_healed(page, candidates, desc)
+
+    healed_selector, candidates = model_router.heal(
+        selector, context.model_html, desc, validate,
+        extra_candidates=heal_flow.fallback_candidates(selector, desc, context), context_kind=context.kind)
+    if healed_selector is not None:
+        # Only selectors proven against the live page are cached
+        heal_flow.heal_succeeded(selector, desc, context.fingerprint, healed_selector, "model")
+        return healed_selector
+
+    heal_flow.heal_failed(desc, candidates)
+    return None
+
+
+def _click_preheal(page, selector, desc, preheal):
+    """
+    Click using a heal started by selector_preflight.
+
+    Args:
+        page (Page): Playwright page object to perform clicks on
+        selector (str): Selector that was missing at pre-flight
+        desc (str): Human-readable description of the element
+        preheal (Future): Resolves to (dom_fingerprint, candidate selectors)
+
+    Returns:
+        bool: True if a healed candidate was clicked; False to continue with the normal flow
+    """
+    # The element may have rendered after the pre-flight ran
+    if page.locator(selector).count():
+        return False
+    try:
+        # Usually done already; otherwise only the rest of the model call is waited for, which
+        # its latency budget bounds - a background heal still running after that is stuck
+        fingerprint, candidates = preheal.result(timeout=model_router.budget_ms / 1000)
+    except FutureTimeoutError:
+        logger.warning(f"Background heal for {desc} still running; falling back to the normal heal path")
+        return False
+    except Exception as ex:
+        logger.warning(f"Background heal for {desc} failed ({ex}); falling back to the normal heal path")
+        return False
+
+    with heal_trace(selector, desc):
+        logger.info(f"PREFLIGHT HEAL: Clicking {desc} with {len(candidates)} background candidates: {candidates}")
+        healed_selector = _click_healed(page, candidates, desc)
+        if healed_selector is None:
+            return False
+        heal_flow.heal_succeeded(selector, desc, fingerprint, healed_selector, "preflight")
+    heal_flow.attempt_failed(selector, desc)
+    heal_flow.heal_finished(selector, desc, healed_selector)
+    return True
+
+
+def _click_bypass(page, selector, desc, bypass, max_timeout=None):
+    """
+    Click the last good healed selector of a selector whose circuit is open.
+
+    The healed selector gets the original's adaptive timeout to become visible
+    (the page may still be rendering) before it is validated and clicked. If it
+    does not show up or cannot be clicked it is forgotten, so the caller heals.
+
+    Args:
+        page (Page): Playwright page object to perform the click on
+        selector (str): Known-broken original selector
+        desc (str): Human-readable description of the element
+        bypass (str): Healed selector to click instead
+        max_timeout (int): Ceiling (ms) for the wait
+
+    Returns:
+        bool: True if the healed selector was clicked
+    """
+    with heal_trace(selector, desc):
         try:
-            # Attempt to use the healed selector
-            healed_locator = page.locator(new_selector).first
-            logger.info(f"Healed location 1 {healed_locator}")
-            
-            # Check the HTML tag of the found element
-            tag = healed_locator.evaluate("el => el.tagName.toLowerCase()")
-            logger.info(f"Tag {tag}")
-            
-            # If element is not directly clickable, find clickable parent
-            # (e.g., if healed selector points to span inside button, traverse to button)
-            if tag not in ["a", "button", "input", "label"]:
-                healed_locator = healed_locator.locator(
-                    "xpath=ancestor::*[self::a or self::button or self::input or self::label or @role='button'][1]"
-                )
-            logger.info(f"Healed location 2 {healed_locator}")
-            
-            # Click the healed/adjusted element
-            healed_locator.click(timeout=3000)
+            timeout = heal_flow.bypass_timeout(selector, desc, max_timeout)
+            page.locator(bypass).first.wait_for(state="visible", timeout=timeout)
+            clicked = _click_healed(page, [bypass], desc) is not None
+        except TimeoutError:
+            clicked = False
+        if clicked:
+            record_outcome("circuit")
             return True
-            
-        except Exception as ex2:
-            # Even with healed selector, click failed
-            logger.error(f"RETRY FAILED: {desc} with healed selector: {new_selector}")
-            return False
+    heal_flow.bypass_failed(selector, desc, bypass)
+    return False
+
+
+def _click_healed(page, candidates, desc):
+    """
+    Validate candidate selectors and click the element the first valid one points to.
+
+    The in-page resolver checks every candidate for existence, uniqueness,
+    visibility and clickability, walks up from the chosen match to the nearest
+    clickable ancestor (e.g. from a span inside a button to the button) and
+    returns a stable selector for it - all in one round trip. A candidate that
+    matches several elements is only used if its first match holds desc, and a
+    match with no clickable ancestor is never clicked. Candidates the browser
+    cannot evaluate as CSS (Playwright's role=/text= engines) are only tried
+    through Playwright, under the same rules, if no CSS candidate resolved.
+
+    Args:
+        page (Page): Playwright page object to perform the click on
+        candidates (list[str]): Healed selectors in priority order
+        desc (str): Human-readable description of the element (matched against
+            non-unique candidates, and for logging)
+
+    Returns:
+        str | None: The candidate that was clicked, or None if none worked
+    """
+    try:
+        with phase("validation"):
+            result = resolve(page, candidates=candidates, target=desc)
+        heal_flow.log_validation(result)
+
+        resolved = result["resolved"]
+        if resolved is not None:
+            logger.info(f"Clicking {desc} via {resolved['clickableSelector']} (tag {resolved['tag']})")
+            with phase("click"):
+                page.locator(resolved["clickableSelector"]).click(timeout=HEALED_CLICK_TIMEOUT_MS)
+            return resolved["selector"]
+    except Exception as ex:
+        logger.warning(f"Healed click on {desc} failed: {ex}")
+        return None
+
+    # Not CSS - let Playwright resolve it and find the clickable parent
+    for candidate in heal_flow.playwright_only_candidates(result):
+        try:
+            count = page.locator(candidate).count()
+            if count == 0:
+                continue
+            healed_locator = page.locator(candidate).first
+            info = healed_locator.evaluate(MATCH_INFO_JS, timeout=HEALED_CLICK_TIMEOUT_MS)
+            if not heal_flow.playwright_match_accepted(candidate, desc, count, info):
+                continue
+            if info["tag"] not in CLICKABLE_TAGS:
+                healed_locator = healed_locator.locator(CLICKABLE_ANCESTOR_XPATH)
+            with phase("click"):
+                healed_locator.click(timeout=HEALED_CLICK_TIMEOUT_MS)
+            return candidate
+        except Exception as ex:
+            logger.warning(f"Healed click on {desc} with {candidate} failed: {ex}")
+    return None